@@ -0,0 +1,125 @@
+"""Synthetic CSVs shaped like the eight OpenDOSM inputs, at configurable sizes.
+
+    python -m benchmarks.generate --out bench_data --years 10 --states 16 --districts 8 --divisions 13
+
+Column names and value ranges follow the files the Home page expects (see FILES in
+utils/pipeline.py); values are random, so only sizes and shapes are meaningful.
+states.geojson is a matching ADM1 FeatureCollection: one box per generated state.
+"""
+import argparse
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+STATES = ["Johor", "Kedah", "Kelantan", "Melaka", "Negeri Sembilan", "Pahang", "Perak", "Perlis",
+          "Pulau Pinang", "Sabah", "Sarawak", "Selangor", "Terengganu", "W.P. Kuala Lumpur",
+          "W.P. Labuan", "W.P. Putrajaya"]
+AGES = ["overall", "15-24", "25-34", "35-44", "45-54", "55-64"]
+SECTORS = ["overall", "agriculture", "mining", "manufacturing", "construction", "services"]
+START = "2010-01-01"
+
+
+def state_names(n: int) -> list:
+    return STATES[:n] + [f"State {i}" for i in range(len(STATES), n)]
+
+
+def _csv(df: pd.DataFrame) -> bytes:
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue().encode("utf-8")
+
+
+def _grid(*levels) -> list:
+    """Cartesian product of the levels as flat columns (first level varies slowest)."""
+    return [a.ravel() for a in np.meshgrid(*levels, indexing="ij")]
+
+
+def generate(years: int = 6, states: int = 16, districts: int = 8, divisions: int = 13,
+             seed: int = 0) -> dict:
+    """{"f1".."f8": CSV bytes}, mirroring the upload order on the Home page."""
+    rng = np.random.default_rng(seed)
+    names = np.array(state_names(states), dtype=object)
+    months = pd.date_range(START, periods=12 * years, freq="MS").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    quarters = pd.date_range(START, periods=4 * years, freq="QS").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    annual = pd.date_range(START, periods=years, freq="YS").strftime("%Y-%m-%d").to_numpy(dtype=object)
+    survey = annual[::3]
+
+    out = {}
+    out["f1"] = _csv(pd.DataFrame({
+        "date": months,
+        "u_rate_15_24": rng.uniform(8, 14, months.size),
+        "u_rate_15_30": rng.uniform(5, 9, months.size),
+    }))
+    for key, col in [("f2", "sru"), ("f3", "tru")]:
+        d, a = _grid(quarters, np.array(AGES, dtype=object))
+        out[key] = _csv(pd.DataFrame({"date": d, "age": a, col: rng.uniform(1, 40, d.size)}))
+    d, s = _grid(quarters, names)
+    out["f4"] = _csv(pd.DataFrame({"date": d, "state": s, "p_rate": rng.uniform(60, 75, d.size),
+                                   "u_rate": rng.uniform(2, 6, d.size)}))
+    d, sec = _grid(annual, np.array(SECTORS, dtype=object))
+    out["f5"] = _csv(pd.DataFrame({"date": d, "sector": sec, "output_hour": rng.uniform(20, 80, d.size)}))
+    divs = np.array(["overall"] + [f"{i:02d}" for i in range(1, divisions + 1)], dtype=object)
+    s, d, dv = _grid(names, months, divs)
+    out["f6"] = _csv(pd.DataFrame({"state": s, "date": d, "division": dv, "index": rng.uniform(100, 140, d.size)}))
+    s, d = _grid(names, survey)
+    out["f7"] = _csv(pd.DataFrame({"state": s, "date": d, "income_mean": rng.uniform(4000, 12000, d.size),
+                                   "income_median": rng.uniform(3000, 9000, d.size)}))
+    s, i, d = _grid(names, np.arange(districts), survey)
+    out["f8"] = _csv(pd.DataFrame({"state": s, "district": [f"{a} D{b}" for a, b in zip(s, i)], "date": d,
+                                   "income_mean": rng.uniform(3000, 12000, d.size),
+                                   "income_median": rng.uniform(2000, 9000, d.size)}))
+    return out
+
+
+def states_geojson(states: int = 16, vertices: int = 64) -> bytes:
+    """ADM1 FeatureCollection (geoBoundaries-style properties) with one box per generated state.
+
+    Boxes sit on a grid over Malaysia's bounding box; each side has `vertices` points,
+    so simplification has real work to do.
+    """
+    cols = int(np.ceil(np.sqrt(states)))
+    w, h = 15.0 / cols, 6.0 / int(np.ceil(states / cols))
+    t = np.linspace(0.0, 1.0, vertices, endpoint=False)
+    feats = []
+    for i, name in enumerate(state_names(states)):
+        x0, y0 = 100.0 + (i % cols) * w, 1.0 + (i // cols) * h
+        xs = np.concatenate([x0 + t * w, np.full(vertices, x0 + w), x0 + w - t * w, np.full(vertices, x0)])
+        ys = np.concatenate([np.full(vertices, y0), y0 + t * h, np.full(vertices, y0 + h), y0 + h - t * h])
+        ring = np.column_stack([xs, ys]).round(6).tolist()
+        feats.append({"type": "Feature", "properties": {"shapeName": name, "shapeType": "ADM1"},
+                      "geometry": {"type": "Polygon", "coordinates": [ring + ring[:1]]}})
+    return json.dumps({"type": "FeatureCollection", "features": feats}).encode("utf-8")
+
+
+def add_size_args(ap: argparse.ArgumentParser):
+    ap.add_argument("--years", type=int, default=6, help="years of monthly/quarterly history (default: %(default)s)")
+    ap.add_argument("--states", type=int, default=16, help="number of states (default: %(default)s)")
+    ap.add_argument("--districts", type=int, default=8, help="districts per state (default: %(default)s)")
+    ap.add_argument("--divisions", type=int, default=13, help="CPI divisions besides overall (default: %(default)s)")
+    ap.add_argument("--seed", type=int, default=0)
+
+
+def sizes(args) -> dict:
+    return {k: getattr(args, k) for k in ("years", "states", "districts", "divisions", "seed")}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.generate", description=__doc__.splitlines()[0])
+    ap.add_argument("--out", required=True, help="directory for f1.csv .. f8.csv")
+    add_size_args(ap)
+    args = ap.parse_args(argv)
+    os.makedirs(args.out, exist_ok=True)
+    for key, data in generate(**sizes(args)).items():
+        with open(os.path.join(args.out, f"{key}.csv"), "wb") as f:
+            f.write(data)
+    with open(os.path.join(args.out, "states.geojson"), "wb") as f:
+        f.write(states_geojson(args.states))
+    print(f"wrote f1.csv .. f8.csv and states.geojson to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
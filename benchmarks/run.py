@@ -0,0 +1,233 @@
+"""Time and memory-profile each stage of the Home page pipeline and the pages' data prep.
+
+    python -m benchmarks.run --years 10 --states 16 --repeat 5 --out benchmarks/results/latest.json
+    python -m benchmarks.run --baseline benchmarks/results/baseline.json   # exit 1 on regression
+
+Input data comes from benchmarks.generate. Every stage runs on cold caches: setup
+(untimed) clears the caches the stage would otherwise hit. Wall time is the median
+of --repeat runs; peak memory comes from one extra run under tracemalloc.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import add_size_args, generate, sizes, states_geojson
+from utils import aggregates, charts, choropleth, correlation, forecast, geo, ingest, llm_helper, memory, schema, ymi
+
+CORE = ["f1", "f2", "f3", "f4", "f6"]
+KINDS = {"f1": "youth", "f2": "skills", "f3": "time", "f4": "labour_force", "f5": "productivity", "f6": "cpi",
+         "f7": "income_state", "f8": "income_district"}
+WEIGHTS = ymi.DEFAULT_WEIGHTS
+VERSION = "bench"
+# Slower than baseline by this factor *and* by NOISE_FLOOR seconds counts as a regression
+TOLERANCE = 1.5
+NOISE_FLOOR = 0.005
+
+
+# ---------------------------
+# Stages: (name, setup(ctx) -> args, run(*args) -> output)
+# ---------------------------
+def _detect(files):
+    schema._resolve.cache_clear()
+    return [schema.mapping(kind, files[k]) for k, kind in KINDS.items()]
+
+
+def _read_mapped(files):
+    return [schema.read(files[k], kind) for k, kind in KINDS.items()]
+
+
+def _clean(files):
+    return [
+        ingest.youth_unemployment(files["f1"]),
+        ingest.skills_underemployment(files["f2"]),
+        ingest.time_underemployment(files["f3"]),
+        ingest.labour_force(files["f4"]),
+    ]
+
+
+def _merge_parts(files):
+    ingest.clear_caches()
+    return ingest.labour_force(files["f4"]), ingest.cpi_quarterly(files["f6"]), ingest.national_core(
+        files["f1"], files["f2"], files["f3"])
+
+
+def _merge(lf, cpi, nat):
+    return lf.merge(cpi, on=["state", "quarter"], how="outer").merge(nat, on="quarter", how="left")
+
+
+def _trim(merged):
+    common_q = ingest.common_quarters(merged)
+    return merged[merged["quarter"].isin(common_q)] if common_q is not None else merged
+
+
+def _cold(*caches):
+    def setup(ctx, *args):
+        ingest.clear_caches()
+        for c in caches:
+            c.clear()
+        return args
+    return setup
+
+
+def _correlations(df):
+    correlation._panels.clear()
+    correlation._results.clear()
+    window = min(8, len(df["quarter"].unique()))
+    return [correlation.rolling_corr(df, VERSION, window, by_state=True),
+            correlation.state_matrices(df, VERSION), correlation.lead_lag(df, VERSION)]
+
+
+def _forecast(df):
+    correlation._panels.clear()
+    forecast._fits.clear()
+    forecast._results.clear()
+    return forecast.project(df, VERSION)
+
+
+STAGES = [
+    ("read_csv", lambda c: (c["files"],), lambda files: [ingest._read(b) for b in files.values()]),
+    ("parse_dates", lambda c: (c["raw"]["f6"].copy(),), ingest._with_quarter),
+    ("read_csv_mapped", lambda c: (c["files"],), _read_mapped),
+    ("detect_columns", lambda c: (c["files"],), _detect),
+    ("clean_groupby", lambda c: _cold()(c, c["files"]), _clean),
+    ("cpi_quarterly", lambda c: _cold()(c, c["files"]["f6"]), ingest.cpi_quarterly),
+    ("merge", lambda c: _merge_parts(c["files"]), _merge),
+    ("build_merged_cold", lambda c: _cold()(c, *[c["files"][k] for k in CORE]), ingest.build_merged),
+    ("align_annual", lambda c: (c["merged"], ingest.read_annual(c["files"]["f5"], "productivity"),
+                                ingest.read_annual(c["files"]["f7"], "income_state")), ingest.join_annual),
+    ("trim", lambda c: (c["merged"],), _trim),
+    ("ymi", lambda c: (c["trimmed"], WEIGHTS), ymi.ymi),
+    ("ymi_sweep", lambda c: (c["national"], ymi.weight_grid(0.05)), ymi.sweep),
+    ("compact", lambda c: (c["trimmed"],), memory.compact),
+    ("page_cube", lambda c: (c["compact"],), aggregates.build_cube),
+    ("page_map_grid", lambda c: _cold(choropleth._grids)(c, c["compact"], "YMI", c["geom"], VERSION),
+     choropleth.metric_grid),
+    ("page_drivers_correlation", lambda c: (c["compact"],), _correlations),
+    ("page_forecast", lambda c: (c["compact"],), _forecast),
+    ("page_overview_chart", lambda c: _cold(charts._images)(c, "trends", c["national"], WEIGHTS, VERSION),
+     charts.chart_png),
+    ("page_overview_bullets", lambda c: _cold(llm_helper._bullets)(c, c["compact"]), llm_helper.compose_bullets_frame),
+]
+
+
+def _rows(out) -> int:
+    if isinstance(out, (pd.DataFrame, pd.Series)):
+        return len(out)
+    if isinstance(out, dict):
+        return len(out.get("values", out.get("slices", out)))
+    if isinstance(out, (list, tuple)):
+        return sum(_rows(o) for o in out) if all(isinstance(o, (pd.DataFrame, pd.Series)) for o in out) else len(out)
+    return 0
+
+
+def _rows_in(a) -> int:
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return len(a)
+    if isinstance(a, bytes):
+        return max(0, a.count(b"\n") - 1)
+    if isinstance(a, dict):
+        return sum(_rows_in(v) for v in a.values())
+    return 0
+
+
+def context(files: dict, geojson: bytes) -> dict:
+    ctx = {"files": files, "raw": {k: ingest._read(b) for k, b in files.items()}}
+    ingest.clear_caches()
+    ctx["merged"] = ingest.build_merged(*[files[k] for k in CORE])
+    ctx["trimmed"] = _trim(ctx["merged"])
+    ctx["compact"] = memory.compact(ctx["trimmed"])
+    ctx["national"] = aggregates.build_cube(ctx["compact"])["national"]
+    # Synthetic ADM1 boxes matching the generated states (the bundled file is country-level only)
+    ctx["geom"] = geo.prepare(geojson)
+    return ctx
+
+
+def measure(name, setup, run, ctx, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        args = setup(ctx)
+        t0 = time.perf_counter()
+        out = run(*args)
+        times.append(time.perf_counter() - t0)
+    args = setup(ctx)
+    tracemalloc.start()
+    run(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    rows_in = sum(_rows_in(a) for a in args)
+    return {"stage": name, "seconds_median": statistics.median(times), "seconds_min": min(times),
+            "peak_kb": round(peak / 1024, 1), "rows_in": rows_in, "rows_out": _rows(out)}
+
+
+def compare(results: list, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """Stages slower than the baseline run by more than `tolerance` (and the noise floor)."""
+    base = {r["stage"]: r for r in baseline.get("stages", [])}
+    slow = []
+    for r in results:
+        b = base.get(r["stage"])
+        if b is None:
+            continue
+        ratio = r["seconds_median"] / max(b["seconds_median"], 1e-9)
+        r["vs_baseline"] = round(ratio, 2)
+        if ratio > tolerance and r["seconds_median"] - b["seconds_median"] > NOISE_FLOOR:
+            slow.append(r["stage"])
+    return slow
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    add_size_args(ap)
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per stage (default: %(default)s)")
+    ap.add_argument("--stages", nargs="*", metavar="NAME", help="only these stages")
+    ap.add_argument("--out", default=os.path.join("benchmarks", "results", "latest.json"))
+    ap.add_argument("--baseline", help="earlier results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown factor (default: %(default)s)")
+    args = ap.parse_args(argv)
+
+    files = generate(**sizes(args))
+    ctx = context(files, states_geojson(args.states))
+    results = []
+    for name, setup, run in STAGES:
+        if args.stages and name not in args.stages:
+            continue
+        r = measure(name, setup, run, ctx, max(1, args.repeat))
+        results.append(r)
+        print(f"{name:<26} {r['seconds_median'] * 1000:9.2f} ms  peak {r['peak_kb']:10.1f} KB  "
+              f"rows {r['rows_in']:>9,} -> {r['rows_out']:,}")
+
+    slow = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            slow = compare(results, json.load(f), args.tolerance)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "sizes": sizes(args),
+        "input_bytes": {k: len(v) for k, v in files.items()},
+        "merged_rows": int(len(ctx["merged"])),
+        "environment": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                        "machine": platform.machine()},
+        "repeat": args.repeat,
+        "stages": results,
+        "regressions": slow,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"results: {args.out}")
+    if slow:
+        print(f"regressions vs {args.baseline}: {', '.join(slow)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
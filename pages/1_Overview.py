@@ -1,11 +1,18 @@
 
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from utils.llm_helper import compose_bullets
-from utils.report import export_policy_pdf
+from utils import forecast
+from utils.aggregates import get_cube
+from utils.charts import chart_figure, chart_png
+from utils.data_loader import resume_pending_dataset
+from utils.explainer import DEFAULT_URL, get_explainer
+from utils.llm_helper import FIELDS, compose_bullets, compose_bullets_frame
+from utils.report import bundle_pdf, bundle_zip, render_briefs, render_policy_pdf
+from utils.ymi import ymi
 
 st.header("Overview")
+# Still preparing the dataset the Home page submitted: show its progress, then continue
+resume_pending_dataset()
 
 if "df" not in st.session_state:
     st.warning("Upload the merged Excel on the Home page first.")
@@ -18,15 +25,12 @@ w_u = st.sidebar.slider("Youth Unemployment", 0.0, 1.0, 0.6, 0.05)
 w_s = st.sidebar.slider("Skills Underemployment", 0.0, 1.0, 0.3, 0.05)
 w_t = st.sidebar.slider("Time Underemployment", 0.0, 1.0, 0.1, 0.05)
 
-nat = df.groupby("quarter", as_index=False).agg({
-    "youth_unemp_rate":"mean",
-    "skills_underemp_rate":"mean",
-    "time_underemp_rate":"mean",
-    "u_rate":"mean",
-    "cpi_index":"mean",
-    "YMI":"mean"
-})
-nat["YMI_recomp"] = (w_u*nat["youth_unemp_rate"] + w_s*nat["skills_underemp_rate"] + w_t*nat["time_underemp_rate"]) / max(w_u+w_s+w_t, 1e-9)
+# National rollup is precomputed once per dataset version (utils/aggregates.py)
+cube = get_cube(df, st.session_state.get("data_version"))
+nat = cube["national"].copy()
+interactive = st.sidebar.toggle("Interactive charts (Plotly)", key="plotly_charts")
+
+nat["YMI_recomp"] = ymi(nat, (w_u, w_s, w_t))
 
 c1, c2, c3, c4 = st.columns(4)
 latest = nat.tail(1).squeeze()
@@ -35,26 +39,79 @@ c2.metric("Youth Unemp %", f"{latest['youth_unemp_rate']:.1f}")
 c3.metric("Skills Underemp %", f"{latest['skills_underemp_rate']:.1f}")
 c4.metric("Overall Unemp %", f"{latest['u_rate']:.1f}")
 
+# Projections are fitted on the forecast thread, once per dataset version for all sessions
+fut = forecast.project_async(df, cube["version"])
+proj = fut.result() if fut.done() and fut.exception() is None else None
+if proj is None:
+    if fut.done():
+        st.warning(f"Projections unavailable: {fut.exception()}")
+    else:
+        st.info("Projections loading… they will appear on the next rerun.")
+else:
+    nat_proj = proj[proj["state"] == forecast.NATIONAL].set_index("metric")
+    st.caption(f"Projection for {nat_proj['quarter'].iloc[0]} — AR({proj.attrs['order']}) per series, "
+               f"fitted through {proj.attrs['fitted_through']}; ranges are 95% intervals.")
+    labels = {"YMI": "YMI (projected)", "youth_unemp_rate": "Youth Unemp % (projected)",
+              "u_rate": "Overall Unemp % (projected)", "cpi_index": "CPI (projected)"}
+    for col, (metric, label) in zip(st.columns(4), labels.items()):
+        if metric not in nat_proj.index or pd.isna(nat_proj.at[metric, "forecast"]):
+            col.metric(label, "–")
+            continue
+        r = nat_proj.loc[metric]
+        col.metric(label, f"{r['forecast']:.1f}", f"{r['forecast'] - r['last']:+.1f}", delta_color="inverse",
+                   help=f"95% interval {r['lo95']:.1f} – {r['hi95']:.1f} (80%: {r['lo80']:.1f} – {r['hi80']:.1f})")
+
 st.subheader("National Trends")
-fig, ax = plt.subplots(figsize=(10,5))
-ax.plot(nat["quarter"], nat["u_rate"], label="Overall Unemployment")
-ax.plot(nat["quarter"], nat["youth_unemp_rate"], label="Youth Unemployment")
-ax.plot(nat["quarter"], nat["skills_underemp_rate"], label="Skills Underemployment")
-ax.plot(nat["quarter"], nat["time_underemp_rate"], label="Time Underemployment")
-ax.plot(nat["quarter"], nat["YMI_recomp"], label="YMI (weights)", linewidth=2)
-ax.set_xlabel("Quarter"); ax.set_ylabel("Rate / Index")
-ax.legend(); ax.grid(True); plt.xticks(rotation=45); st.pyplot(fig)
+# Rendered once per (dataset version, weights); reruns from other widgets reuse the image
+if interactive:
+    st.plotly_chart(chart_figure("trends", nat, (w_u, w_s, w_t), cube["version"]), key="trends_chart")
+else:
+    st.image(chart_png("trends", nat, (w_u, w_s, w_t), cube["version"]), use_container_width=True)
 
 st.subheader("LLM Explainer (bullets)")
 lang = st.radio("Language", ["ms","en"], horizontal=True)
+backend = st.radio("Explainer", ["template", "http"], horizontal=True,
+                   format_func=lambda b: "Built-in templates" if b == "template" else "Local model server")
+url, model = DEFAULT_URL, "local"
+if backend == "http":
+    url = st.text_input("Server URL (OpenAI-compatible)", DEFAULT_URL)
+    model = st.text_input("Model", "local")
+explainer = get_explainer(backend, url, model)
 sel_q = st.selectbox("Quarter", list(nat["quarter"]), index=len(nat)-1)
 row = nat[nat["quarter"]==sel_q].iloc[0].to_dict()
 row["quarter"] = sel_q
-bullets = compose_bullets(row, lang)
-st.text(bullets)
+
+# Other quarters are explained in one background batch so switching quarters is a cache hit
+others = nat[nat["quarter"] != sel_q].reindex(columns=["quarter"] + FIELDS).to_dict("records")
+if others:
+    explainer.explain_async(others, lang)
+
+box = st.empty()
+bullets = ""
+try:
+    for chunk in explainer.stream(row, lang):
+        bullets += chunk
+        box.text(bullets)
+except (OSError, ValueError, KeyError) as e:
+    # Unreachable server, or a malformed / non-JSON stream from it
+    st.warning(f"Model server unavailable ({e}); showing template bullets.")
+    bullets = compose_bullets(row, lang)
+    box.text(bullets)
 
 if st.button("Export PDF Brief"):
-    path = "policy_brief.pdf"
-    export_policy_pdf(path, f"Policy Brief — {sel_q}", bullets)
-    with open(path, "rb") as f:
-        st.download_button("Download PDF", f, file_name=f"policy_brief_{sel_q}.pdf")
+    # Rendered in memory: nothing is written to the server's working directory
+    pdf = render_policy_pdf(f"Policy Brief — {sel_q}", bullets)
+    st.download_button("Download PDF", pdf, file_name=f"policy_brief_{sel_q}.pdf", mime="application/pdf")
+
+with st.expander("Batch export: briefs for every quarter"):
+    bundle = st.radio("Format", ["Single PDF (one section per quarter)", "ZIP of PDFs"], horizontal=True)
+    if st.button("Build all briefs"):
+        items = [(f"Policy Brief — {q}", text) for q, text in zip(nat["quarter"], compose_bullets_frame(nat, lang))]
+        if bundle.startswith("Single"):
+            data, name, mime = bundle_pdf(items), "policy_briefs.pdf", "application/pdf"
+        else:
+            # Serial: no forking inside the server process (the CLI pipeline uses a process pool)
+            pdfs = render_briefs(items, processes=False)
+            data = bundle_zip({f"policy_brief_{q}.pdf": b for q, b in zip(nat["quarter"], pdfs)})
+            name, mime = "policy_briefs.zip", "application/zip"
+        st.download_button(f"Download {len(items)} briefs", data, file_name=name, mime=mime)
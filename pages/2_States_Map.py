@@ -1,98 +1,73 @@
 import streamlit as st
-import pandas as pd
-import json
 import plotly.express as px
+from utils import geo
+from utils.aggregates import get_cube
+from utils.choropleth import METRICS, animated_figure, metric_grid
+from utils.data_loader import resume_pending_dataset
 
 st.title("Malaysia States Choropleth")
+resume_pending_dataset()
 
-# 1) Load GeoJSON (from assets or upload)
-gj = None
+if "df" not in st.session_state:
+    st.warning("Upload the CSV files on the Home page first.")
+    st.stop()
+
+df = st.session_state["df"]
+version = st.session_state.get("data_version")
+cube = get_cube(df, version)
+version = cube["version"]
+
+# 1) Load GeoJSON (from assets or upload); parsed + simplified once per file (utils/geo.py)
+gj_bytes = None
 try:
-    with open("assets/malaysia_states.geojson", "r", encoding="utf-8") as f:
-        gj = json.load(f)
+    gj_bytes = geo.read_file()
 except Exception:
     pass
 
 upload_gj = st.file_uploader("Upload Malaysia states GeoJSON (optional)", type=["geojson","json"], key="gj_upload")
 if upload_gj is not None:
-    gj = json.load(upload_gj)
+    gj_bytes = upload_gj.getvalue()
+
+level = st.select_slider("Map detail", options=list(geo.TOLERANCES), value="medium")
+geom = None
+if gj_bytes:
+    try:
+        geom = geo.prepare(gj_bytes, level)
+    except Exception as e:
+        st.error(f"GeoJSON load error: {e}")
 
-if not gj:
-    st.warning("No GeoJSON found. Showing fallback bar chart.")
-    # Fallback demo data
-    df = pd.DataFrame({"state": ["Johor","Kedah"], "value": [10,20]})
-    st.bar_chart(df.set_index("state"))
+# 2) Metric from the merged state-quarter data
+metrics = [m for m in METRICS if m in df.columns and df[m].notna().any()]
+if not metrics:
+    st.error(f"None of the map metrics {list(METRICS)} are present in the data.")
     st.stop()
+metric = st.selectbox("Metric", metrics, format_func=lambda m: METRICS[m])
 
-# 2) Detect a suitable feature id key
-props = list(gj["features"][0]["properties"].keys())
-st.caption(f"GeoJSON property keys detected: {props}")
+# 3) Fall back to a bar chart when there is nothing state-level to draw
+if not geom or not geom["geojson"]["features"]:
+    st.warning("No state-level (ADM1) features found in the GeoJSON. Showing fallback bar chart.")
+    quarters = list(cube["slices"])
+    q = st.selectbox("Quarter", quarters, index=len(quarters) - 1)
+    d = cube["slices"][q]
+    fig = px.bar(d.sort_values(metric, ascending=False), x="state", y=metric,
+                 labels={metric: METRICS[metric], "state": "State"})
+    st.plotly_chart(fig, use_container_width=True)
+    st.stop()
 
-# Prefer shapeName if present
-if "shapeName" in props:
-    feature_id_key = "properties.shapeName"
-    name_key = "shapeName"
-elif "name" in props:
-    feature_id_key = "properties.name"
-    name_key = "name"
-elif "NAME_1" in props:
-    feature_id_key = "properties.NAME_1"
-    name_key = "NAME_1"
-else:
+# 4) Detected feature id key + canonical names from GeoJSON
+if geom["featureidkey"] is None:
     st.error("Couldn't find a suitable feature id key (e.g., shapeName/name/NAME_1).")
     st.stop()
+st.caption(f"GeoJSON name key: {geom['name_key']} · {len(geom['names'])} states"
+           + (f" · {geom['n_dropped']} non-state feature(s) dropped" if geom["n_dropped"] else ""))
 
-# 3) Extract canonical names from GeoJSON
-gj_names = sorted({feat["properties"][name_key] for feat in gj["features"]})
-st.write("GeoJSON state names:", gj_names)
-
-# 4) Your data — replace with your real dataframe
-#    Must have a column 'state' and a numeric column to visualize, e.g. 'value'
-df = pd.DataFrame({
-    "state": ["Johor","Kedah","Kelantan","Melaka","Negeri Sembilan","Pahang","Perak","Perlis",
-              "Pulau Pinang","Sabah","Sarawak","Selangor","Terengganu","W.P. Kuala Lumpur",
-              "W.P. Labuan","W.P. Putrajaya"],
-    "value": [5,3,4,6,5,7,8,2,5,6,7,9,4,10,1,2]
-})
-
-# 5) Normalize your state labels to match the GeoJSON labels
-#    Adjust the right-hand side to EXACTLY what your GeoJSON uses
-normalize = {
-    # Common variants — edit RHS to match your gj_names exactly
-    "Pulau Pinang": "Pulau Pinang",   # or "Penang" if your GeoJSON uses that
-    "Melaka": "Melaka",               # or "Malacca"
-    "W.P. Kuala Lumpur": "Wilayah Persekutuan Kuala Lumpur",
-    "W.P. Labuan": "Wilayah Persekutuan Labuan",
-    "W.P. Putrajaya": "Wilayah Persekutuan Putrajaya",
-    # If your GeoJSON already uses simple names ("Johor", etc.), leave them as-is:
-    "Johor": "Johor",
-    "Kedah": "Kedah",
-    "Kelantan": "Kelantan",
-    "Negeri Sembilan": "Negeri Sembilan",
-    "Pahang": "Pahang",
-    "Perak": "Perak",
-    "Perlis": "Perlis",
-    "Sabah": "Sabah",
-    "Sarawak": "Sarawak",
-    "Selangor": "Selangor",
-    "Terengganu": "Terengganu",
-}
-
-df["state_norm"] = df["state"].map(normalize).fillna(df["state"])
+# 5) Plot: geometry + per-quarter z arrays are prebuilt and cached per dataset version,
+#    so the quarter slider / Play button only swaps data on the client
+fig = animated_figure(df, metric, geom, version)
 
-# 6) Report any names still not matching the GeoJSON names
-unmatched = sorted(set(df["state_norm"]) - set(gj_names))
+# 6) Report any names that did not match the GeoJSON names (normalized via the precomputed index)
+unmatched = metric_grid(df, metric, geom, version)["unmatched"]
 if unmatched:
     st.warning(f"Some states didn’t match GeoJSON names and may not render: {unmatched}")
 
-# 7) Plot
-fig = px.choropleth(
-    df,
-    geojson=gj,
-    locations="state_norm",
-    featureidkey=feature_id_key,  # <-- critical line
-    color="value",
-    projection="mercator"
-)
-fig.update_geos(fitbounds="locations", visible=False)
 st.plotly_chart(fig, use_container_width=True)
@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
-import re
+from utils import forecast, quarter_index
+from utils.aggregates import get_cube
+from utils.data_loader import resume_pending_dataset
 
 st.header("League & Gaps")
+resume_pending_dataset()
 
 # ---- Guard: ensure data exists ----
 df = st.session_state.get("df")
@@ -21,26 +23,6 @@ for alt in ["State", "STATE", "negeri", "Negeri"]:
 if rename_map:
     df = df.rename(columns=rename_map)
 
-# Robust quarter sorting (no PeriodIndex)
-def quarter_sort_key(qstr: str):
-    if qstr is None:
-        return (9999, 9)
-    s = str(qstr).strip()
-    m = re.match(r"^(\d{4})\s*Q([1-4])$", s, flags=re.I)
-    if m:
-        return (int(m.group(1)), int(m.group(2)))
-    m = re.match(r"^Q([1-4])\D*(\d{4})$", s, flags=re.I)
-    if m:
-        return (int(m.group(2)), int(m.group(1)))
-    dt = pd.to_datetime(s, errors="coerce")
-    if pd.notna(dt):
-        q = ((dt.month - 1) // 3) + 1
-        return (dt.year, q)
-    m = re.search(r"(\d{4}).*?([1-4])", s)
-    if m:
-        return (int(m.group(1)), int(m.group(2)))
-    return (9999, 9)
-
 # Build quarters list safely
 if "quarter" not in df.columns:
     st.error("Couldn't find a 'quarter' column. Please check the upload/merge step on the Home page.")
@@ -48,9 +30,7 @@ if "quarter" not in df.columns:
 
 quarters = st.session_state.get("quarters")
 if not quarters:
-    quarter_strings = sorted({str(x) for x in df["quarter"].dropna().astype(str).tolist()},
-                             key=quarter_sort_key)
-    quarters = quarter_strings
+    quarters = quarter_index.sorted_labels(df["quarter"])
     st.session_state["quarters"] = quarters
 
 if len(quarters) == 0:
@@ -69,22 +49,34 @@ if missing:
 default_idx = max(0, len(quarters) - 1)
 q = st.selectbox("Quarter", quarters, index=default_idx)
 
-d = df[df["quarter"].astype(str) == q].copy()
-if d.empty:
+# Per-quarter slices and rankings are precomputed once per dataset version
+cube = get_cube(df, st.session_state.get("data_version"))
+d = cube["slices"].get(q)
+if d is None or d.empty:
     st.info(f"No rows found for {q}. Try another quarter or re-check your CSV coverage.")
     st.stop()
 
-# Gap = youth unemployment minus overall unemployment (pp)
-d["youth_gap"] = d["youth_unemp_rate"] - d["u_rate"]
-
 st.subheader("Rankings (Highest YMI first)")
-cols = ["state", "YMI", "youth_unemp_rate", "u_rate", "cpi_index"]
-st.dataframe(d[cols].sort_values("YMI", ascending=False).reset_index(drop=True),
-             use_container_width=True)
+st.dataframe(cube["rankings"][q], use_container_width=True)
 
 st.subheader("Youth vs Overall Unemployment Gap (percentage points)")
-gap = d[["state", "youth_gap"]].sort_values("youth_gap", ascending=False).reset_index(drop=True)
-st.dataframe(gap, use_container_width=True)
+# Gap = youth unemployment minus overall unemployment (pp)
+st.dataframe(cube["gaps"][q], use_container_width=True)
+
+# Per-state projections come from the shared forecast thread (fitted once per dataset version)
+fut = forecast.project_async(df, cube["version"])
+proj = fut.result() if fut.done() and fut.exception() is None else None
+if proj is None:
+    if fut.done():
+        st.warning(f"Projections unavailable: {fut.exception()}")
+    else:
+        st.info("Projections loading… they will appear on the next rerun.")
+else:
+    st.subheader(f"Next-quarter projection ({proj['quarter'].iloc[0]}, highest projected YMI first)")
+    st.dataframe(forecast.wide(proj).sort_values("YMI", ascending=False).reset_index(drop=True),
+                 use_container_width=True)
+    st.caption(f"AR({proj.attrs['order']}) per state and metric, fitted through "
+               f"{proj.attrs['fitted_through']}; low/high bounds are 95% intervals.")
 
 st.caption("Tip: If you expected different numbers, open the Home page and switch ON "
            "‘Trim to common quarter range’ to avoid NaNs from non-overlapping series.")
@@ -2,42 +2,78 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from utils import correlation, ymi
+from utils.aggregates import get_cube
+from utils.charts import chart_figure, chart_png
+from utils.data_loader import resume_pending_dataset
 
 st.header("Drivers & Correlations")
+resume_pending_dataset()
 
 if "df" not in st.session_state:
     st.warning("Upload the merged Excel on the Home page first.")
     st.stop()
 
 df = st.session_state["df"]
-nat = df.groupby("quarter", as_index=False).agg({
-    "youth_unemp_rate":"mean",
-    "skills_underemp_rate":"mean",
-    "time_underemp_rate":"mean",
-    "u_rate":"mean",
-    "cpi_index":"mean",
-    "YMI":"mean"
-})
+cube = get_cube(df, st.session_state.get("data_version"))
+nat = cube["national"]
+interactive = st.sidebar.toggle("Interactive charts (Plotly)", key="plotly_charts")
 
 st.subheader("Contributions to YMI (stack approx.)")
 w_u = st.slider("Weight: Youth Unemployment", 0.0, 1.0, 0.6, 0.05)
 w_s = st.slider("Weight: Skills Underemployment", 0.0, 1.0, 0.3, 0.05)
 w_t = st.slider("Weight: Time Underemployment", 0.0, 1.0, 0.1, 0.05)
 
-cont = nat.copy()
-cont["yu_c"] = w_u*cont["youth_unemp_rate"]
-cont["su_c"] = w_s*cont["skills_underemp_rate"]
-cont["tu_c"] = w_t*cont["time_underemp_rate"]
-
-fig, ax = plt.subplots(figsize=(10,5))
-ax.stackplot(cont["quarter"], cont["yu_c"], cont["su_c"], cont["tu_c"],
-             labels=["Youth Unemp","Skills Underemp","Time Underemp"], alpha=0.8)
-ax.plot(cont["quarter"], (cont["yu_c"]+cont["su_c"]+cont["tu_c"])/(max(w_u+w_s+w_t,1e-9)),
-        label="YMI (weights)", linewidth=2)
-ax.set_xlabel("Quarter"); ax.set_ylabel("Contribution / Index"); ax.legend(); ax.grid(True); plt.xticks(rotation=45)
-st.pyplot(fig)
+weights = (w_u, w_s, w_t)
+# Rendered once per (dataset version, weights); see utils/charts.py
+if interactive:
+    st.plotly_chart(chart_figure("contributions", nat, weights, cube["version"]), key="contributions_chart")
+else:
+    st.image(chart_png("contributions", nat, weights, cube["version"]), use_container_width=True)
 
 st.subheader("Correlation Matrix (national averages)")
-mat = cont[["YMI","youth_unemp_rate","skills_underemp_rate","time_underemp_rate","u_rate","cpi_index"]].corr()
+mat = nat[[c for c in correlation.METRICS if c in nat.columns]].corr()
 st.dataframe(mat.style.background_gradient(cmap="RdBu", axis=None))
+
+# Windowed / lagged / per-state correlations: every pair and state from one set of running sums,
+# cached per dataset version and window (utils/correlation.py)
+version = cube["version"]
+pnl = correlation.panel(df, version)
+metrics = pnl["metrics"]
+n_q = len(pnl["quarters"])
+
+st.subheader("Rolling Correlations")
+if n_q >= 4 and len(metrics) >= 2:
+    c1, c2, c3 = st.columns(3)
+    a = c1.selectbox("Metric A", metrics, index=metrics.index("cpi_index") if "cpi_index" in metrics else 0)
+    b = c2.selectbox("Metric B", metrics,
+                     index=metrics.index("youth_unemp_rate") if "youth_unemp_rate" in metrics else 1)
+    window = c3.slider("Window (quarters)", 4, max(5, n_q), min(8, n_q))
+    by_state = st.checkbox("One line per state", value=False)
+    st.line_chart(correlation.pair_series(correlation.rolling_corr(df, version, window, by_state), a, b))
+else:
+    st.info("Rolling correlations need at least 4 quarters.")
+
+st.subheader("Lead / Lag: CPI vs Youth Unemployment")
+if {"cpi_index", "youth_unemp_rate"} <= set(metrics):
+    max_lag = st.slider("Max lag (quarters)", 1, 8, 4)
+    ll = correlation.lead_lag(df, version, "cpi_index", "youth_unemp_rate", max_lag)
+    st.caption("Lag k > 0: CPI leads youth unemployment by k quarters; k < 0: CPI lags.")
+    st.bar_chart(ll.iloc[0].rename("correlation"))
+    st.dataframe(ll.style.background_gradient(cmap="RdBu", axis=None, vmin=-1, vmax=1).format("{:.2f}"))
+
+st.subheader("Per-State Correlation Matrix")
+mats = correlation.state_matrices(df, version)
+if mats:
+    state = st.selectbox("State", list(mats))
+    st.dataframe(mats[state].style.background_gradient(cmap="RdBu", axis=None, vmin=-1, vmax=1))
+
+st.subheader("Weight Sensitivity (all weight combinations)")
+step = st.select_slider("Grid step", options=[0.25, 0.1, 0.05], value=0.1)
+sw = ymi.sweep(nat, ymi.weight_grid(step), baseline=weights)
+st.caption(f"{len(sw['weights'])} weight scenarios evaluated. Ranks are quarters ordered by YMI (1 = worst).")
+st.dataframe(sw["summary"], use_container_width=True)
+stab = sw["stability"]
+c1, c2 = st.columns(2)
+c1.metric("Median rank correlation vs current weights", f"{stab['spearman_vs_baseline'].median():.2f}")
+c2.metric("Scenarios keeping the same worst quarter", f"{stab['same_top'].mean():.0%}")
@@ -0,0 +1,79 @@
+import streamlit as st
+import plotly.express as px
+from utils import districts, geo
+
+st.title("District Drilldown — Household Income")
+
+if st.session_state.get("income_district_annual") is None:
+    st.warning("Upload file 8 (Household Income by Administrative District) on the Home page first.")
+    st.stop()
+
+raw = st.session_state["income_district_annual"]
+try:
+    table = districts.district_table(raw)
+except ValueError as e:
+    st.error(str(e))
+    st.stop()
+version = districts.table_version(raw)
+
+# 1) District GeoJSON (assets/ or upload); states GeoJSON places districts lacking a state property.
+# No district boundaries ship with the app, so the map needs one of the two
+gj_bytes = districts.read_file()
+upload_gj = st.file_uploader("Upload Malaysia districts GeoJSON (ADM2, optional)", type=["geojson", "json"],
+                             key="district_gj_upload")
+if upload_gj is not None:
+    gj_bytes = upload_gj.getvalue()
+
+level = st.select_slider("Map detail", options=list(geo.TOLERANCES), value="medium", key="district_level")
+geom = None
+if gj_bytes:
+    try:
+        states_geom = geo.prepare(geo.read_file(), level)
+    except Exception:
+        states_geom = None
+    try:
+        geom = districts.prepare(gj_bytes, level, states_geom)
+    except Exception as e:
+        st.error(f"GeoJSON load error: {e}")
+
+# 2) Filters
+metrics = [m for m in districts.METRICS if m in table.columns and table[m].notna().any()]
+if not metrics:
+    st.info(f"File 8 has no values for {', '.join(districts.METRICS.values()).lower()}; nothing to show.")
+    st.stop()
+metric = st.selectbox("Metric", metrics, format_func=lambda m: districts.METRICS[m])
+states = sorted(table["state"].unique())
+state = st.selectbox("State", ["All states"] + states)
+state = None if state == "All states" else state
+
+# 3) Map: per-year layers are prebuilt per (table, geometry); the year slider swaps data client-side
+if geom and geom["geojson"]["features"]:
+    layer = districts.layers(table, geom, version)
+    st.caption(f"{len(geom['ids'])} district polygons · {layer['matched']} matched to file 8"
+               + (f" · state from {geom['state_source']}" if geom["state_source"] else ""))
+    st.plotly_chart(districts.figure(table, geom, version, metric, state), use_container_width=True)
+    if len(layer["unmatched"]):
+        with st.expander(f"{len(layer['unmatched'])} district(s) in file 8 not found in the GeoJSON"):
+            st.dataframe(layer["unmatched"], use_container_width=True)
+else:
+    st.info(f"The district map needs an ADM2 GeoJSON (e.g. geoBoundaries MYS ADM2), which is not bundled: "
+            f"upload one above or save it as {districts.DEFAULT_GEOJSON}. Showing a bar chart instead.")
+    years = sorted(table["year"].unique())
+    year = st.selectbox("Year", years, index=len(years) - 1)
+    d = table[(table["year"] == year) & ((table["state"] == state) if state else True)]
+    fig = px.bar(d.sort_values(metric, ascending=False), x="district", y=metric, color="state",
+                 labels={metric: districts.METRICS[metric], "district": "District"})
+    st.plotly_chart(fig, use_container_width=True)
+
+# 4) District -> state rollup (household-weighted when file 8 has household counts)
+st.subheader("State rollup")
+rolled = districts.rollup(table, version)
+weighted_by = table.attrs.get("weighted_by")
+st.caption(f"Weighted by ‘{weighted_by}’." if weighted_by else
+           "File 8 has no household counts, so districts are weighted equally.")
+st.dataframe(rolled[rolled["state"] == state] if state else rolled, use_container_width=True)
+
+compare = districts.compare_states(rolled, st.session_state.get("income_state_annual"))
+if not compare.empty:
+    with st.expander("Rollup vs Household Income by State (file 7)"):
+        st.dataframe(compare[compare["state"] == state] if state else compare, use_container_width=True)
@@ -0,0 +1,31 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Tests import `utils` and `benchmarks` from the repository root, as the app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate import generate  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def files():
+    """Small synthetic f1..f8 uploads (3 years, 4 states)."""
+    return generate(years=3, states=4, districts=2, divisions=2, seed=1)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    from utils import ingest
+    ingest.clear_caches()
+    yield
+
+
+def split_csv(data: bytes, cutoff: str) -> tuple:
+    """(rows dated before `cutoff`, rows from `cutoff` on) of a CSV upload, as CSV bytes."""
+    df = pd.read_csv(io.BytesIO(data))
+    late = df["date"] >= cutoff
+    return df[~late].to_csv(index=False).encode(), df[late].to_csv(index=False).encode()
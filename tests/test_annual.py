@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import ingest
+
+QUARTERS = pd.period_range("2017Q1", "2022Q4", freq="Q")
+
+
+@pytest.fixture
+def table():
+    return pd.DataFrame({
+        "date": ["2018-01-01", "2020-01-01", "2020-01-01", "2019-01-01", "2021-01-01"],
+        "state": ["A", "A", "A", "B", "B"],
+        "income_mean": [100.0, 200.0, 300.0, 50.0, np.nan],   # A/2020 duplicates average to 250
+    })
+
+
+def _reference(years, values, method):
+    """Per-quarter value for one group, one quarter at a time."""
+    anchors = (np.asarray(years, dtype=float) - 1970) * 4 + (1.5 if method == "interpolate" else 0.0)
+    out = []
+    for t in QUARTERS.asi8.astype(float):
+        if method == "ffill":
+            left = anchors[anchors <= t]
+            out.append(values[len(left) - 1] if len(left) else np.nan)
+        elif t < anchors[0]:
+            out.append(values[0] if anchors[0] - t <= 2 else np.nan)
+        else:
+            out.append(np.interp(t, anchors, values))
+    return np.array(out)
+
+
+@pytest.mark.parametrize("method", ["interpolate", "ffill"])
+def test_align_matches_per_group_reference(table, method):
+    got = ingest.align_annual(table, ["income_mean"], QUARTERS, by="state", method=method)
+    assert len(got) == 2 * len(QUARTERS)
+    a = got[got["state"] == "A"]["income_mean"].to_numpy()
+    b = got[got["state"] == "B"]["income_mean"].to_numpy()
+    np.testing.assert_allclose(a, _reference([2018, 2020], np.array([100.0, 250.0]), method), equal_nan=True)
+    # B's 2021 value is missing, so 2019 carries forward
+    np.testing.assert_allclose(b, _reference([2019], np.array([50.0]), method), equal_nan=True)
+
+
+def test_interpolate_anchors_mid_year(table):
+    got = ingest.align_annual(table, ["income_mean"], QUARTERS, by="state").set_index(["state", "quarter"])
+    s = got["income_mean"]
+    assert np.isnan(s[("A", pd.Period("2017Q2"))])          # more than two quarters before the first anchor
+    assert s[("A", pd.Period("2018Q1"))] == 100.0           # first year's early quarters take its value
+    # Anchors sit at 2018Q1 + 1.5 and 2020Q1 + 1.5; 2019Q3 is 4.5 of the 8 quarters between them
+    assert s[("A", pd.Period("2019Q3"))] == pytest.approx(100.0 + 150.0 * 4.5 / 8)
+    assert s[("A", pd.Period("2022Q4"))] == 250.0           # last value carries forward
+
+
+def test_align_without_groups():
+    t = pd.DataFrame({"date": ["2019-01-01", "2020-01-01"], "output_hour": [10.0, 14.0]})
+    got = ingest.align_annual(t, ["output_hour"], QUARTERS, method="ffill")
+    assert list(got.columns) == ["quarter", "output_hour"]
+    assert got.set_index("quarter")["output_hour"][pd.Period("2019Q4")] == 10.0
+
+
+def test_unknown_method(table):
+    with pytest.raises(ValueError):
+        ingest.align_annual(table, ["income_mean"], QUARTERS, method="cubic")
+
+
+def test_build_merged_joins_annual_columns(files):
+    core = [files[k] for k in ("f1", "f2", "f3", "f4", "f6")]
+    plain = ingest.build_merged(*core)
+    joined = ingest.build_merged(*core, files["f5"], files["f7"])
+    assert {"productivity", "income_mean", "income_median"} <= set(joined.columns)
+    assert len(joined) == len(plain)
+    pd.testing.assert_frame_equal(joined[plain.columns].astype({"state": str}), plain.astype({"state": str}))
+    assert joined["productivity"].notna().all()
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import llm_helper
+from utils.llm_helper import FIELDS, compose_bullets, compose_bullets_frame
+
+
+@pytest.fixture
+def ctx():
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.uniform(0, 150, (12, len(FIELDS))), columns=FIELDS)
+    df.insert(0, "quarter", [f"20{20 + i // 4}Q{i % 4 + 1}" for i in range(12)])
+    df.loc[1, "YMI"] = np.nan
+    df.loc[2, "u_rate"] = np.nan
+    df.loc[3, FIELDS] = np.nan
+    df.loc[5] = df.loc[4]                         # duplicate row: rendered once
+    df["cpi_index"] = df["cpi_index"].astype(object)
+    df.loc[6, "cpi_index"] = "n/a"                # non-numeric text counts as missing
+    df.loc[7, "cpi_index"] = pd.NA
+    return df
+
+
+@pytest.mark.parametrize("lang", ["ms", "en"])
+def test_frame_matches_single(ctx, lang):
+    llm_helper._bullets.clear()
+    got = compose_bullets_frame(ctx, lang)
+    assert list(got.index) == list(ctx.index)
+    assert got.tolist() == [compose_bullets(r, lang) for r in ctx.to_dict("records")]
+    # A second pass is served from the cache and gives the same text
+    assert compose_bullets_frame(ctx, lang).tolist() == got.tolist()
+
+
+def test_missing_values(ctx):
+    text = compose_bullets_frame(ctx, "en")
+    assert "YMI: –" in text[1]
+    assert "Overall unemployment" not in text[2]
+    assert text[3].count("\n") == 1               # head and policy line only
+    assert "CPI index" not in text[6] and "CPI index" not in text[7]
+
+
+def test_missing_columns():
+    ctx = pd.DataFrame({"quarter": ["2024Q1"], "YMI": [41.26]})
+    assert compose_bullets_frame(ctx, "en")[0] == compose_bullets({"quarter": "2024Q1", "YMI": 41.26}, "en")
+    assert compose_bullets({}, "en").startswith("• In -, YMI: –")
+
+
+def test_languages_are_cached_apart(ctx):
+    row = ctx.iloc[[0]]
+    assert compose_bullets_frame(row, "ms")[0] != compose_bullets_frame(row, "en")[0]
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import correlation
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=(3, 20, 3)).cumsum(axis=1)
+    v[1, 5, 0] = np.nan          # pairwise-complete handling
+    v[2, :3, 2] = np.nan
+    return v
+
+
+@pytest.mark.parametrize("window", [4, 8, 20])
+def test_rolling_matches_pandas(values, window):
+    got = correlation.rolling(values, window)
+    for g in range(values.shape[0]):
+        frame = pd.DataFrame(values[g])
+        for i in range(3):
+            for j in range(3):
+                want = frame[i].rolling(window, min_periods=window).corr(frame[j]).to_numpy()
+                # pandas needs `window` complete pairs as well
+                np.testing.assert_allclose(got[g, :, i, j], want, atol=1e-9, equal_nan=True)
+
+
+def test_matrices_match_pandas(values):
+    got = correlation.matrices(values)
+    for g in range(values.shape[0]):
+        want = pd.DataFrame(values[g]).corr(min_periods=3).to_numpy()
+        np.testing.assert_allclose(got[g], want, atol=1e-9)
+
+
+def test_lagged_matches_shifted_corr(values):
+    x, y = values[..., 0], values[..., 1]
+    got = correlation.lagged(x, y, max_lag=3)
+    for g in range(values.shape[0]):
+        for j, k in enumerate(range(-3, 4)):
+            want = pd.Series(x[g]).corr(pd.Series(y[g]).shift(-k), min_periods=3)
+            np.testing.assert_allclose(got[g, j], want, atol=1e-9)
+
+
+def test_panel_layout():
+    df = pd.DataFrame({"state": ["A", "A", "B", "B", "A"], "quarter": ["2020Q1", "2020Q2", "2020Q1", "2020Q2", "2020Q1"],
+                       "u_rate": [1.0, 2.0, 3.0, 4.0, 3.0]})
+    p = correlation.panel(df, "test-panel", ["u_rate"])
+    assert p["states"] == ["A", "B"] and p["quarters"] == ["2020Q1", "2020Q2"]
+    # Duplicate (state, quarter) rows are averaged; national is the mean over states
+    np.testing.assert_allclose(p["values"][..., 0], [[2.0, 2.0], [3.0, 4.0]])
+    np.testing.assert_allclose(p["national"][0, :, 0], [2.5, 3.0])
@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import ingest
+
+
+def _sorted(df):
+    df = df.astype({"state": str, "quarter": str})
+    return df.sort_values(["state", "quarter"]).reset_index(drop=True)[["state", "quarter", "cpi_index"]]
+
+
+def _assert_same(data, chunksize):
+    eager = ingest._cpi(data)
+    streamed = ingest._cpi_streaming(data, chunksize)
+    pd.testing.assert_frame_equal(_sorted(streamed), _sorted(eager), check_dtype=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize("chunksize", [7, 100, 10_000_000])
+def test_streamed_matches_eager(files, chunksize):
+    # 7 and 100 put chunk boundaries inside quarters; the last reads the file in one chunk
+    _assert_same(files["f6"], chunksize)
+
+
+def test_overall_rows_only_in_later_chunks(files):
+    # The first chunks hold no "overall" rows, so streaming starts out keeping every division
+    df = pd.read_csv(io.BytesIO(files["f6"]))
+    df = pd.concat([df[df["division"] != "overall"], df[df["division"] == "overall"]])
+    _assert_same(df.to_csv(index=False).encode(), 50)
+
+
+@pytest.mark.parametrize("drop", ["column", "overall"])
+def test_no_overall_division_uses_every_row(files, drop):
+    df = pd.read_csv(io.BytesIO(files["f6"]))
+    df = df.drop(columns="division") if drop == "column" else df[df["division"] != "overall"]
+    data = df.to_csv(index=False).encode()
+    _assert_same(data, 37)
+    means = df.groupby("state")["index"].mean()
+    got = ingest._cpi_streaming(data, 37).astype({"state": str})
+    # Every quarter averages the same rows as the whole-file mean (equal months per quarter)
+    np.testing.assert_allclose(got.groupby("state")["cpi_index"].mean().loc[means.index], means, rtol=1e-9)
+
+
+def test_partials_sum_and_count(files):
+    p = ingest.cpi_partials(files["f6"], chunksize=40)
+    df = pd.read_csv(io.BytesIO(files["f6"]))
+    overall = df[df["division"] == "overall"]
+    assert p["cpi_n"].sum() == len(overall)
+    np.testing.assert_allclose(p["cpi_sum"].sum(), overall["index"].sum())
+
+
+def test_empty_file_gives_empty_partials():
+    p = ingest.cpi_partials(b"state,date,division,index\n")
+    assert p.empty and list(p.columns) == ["state", "quarter", "cpi_sum", "cpi_n"]
+
+
+def test_cpi_quarterly_modes_agree(files):
+    streamed = ingest.cpi_quarterly(files["f6"], stream=True)
+    ingest.clear_caches()
+    eager = ingest.cpi_quarterly(files["f6"], stream=False)
+    pd.testing.assert_frame_equal(_sorted(streamed), _sorted(eager), check_dtype=False, rtol=1e-12)
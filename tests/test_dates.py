@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from utils import dates
+
+
+@pytest.mark.parametrize("values, fmt", [
+    (["2020-01-01", "2020-04-01", "2021-12-01"], "%Y-%m-%d"),
+    (["2020-01", "2020-04", "2021-12"], "%Y-%m"),
+    (["2020/01/15", "2020/07/01"], "%Y/%m/%d"),
+    (["15/01/2020", "01/07/2020", "31/12/2021"], "%d/%m/%Y"),   # day-first wins for DOSM dates
+    (["01/31/2020", "12/25/2021"], "%m/%d/%Y"),
+    (["Jan 2020", "Dec 2021"], "%b %Y"),
+    (["2019", "2020"], "%Y"),
+])
+def test_detect_format(values, fmt):
+    assert dates.detect_format(values) == fmt
+
+
+def test_detect_format_gives_up_on_noise():
+    assert dates.detect_format(["soon", "later", "2020-01-01"]) is None
+    assert dates.detect_format(["", None]) is None
+
+
+@pytest.mark.parametrize("values", [
+    ["2020-01-01", "2020-05-31", "2020-12-01", "2021-03-15"],
+    ["01/01/2020", "31/05/2020", "01/12/2020", "15/03/2021"],
+])
+def test_to_quarters_matches_pandas(values):
+    q, report = dates.to_quarters(values)
+    want = pd.to_datetime(values, dayfirst="/" in values[0]).to_period("Q")
+    assert list(q) == list(want)
+    assert report["failed"] == 0 and report["rows"] == len(values)
+
+
+def test_fixed_width_path_and_failures():
+    good = pd.date_range("2018-01-01", periods=24, freq="MS").strftime("%Y-%m-%d").tolist()
+    values = pd.Series(good + ["2020-13-01", "", None])
+    q, report = dates.to_quarters(values)
+    assert report["format"] == "%Y-%m-%d" and report["path"].startswith("fixed-width")
+    assert str(q[0]) == "2018Q1" and str(q[23]) == "2019Q4"
+    assert q[24:].isna().all()
+    assert report["failed"] == 1
+    # Blank and missing cells are not failures; an impossible month is
+    assert "2020-13-01" in report["failed_examples"] and "" not in report["failed_examples"]
+
+
+def test_explicit_format_skips_detection():
+    q, report = dates.to_quarters(["03/04/2020"], fmt="%m/%d/%Y")
+    assert str(q[0]) == "2020Q1" and report["format"] == "%m/%d/%Y"
+
+
+def test_merge_reports():
+    a = {"format": "%Y-%m-%d", "path": "fixed-width", "rows": 10, "failed": 1, "failed_examples": ["x"]}
+    b = {"format": "%Y-%m-%d", "path": "generic", "rows": 5, "failed": 2, "failed_examples": ["y", "z"]}
+    m = dates.merge_reports(dates.merge_reports(None, a), b)
+    assert m["rows"] == 15 and m["failed"] == 3 and m["path"] == "fixed-width+generic"
+    assert m["failed_examples"] == ["x", "y", "z"]
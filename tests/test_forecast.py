@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import forecast
+
+
+@pytest.fixture
+def y():
+    rng = np.random.default_rng(3)
+    y = np.empty((5, 40))
+    y[:, :2] = rng.normal(10, 1, (5, 2))
+    for t in range(2, 40):
+        y[:, t] = 2.0 + 0.5 * y[:, t - 1] + 0.2 * y[:, t - 2] + rng.normal(0, 0.3, 5)
+    y[1, 10] = np.nan                 # a gap inside the history
+    y[2, -2:] = np.nan                # trailing missing quarters
+    return y
+
+
+def _lstsq(series, order=forecast.ORDER):
+    x = np.column_stack([np.ones(len(series) - order)] +
+                        [series[order - k:len(series) - k] for k in range(1, order + 1)])
+    target = series[order:]
+    ok = ~np.isnan(x).any(axis=1) & ~np.isnan(target)
+    beta, *_ = np.linalg.lstsq(x[ok], target[ok], rcond=None)
+    resid = target[ok] - x[ok] @ beta
+    return beta, np.sqrt(resid @ resid / (ok.sum() - x.shape[1]))
+
+
+def test_batched_fit_matches_per_series_lstsq(y):
+    fit = forecast.solve(forecast.sufficient_stats(y))
+    for i in range(len(y)):
+        beta, sigma = _lstsq(y[i])
+        # solve() adds a tiny ridge to X'X, so agreement is close but not exact
+        np.testing.assert_allclose(fit["beta"][i], beta, rtol=1e-3)
+        np.testing.assert_allclose(fit["sigma"][i], sigma, rtol=1e-4)
+
+
+def test_incremental_update_matches_refit(y):
+    quarters = [f"q{t}" for t in range(y.shape[1])]
+    forecast._fits.clear()
+    forecast.fit(y[:, :-3], quarters[:-3], "inc")
+    inc = forecast.fit(y, quarters, "inc")
+    forecast._fits.clear()
+    full = forecast.fit(y, quarters, "full")
+    for k in ("xtx", "xty", "yty", "n"):
+        np.testing.assert_allclose(inc["stats"][k], full["stats"][k], rtol=1e-12)
+    np.testing.assert_allclose(inc["beta"], full["beta"], rtol=1e-10)
+
+
+def test_revised_history_refits(y):
+    quarters = [f"q{t}" for t in range(y.shape[1])]
+    forecast._fits.clear()
+    forecast.fit(y[:, :-1], quarters[:-1], "rev")
+    revised = y.copy()
+    revised[0, 5] += 1.0
+    got = forecast.fit(revised, quarters, "rev")
+    np.testing.assert_allclose(got["beta"], forecast.solve(forecast.sufficient_stats(revised))["beta"])
+
+
+def test_predict_one_step_and_gaps(y):
+    fit = forecast.solve(forecast.sufficient_stats(y))
+    mean, se = forecast.predict(y, fit["beta"], fit["sigma"], horizon=2)
+    b = fit["beta"][0]
+    step1 = b[0] + b[1] * y[0, -1] + b[2] * y[0, -2]
+    assert mean[0, 0] == pytest.approx(step1)
+    assert mean[0, 1] == pytest.approx(b[0] + b[1] * step1 + b[2] * y[0, -1])
+    assert se[0, 0] == pytest.approx(fit["sigma"][0])
+    assert se[0, 1] == pytest.approx(fit["sigma"][0] * np.sqrt(1 + b[1] ** 2))
+    # Series 2 ends two quarters early: its next quarter is a 3-step-ahead projection, so wider
+    assert np.isfinite(mean[2, 0]) and se[2, 0] > fit["sigma"][2]
+
+
+def test_short_series_gives_nan():
+    y = np.array([[1.0, 2.0, 3.0, np.nan, np.nan]])
+    fit = forecast.solve(forecast.sufficient_stats(y))
+    mean, se = forecast.predict(y, fit["beta"], fit["sigma"])
+    assert np.isnan(mean).all() and np.isnan(se).all()
+
+
+def test_project_frame():
+    quarters = [str(p) for p in pd.period_range("2015Q1", "2019Q4", freq="Q")]
+    rng = np.random.default_rng(0)
+    rows = [{"state": s, "quarter": q, "YMI": 20 + rng.normal(), "youth_unemp_rate": 10 + rng.normal(),
+             "u_rate": 3 + rng.normal(0, 0.2), "cpi_index": 100 + i + rng.normal()}
+            for s in ("A", "B") for i, q in enumerate(quarters)]
+    proj = forecast.project(pd.DataFrame(rows), "test-project")
+    assert len(proj) == 3 * len(forecast.METRICS)           # national + 2 states
+    assert set(proj["quarter"]) == {"2020Q1"} and proj.attrs["fitted_through"] == "2019Q4"
+    assert (proj["lo95"] < proj["lo80"]).all() and (proj["lo80"] < proj["forecast"]).all()
+    assert (proj["forecast"] < proj["hi80"]).all() and (proj["hi80"] < proj["hi95"]).all()
+    wide = forecast.wide(proj)
+    assert list(wide["state"]) == ["A", "B"] and "YMI 95% low" in wide.columns
+    assert forecast.project_async(pd.DataFrame(rows), "test-project").result() is proj
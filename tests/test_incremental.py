@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import split_csv
+from utils import incremental, ingest, pipeline, snapshot
+
+CUTOFF = "2012-10-01"  # the last generated quarter (2012Q4) arrives as a release
+COLS = ["youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate", "p_rate", "u_rate", "cpi_index", "YMI"]
+FILE = {"youth": "f1", "skills": "f2", "time": "f3", "cpi": "f6", "labour_force": "f4"}
+
+
+def _core(files, **override):
+    f = {**files, **override}
+    return [f[k] for k in ("f1", "f2", "f3", "f4", "f6")]
+
+
+def _sorted(df):
+    df = df.astype({"state": str, "quarter": str})
+    return df.sort_values(["quarter", "state"]).reset_index(drop=True)[["state", "quarter"] + COLS]
+
+
+@pytest.mark.parametrize("kind", incremental.KINDS)
+def test_append_matches_rebuild(files, kind):
+    key = FILE[kind]
+    history, release = split_csv(files[key], CUTOFF)
+    old = _core(files, **{key: history})
+    merged = ingest.build_merged(*old)
+    side = incremental.build_side(*old)
+
+    out, partials, labour, coverage, quarters = incremental.apply_release(
+        merged, side["partials"], ingest.coverage_table(merged), kind, release, labour=side["labour_force"])
+
+    assert quarters == ["2012Q4"]
+    full = ingest.build_merged(*_core(files))
+    pd.testing.assert_frame_equal(_sorted(out), _sorted(full), check_dtype=False, rtol=1e-9)
+    rebuilt = ingest.coverage_table(full).set_index("Metric")
+    assert (coverage.set_index("Metric")["Non-null rows"] == rebuilt.loc[coverage["Metric"], "Non-null rows"]).all()
+
+
+def test_append_to_trimmed_snapshot_matches_rebuild(files, tmp_path):
+    # The youth history stops a quarter early, so the saved (trimmed) snapshot lacks 2012Q4 entirely
+    history, release = split_csv(files["f1"], CUTOFF)
+    names = {"youth": "f1", "skills": "f2", "time": "f3", "labour_force": "f4", "cpi": "f6"}
+    old = pipeline.build({name: files[key] for name, key in names.items()} | {"youth": history})
+    assert "2012Q4" not in set(old["merged"]["quarter"].astype(str))
+    snapshot.write_snapshot(old["merged"], old["side"], path=str(tmp_path), data_version="old", trim=True)
+
+    summary = incremental.append_release("youth", release, path=str(tmp_path))
+
+    assert summary["quarters"] == ["2012Q4"]
+    got, side, _ = snapshot.read_snapshot(str(tmp_path))
+    full = pipeline.build({name: files[key] for name, key in names.items()})
+    pd.testing.assert_frame_equal(_sorted(got), _sorted(full["merged"]), check_dtype=False, check_categorical=False,
+                                  rtol=1e-6)
+    assert side["coverage"].equals(full["side"]["coverage"].astype(side["coverage"].dtypes.to_dict()))
+
+
+def test_partials_combine_to_full(files):
+    history, release = split_csv(files["f6"], CUTOFF)
+    combined = incremental.combine_partials(incremental.series_partials("cpi", history),
+                                            incremental.series_partials("cpi", release))
+    full = incremental.series_partials("cpi", files["f6"])
+    key = ["series", "state", "quarter"]
+    a = combined.astype({"quarter": str}).sort_values(key).reset_index(drop=True)
+    b = full.astype({"state": str, "quarter": str}).sort_values(key).reset_index(drop=True)
+    np.testing.assert_allclose(a["sum"], b["sum"])
+    assert (a["n"].to_numpy() == b["n"].to_numpy()).all()
+
+
+def test_unknown_kind_raises(files):
+    with pytest.raises(ValueError):
+        incremental.series_partials("bogus", files["f1"])
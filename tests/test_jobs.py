@@ -0,0 +1,86 @@
+import threading
+from types import MappingProxyType
+
+import pytest
+
+from utils import jobs, trace
+
+
+@pytest.fixture
+def service():
+    s = jobs.JobService(max_workers=2, max_results=2)
+    yield s
+    s._pool.shutdown(wait=True)
+
+
+def test_submit_publishes_read_only_result(service):
+    seen = []
+
+    def one(ctx):
+        with trace.stage("step_one"):
+            ctx["a"] = 1
+    steps = [("one", one), ("two", lambda ctx: seen.append(ctx["a"]) or ctx.update(b=2))]
+    job = service.submit("k", steps)
+    ds = job.result(timeout=10)
+    assert isinstance(ds, MappingProxyType) and ds["a"] == 1 and ds["b"] == 2 and ds["key"] == "k"
+    assert service.published("k") is ds and seen == [1]
+    assert job.progress() == (1.0, "Done") and job.steps is None
+    # The job's trace is entered on the worker thread, so its steps' stages land in it
+    assert [r["stage"] for r in job.trace.records()] == ["step_one"]
+
+
+def test_same_key_shares_one_job(service):
+    gate, runs = threading.Event(), []
+    steps = [("wait", lambda ctx: runs.append(1) or gate.wait(10))]
+    first = service.submit("k", steps)
+    second = service.submit("k", steps)
+    gate.set()
+    assert first is second and first.result(timeout=10) is second.result(timeout=10)
+    assert service.submit("k", steps) is first and runs == [1]
+
+
+def test_failed_job_is_retried(service):
+    calls = []
+
+    def flaky(ctx):
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("bad upload")
+    job = service.submit("k", [("flaky", flaky)])
+    with pytest.raises(ValueError):
+        job.result(timeout=10)
+    retry = service.submit("k", [("flaky", flaky)])
+    assert retry is not job and retry.result(timeout=10)["key"] == "k" and len(calls) == 2
+
+
+def test_follow_up_attached_once_and_kept_apart(service):
+    done = []
+
+    def then(fut):
+        done.append(fut)
+        service.submit(("k", "warm"), [("warm", lambda ctx: None)], store=service.warm)
+    job = service.submit("k", [("x", lambda ctx: None)], then=then)
+    job.result(timeout=10)
+    for _ in range(3):
+        service.submit("k", [("x", lambda ctx: None)], then=then)
+    service.job(("k", "warm")).result(timeout=10)
+    assert len(done) == 1
+    assert ("k", "warm") in service.warm and ("k", "warm") not in service.store and "k" in service.store
+
+
+def test_evicted_result_is_recomputed(service):
+    for key in ("a", "b", "c"):
+        service.submit(key, [("x", lambda ctx: None)]).result(timeout=10)
+    assert "a" not in service.store and "c" in service.store
+    again = service.submit("a", [("x", lambda ctx: None)])
+    assert again.result(timeout=10)["key"] == "a" and service.job("a") is again
+
+
+def test_submit_dataset(service, files):
+    job = service.submit_dataset(files, trim=True)
+    ds = job.result(timeout=60)
+    assert job.key == jobs.dataset_version(files, True) == ds["version"]
+    assert "merged" not in ds and len(ds["df"]) > 0 and ds["cube"] is not None
+    assert set(ds["df"]["quarter"].astype(str)) == {str(q) for q in ds["common_quarters"]}
+    assert service.submit_dataset(files, trim=True) is job
+    assert jobs.dataset_version(files, False) != job.key
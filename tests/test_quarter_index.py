@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import quarter_index as qi
+
+
+@pytest.mark.parametrize("text", ["2024Q1", "2024 Q1", "2024-q1", "Q1 2024", "q1-2024", " 2024Q1 ", "2024-02-15"])
+def test_label_spellings(text):
+    assert qi.ordinal([text])[0] == 2024 * 4
+
+
+def test_missing_and_unreadable_are_na():
+    o = qi.ordinal(["2020Q4", None, "not a quarter", np.nan])
+    assert o.tolist() == [2020 * 4 + 3, qi.NA, qi.NA, qi.NA]
+
+
+def test_dtypes_agree():
+    periods = pd.period_range("2019Q3", "2021Q2", freq="Q")
+    expected = np.array([p.year * 4 + p.quarter - 1 for p in periods])
+    labels = pd.Series([str(p) for p in periods])
+    for values in (pd.Series(periods), pd.Series(periods.to_timestamp()), labels, labels.astype("category")):
+        np.testing.assert_array_equal(qi.ordinal(values), expected)
+
+
+def test_period_round_trip():
+    periods = pd.period_range("1969Q2", "2031Q1", freq="Q")
+    back = qi.to_period(pd.Series(periods))
+    assert (back == periods).all()
+    assert qi.from_ordinals(qi.ordinal([str(p) for p in periods])).equals(periods)
+    assert pd.isna(qi.from_ordinals([qi.NA])[0])
+
+
+def test_from_year_month():
+    months = np.arange(1, 13)
+    np.testing.assert_array_equal(qi.from_year_month(np.full(12, 2020), months), 2020 * 4 + (months - 1) // 3)
+
+
+def test_labels_and_sorting():
+    mixed = ["2021Q1", "Q4 2020", "2020Q4", None, "2019 Q2"]
+    assert qi.sorted_labels(mixed) == ["2019Q2", "2020Q4", "2021Q1"]
+    assert qi.sort_labels(["2021Q1", "Q4 2020", "2019 Q2"]) == ["2019 Q2", "Q4 2020", "2021Q1"]
+    assert qi.label(2024 * 4 + 2) == "2024Q3" and qi.label(qi.NA) == ""
+
+
+def test_categorical_is_chronological():
+    s = pd.Series(["2021Q1", "2020Q2", None, "2020 Q2", "2019Q4"])
+    c = qi.categorical(s)
+    assert c.cat.ordered and list(c.cat.categories) == ["2019Q4", "2020Q2", "2021Q1"]
+    assert c.isna().tolist() == [False, False, True, False, False]
+    assert c.iloc[1] == c.iloc[3] == "2020Q2" and c.iloc[1] < c.iloc[0]
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from utils import ingest, schema
+
+
+def _csv(rows: list) -> bytes:
+    return ("\n".join(",".join(map(str, r)) for r in rows) + "\n").encode()
+
+
+def test_mapping_resolves_roles_and_dtypes():
+    data = _csv([["date", "state", "participation_rate", "unemployment_rate", "extra"],
+                 ["2020-01-01", "Johor", 70.1, 3.2, "x"]])
+    m = schema.mapping("labour_force", data)
+    assert m["columns"] == {"date": "date", "state": "state", "p_rate": "participation_rate",
+                            "u_rate": "unemployment_rate"}
+    assert "extra" not in m["usecols"]
+    assert m["dtype"]["state"] == "category" and m["dtype"]["unemployment_rate"] == "float64"
+
+
+def test_mapping_is_cached_per_header():
+    header = ["date", "state", "p_rate", "u_rate"]
+    schema.mapping("labour_force", _csv([header, ["2020-01-01", "Johor", 70, 3]]))
+    before = schema._resolve.cache_info().hits
+    schema.mapping("labour_force", _csv([header, ["2021-01-01", "Kedah", 65, 4]]))
+    assert schema._resolve.cache_info().hits == before + 1
+
+
+def test_mapping_errors():
+    with pytest.raises(ValueError):
+        schema.mapping("labour_force", _csv([["date", "state", "foo"], ["2020-01-01", "Johor", 1]]))
+    with pytest.raises(ValueError):
+        schema.mapping("nope", _csv([["date"], ["2020-01-01"]]))
+
+
+def test_read_renames_to_roles(files):
+    df = schema.read(files["f4"], "labour_force")
+    assert list(df.columns) == ["date", "state", "p_rate", "u_rate"]
+    assert isinstance(df["state"].dtype, pd.CategoricalDtype) and df["u_rate"].dtype == "float64"
+
+
+def test_fallback_coerces_only_measures():
+    # A non-numeric cell after the sniff sample forces the text read
+    rows = [["date", "state", "p_rate", "u_rate"]]
+    rows += [[f"2020-{m:02d}-01", "Johor", 70.0, 3.0] for m in range(1, 13)] * 20
+    rows += [["2021-01-01", "Kedah", 68.0, "-"]]
+    df = schema.read(_csv(rows), "labour_force")
+    assert df["date"].notna().all() and df["state"].notna().all()
+    assert isinstance(df["state"].dtype, pd.CategoricalDtype) and df["u_rate"].dtype == "float64"
+    assert df["u_rate"].isna().sum() == 1 and df.iloc[-1]["state"] == "Kedah"
+    # ... so the labour force rows keep their quarters and states instead of coming out empty
+    lf = ingest.labour_force_rows(_csv(rows))
+    assert len(lf) == len(rows) - 1 and lf["quarter"].notna().all() and lf["state"].notna().all()
+
+
+def test_sniff_handles_duplicate_names():
+    header, numeric = schema.sniff(_csv([["date", "x", "x"], ["2020-01-01", 1, 2]]))
+    assert header == ("date", "x", "x.1") and numeric == {"x", "x.1"}
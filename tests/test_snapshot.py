@@ -0,0 +1,67 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import incremental, ingest, snapshot
+
+
+@pytest.fixture
+def merged(files):
+    return ingest.build_merged(files["f1"], files["f2"], files["f3"], files["f4"], files["f6"])
+
+
+def test_round_trip_types_and_values(files, merged, tmp_path):
+    partials = incremental.build_partials(files["f1"], files["f2"], files["f3"], files["f6"])
+    snapshot.write_snapshot(merged, {"partials": partials}, path=str(tmp_path), data_version="v1", trim=True)
+
+    got, side, manifest = snapshot.read_snapshot(str(tmp_path))
+    assert manifest["version"] == snapshot.SNAPSHOT_VERSION
+    assert manifest["data_version"] == "v1" and manifest["trim"] is True and manifest["rows"] == len(merged)
+    assert isinstance(got["quarter"].dtype, pd.PeriodDtype)
+    assert isinstance(got["state"].dtype, pd.CategoricalDtype)
+    assert (got.dtypes[got.columns.drop(["state", "quarter"])] == np.float32).all()
+    np.testing.assert_allclose(got["YMI"], merged["YMI"].astype(np.float32))
+    assert (got["quarter"].astype(str) == merged["quarter"].astype(str)).all()
+    # Running sums keep full precision
+    assert side["partials"]["sum"].dtype == np.float64
+    np.testing.assert_array_equal(side["partials"]["sum"], partials["sum"])
+
+
+def test_rewrite_removes_old_tables(merged, tmp_path):
+    path = str(tmp_path)
+    snapshot.write_snapshot(merged, {"coverage": ingest.coverage_table(merged)}, path=path, data_version="v1")
+    snapshot.write_snapshot(merged.head(3), path=path, data_version="v2")
+    manifest = snapshot.read_manifest(path)
+    assert sorted(os.listdir(path)) == sorted([snapshot.MANIFEST] + list(manifest["tables"].values()))
+    got, side, _ = snapshot.read_snapshot(path)
+    assert len(got) == 3 and side == {} and manifest["data_version"] == "v2"
+
+
+def test_failed_write_keeps_previous_snapshot(merged, tmp_path, monkeypatch):
+    path = str(tmp_path)
+    snapshot.write_snapshot(merged, path=path, data_version="v1")
+
+    def boom(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr(json, "dump", boom)
+    with pytest.raises(OSError):
+        snapshot.write_snapshot(merged.head(3), path=path, data_version="v2")
+    monkeypatch.undo()
+    got, _, manifest = snapshot.read_snapshot(path)
+    assert manifest["data_version"] == "v1" and len(got) == len(merged)
+
+
+def test_unsupported_version_is_rejected(merged, tmp_path):
+    path = str(tmp_path)
+    snapshot.write_snapshot(merged, path=path)
+    with open(os.path.join(path, snapshot.MANIFEST), "r+", encoding="utf-8") as f:
+        manifest = json.load(f)
+        manifest["version"] = snapshot.SNAPSHOT_VERSION + 1
+        f.seek(0)
+        json.dump(manifest, f)
+        f.truncate()
+    with pytest.raises(ValueError):
+        snapshot.read_snapshot(path)
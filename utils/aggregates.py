@@ -0,0 +1,59 @@
+import pandas as pd
+
+from utils import quarter_index, trace
+from utils.ingest import LRUCache
+
+METRICS = ["youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate", "u_rate", "cpi_index", "YMI",
+           "income_mean", "income_median", "productivity"]
+RANK_COLS = ["state", "YMI", "youth_unemp_rate", "u_rate", "cpi_index"]
+# Shown in the rankings too when files 5 / 7 were joined on
+RANK_EXTRA = ["income_mean", "productivity"]
+
+# One cube per dataset version, shared by every session and page in the process
+_cubes = LRUCache(max_entries=8)
+
+
+def frame_version(df: pd.DataFrame) -> str:
+    """Fallback version for frames that did not come through ingest (e.g. the Excel loader)."""
+    return "frame:" + str(int(pd.util.hash_pandas_object(df, index=False).sum()))
+
+
+def build_cube(df: pd.DataFrame) -> dict:
+    """Precompute everything the pages look up per quarter.
+
+    - national: mean of each metric by quarter (the Overview / Drivers rollup)
+    - slices:   quarter -> that quarter's state rows
+    - rankings: quarter -> state rows sorted by YMI (highest first)
+    - gaps:     quarter -> youth minus overall unemployment by state (largest first)
+    """
+    # Grouping on the ordered categorical keys on integer codes and yields quarters in time order
+    df = df.assign(quarter=quarter_index.categorical(df["quarter"]))
+    metrics = [c for c in METRICS if c in df.columns]
+    national = df.groupby("quarter", as_index=False, observed=True)[metrics].mean()
+    national["quarter"] = national["quarter"].astype(str)
+
+    slices, rankings, gaps = {}, {}, {}
+    for q, d in df.groupby("quarter", observed=True):
+        d = d.reset_index(drop=True)
+        slices[q] = d
+        if all(c in d.columns for c in RANK_COLS):
+            cols = RANK_COLS + [c for c in RANK_EXTRA if c in d.columns]
+            rankings[q] = d[cols].sort_values("YMI", ascending=False).reset_index(drop=True)
+            gap = d[["state"]].assign(youth_gap=d["youth_unemp_rate"] - d["u_rate"])
+            gaps[q] = gap.sort_values("youth_gap", ascending=False).reset_index(drop=True)
+    return {"national": national, "slices": slices, "rankings": rankings, "gaps": gaps}
+
+
+def get_cube(df: pd.DataFrame, version: str = None) -> dict:
+    """Cube for `df`, rebuilt only when the dataset version changes. Treat it as read-only."""
+    if version is None:
+        version = frame_version(df)
+    with trace.stage("cube", rows_in=len(df)) as s:
+        cube = _cubes.get(version)
+        s.cache = "miss" if cube is None else "hit"
+        if cube is None:
+            cube = build_cube(df)
+            cube["version"] = version
+            _cubes.put(version, cube)
+        s.rows_out = len(cube["national"])
+    return cube
@@ -0,0 +1,125 @@
+"""Cached chart rendering for the Overview and Drivers pages.
+
+Matplotlib charts are rasterized once per (data version, weights, chart type) and
+kept as PNG bytes in a bounded LRU, so reruns triggered by unrelated widgets reuse
+the image. Figures are built with the object API (never registered with pyplot)
+and closed as soon as they are saved.
+
+The optional Plotly path caches the weight-independent traces per (data version,
+chart type); a weights change only replaces the YMI trace's y values.
+"""
+import io
+
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+
+from utils import ymi
+from utils.ingest import LRUCache
+
+TREND_SERIES = [
+    ("u_rate", "Overall Unemployment"),
+    ("youth_unemp_rate", "Youth Unemployment"),
+    ("skills_underemp_rate", "Skills Underemployment"),
+    ("time_underemp_rate", "Time Underemployment"),
+]
+CONTRIB_LABELS = ["Youth Unemp", "Skills Underemp", "Time Underemp"]
+DPI = 150
+
+_images = LRUCache(max_entries=64)
+_bases = LRUCache(max_entries=16)
+
+
+def _key(version, weights, chart):
+    return (version, tuple(round(float(w), 6) for w in weights), chart)
+
+
+def _png(fig: Figure) -> bytes:
+    buf = io.BytesIO()
+    try:
+        fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+    finally:
+        fig.clf()
+    return buf.getvalue()
+
+
+def _frame(ax, ylabel):
+    ax.set_xlabel("Quarter"); ax.set_ylabel(ylabel)
+    ax.legend(); ax.grid(True); ax.tick_params(axis="x", labelrotation=45)
+
+
+# ---------------------------
+# Matplotlib -> cached PNG
+# ---------------------------
+def _draw_trends(nat, weights) -> bytes:
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    for col, label in TREND_SERIES:
+        ax.plot(nat["quarter"], nat[col], label=label)
+    ax.plot(nat["quarter"], ymi.ymi(nat, weights), label="YMI (weights)", linewidth=2)
+    _frame(ax, "Rate / Index")
+    return _png(fig)
+
+
+def _draw_contributions(nat, weights) -> bytes:
+    cont = ymi.contributions(nat, weights)
+    fig = Figure(figsize=(10, 5))
+    ax = fig.subplots()
+    ax.stackplot(nat["quarter"], *(cont[c] for c in cont.columns), labels=CONTRIB_LABELS, alpha=0.8)
+    ax.plot(nat["quarter"], ymi.ymi(nat, weights), label="YMI (weights)", linewidth=2)
+    _frame(ax, "Contribution / Index")
+    return _png(fig)
+
+
+_DRAW = {"trends": _draw_trends, "contributions": _draw_contributions}
+
+
+def chart_png(chart: str, nat, weights, version: str) -> bytes:
+    """PNG of a national chart ("trends" or "contributions"), rendered once per key."""
+    key = _key(version, weights, chart)
+    png = _images.get(key)
+    if png is None:
+        png = _DRAW[chart](nat, weights)
+        _images.put(key, png)
+    return png
+
+
+# ---------------------------
+# Plotly (client-side) path
+# ---------------------------
+def _base_trends(nat) -> go.Figure:
+    fig = go.Figure([go.Scatter(x=nat["quarter"], y=nat[col], name=label, mode="lines")
+                     for col, label in TREND_SERIES])
+    fig.add_scatter(x=nat["quarter"], y=[], name="YMI (weights)", mode="lines", line_width=3)
+    fig.update_layout(xaxis_title="Quarter", yaxis_title="Rate / Index", hovermode="x unified")
+    return fig
+
+
+def _base_contributions(nat) -> go.Figure:
+    fig = go.Figure([go.Scatter(x=nat["quarter"], y=[], name=label, mode="lines", stackgroup="c")
+                     for label in CONTRIB_LABELS])
+    fig.add_scatter(x=nat["quarter"], y=[], name="YMI (weights)", mode="lines", line_width=3)
+    fig.update_layout(xaxis_title="Quarter", yaxis_title="Contribution / Index", hovermode="x unified")
+    return fig
+
+
+_BASE = {"trends": _base_trends, "contributions": _base_contributions}
+
+
+def chart_figure(chart: str, nat, weights, version: str) -> go.Figure:
+    """Plotly version of chart_png: cached base traces, only weight-dependent y values refreshed."""
+    base = _bases.get((version, chart))
+    if base is None:
+        base = _BASE[chart](nat)
+        _bases.put((version, chart), base)
+    fig = go.Figure(base)
+    if chart == "contributions":
+        cont = ymi.contributions(nat, weights)
+        for trace, c in zip(fig.data, cont.columns):
+            trace.y = cont[c].to_numpy()
+    fig.data[-1].y = ymi.ymi(nat, weights).to_numpy()
+    return fig
+
+
+def clear():
+    _images.clear()
+    _bases.clear()
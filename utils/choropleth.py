@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils import geo, quarter_index
+from utils.ingest import LRUCache
+
+METRICS = {
+    "YMI": "Youth Mismatch Index",
+    "u_rate": "Unemployment rate (%)",
+    "p_rate": "Participation rate (%)",
+    "cpi_index": "CPI index",
+    "youth_unemp_rate": "Youth unemployment (%)",
+    "income_mean": "Household income, mean (RM)",
+}
+
+_grids = LRUCache(max_entries=32)
+_figures = LRUCache(max_entries=16)
+
+
+def metric_grid(df: pd.DataFrame, metric: str, geom: dict, version: str) -> dict:
+    """State x quarter array of one metric, with rows in GeoJSON name order.
+
+    Built once per (dataset version, metric, geometry) so that switching quarters
+    only picks a column out of an existing array.
+    """
+    key = (version, metric, geom["key"])
+    hit = _grids.get(key)
+    if hit is not None:
+        return hit
+    d = df[["state", "quarter", metric]].assign(
+        state=geo.normalize_states(df["state"], geom["name_index"]),
+        quarter=df["quarter"].astype(str),
+    )
+    wide = d.pivot_table(index="state", columns="quarter", values=metric, aggfunc="mean", observed=True)
+    quarters = quarter_index.sort_labels(wide.columns)
+    wide = wide.reindex(index=geom["names"], columns=quarters)
+    values = wide.to_numpy(dtype=np.float64)
+    grid = {
+        "locations": geom["names"],
+        "quarters": quarters,
+        "values": values,
+        "zmin": float(np.nanmin(values)) if np.isfinite(values).any() else 0.0,
+        "zmax": float(np.nanmax(values)) if np.isfinite(values).any() else 1.0,
+        "unmatched": geo.unmatched(d["state"], geom["names"]),
+    }
+    _grids.put(key, grid)
+    return grid
+
+
+def _trace(grid, j, geom=None, label="", colorscale="Reds"):
+    z = grid["values"][:, j]
+    kwargs = dict(locations=grid["locations"], z=z, zmin=grid["zmin"], zmax=grid["zmax"])
+    if geom is not None:
+        kwargs.update(geojson=geom["geojson"], featureidkey=geom["featureidkey"],
+                      colorscale=colorscale, colorbar_title=label, marker_line_width=0.5)
+    return go.Choropleth(**kwargs)
+
+
+def frames_figure(grid: dict, geom: dict, label: str, frames: str = "quarters", prefix: str = "Quarter: ",
+                  colorscale: str = "Reds") -> go.Figure:
+    """Choropleth of `grid["values"]` (location x frame) with one Plotly frame per column.
+
+    The geometry is attached to the base trace only; each frame carries just its z
+    array. Opens on the last frame.
+    """
+    labels = grid[frames]
+    j0 = len(labels) - 1
+    fig = go.Figure(
+        data=[_trace(grid, j0, geom, label, colorscale)],
+        frames=[go.Frame(data=[_trace(grid, j)], name=q) for j, q in enumerate(labels)],
+    )
+    steps = [
+        {"label": q, "method": "animate",
+         "args": [[q], {"mode": "immediate", "frame": {"duration": 0, "redraw": True}, "transition": {"duration": 0}}]}
+        for q in labels
+    ]
+    fig.update_layout(
+        margin={"l": 0, "r": 0, "t": 30, "b": 0},
+        sliders=[{"active": j0, "steps": steps, "currentvalue": {"prefix": prefix}}],
+        updatemenus=[{
+            "type": "buttons", "direction": "left", "x": 0, "y": 0, "xanchor": "left", "yanchor": "top",
+            "buttons": [
+                {"label": "▶ Play", "method": "animate",
+                 "args": [None, {"frame": {"duration": 600, "redraw": True}, "fromcurrent": True}]},
+                {"label": "⏸ Pause", "method": "animate",
+                 "args": [[None], {"mode": "immediate", "frame": {"duration": 0, "redraw": False}}]},
+            ],
+        }],
+    )
+    fig.update_geos(fitbounds="locations", visible=False, projection_type="mercator")
+    return fig
+
+
+def animated_figure(df: pd.DataFrame, metric: str, geom: dict, version: str) -> go.Figure:
+    """Choropleth with one Plotly frame per quarter and a play/scrub slider.
+
+    The geometry is attached to the base trace only; each frame carries just that
+    quarter's z array, so scrubbing swaps data client-side without a rerun.
+    The figure is cached per (dataset version, metric, geometry) and opens on the
+    latest quarter.
+    """
+    grid = metric_grid(df, metric, geom, version)
+    key = (version, metric, geom["key"])
+    hit = _figures.get(key)
+    if hit is not None:
+        return hit
+    fig = frames_figure(grid, geom, METRICS.get(metric, metric))
+    _figures.put(key, fig)
+    return fig
@@ -0,0 +1,156 @@
+"""Windowed correlation engine for the Drivers & Correlations page.
+
+The merged frame is laid out once as a (group, quarter, metric) array. Rolling
+correlations for every metric pair and every group come from one set of cumulative
+sums (count, sum x, sum y, sum x², sum y², sum xy per pair, pairwise-complete), so a
+window is a difference of two cumulative rows instead of a pandas rolling().corr()
+per pair and state. Results are cached per (dataset version, window).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils import quarter_index
+from utils.ingest import LRUCache
+
+METRICS = ["YMI", "youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate", "u_rate", "cpi_index",
+           "income_mean", "productivity"]
+NATIONAL = "Malaysia (national mean)"
+
+_panels = LRUCache(max_entries=8)
+_results = LRUCache(max_entries=64)
+
+
+def _cached(cache, key, build):
+    hit = cache.get(key)
+    if hit is None:
+        hit = build()
+        cache.put(key, hit)
+    return hit
+
+
+# ---------------------------
+# Layout
+# ---------------------------
+def panel(df: pd.DataFrame, version: str, metrics=METRICS) -> dict:
+    """State x quarter x metric array (mean of duplicate rows), plus the national mean as its own panel."""
+    metrics = [m for m in metrics if m in df.columns]
+
+    def build():
+        q = quarter_index.categorical(df["quarter"])
+        s = df["state"].astype("category")
+        qc, sc = q.cat.codes.to_numpy(), s.cat.codes.to_numpy()
+        ok = (qc >= 0) & (sc >= 0)
+        shape = (len(s.cat.categories), len(q.cat.categories), len(metrics))
+        x = df[metrics].to_numpy(dtype=np.float64)[ok]
+        sums, counts = np.zeros(shape), np.zeros(shape)
+        np.add.at(sums, (sc[ok], qc[ok]), np.nan_to_num(x))
+        np.add.at(counts, (sc[ok], qc[ok]), ~np.isnan(x))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = sums / counts
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            national = np.nanmean(values, axis=0, keepdims=True)
+        return {"states": list(s.cat.categories), "quarters": list(q.cat.categories), "metrics": metrics,
+                "values": values, "national": national}
+
+    return _cached(_panels, (version, tuple(metrics)), build)
+
+
+# ---------------------------
+# Kernels (pure NumPy)
+# ---------------------------
+def _window_sums(values: np.ndarray, window: int) -> tuple:
+    """Pairwise-complete windowed sums for every (i, j) metric pair: n, sx, sy, sxx, syy, sxy."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # Centre each series first so the running sums do not lose precision by cancellation
+        x = values - np.nanmean(values, axis=1, keepdims=True)
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0.0)
+    v = (valid[..., :, None] & valid[..., None, :]).astype(np.float64)      # (G, T, M, M)
+    xi, xj = x[..., :, None] * v, x[..., None, :] * v
+    stacked = np.stack([v, xi, xj, xi * xi, xj * xj, xi * xj])             # (6, G, T, M, M)
+    c = np.cumsum(stacked, axis=2)
+    c = np.concatenate([np.zeros_like(c[:, :, :1]), c], axis=2)
+    w = c[:, :, window:] - c[:, :, :-window]                                # windows ending at t >= window-1
+    return tuple(w)
+
+
+def _corr_from_sums(n, sx, sy, sxx, syy, sxy, min_periods):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        r = cov / np.sqrt(var)
+    r[(n < min_periods) | ~(var > 1e-12)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def rolling(values: np.ndarray, window: int, min_periods: int = None) -> np.ndarray:
+    """(G, T, M, M) rolling correlation; rows before the first full window are NaN."""
+    g, t, m = values.shape
+    window = max(2, min(int(window), t))
+    out = np.full((g, t, m, m), np.nan)
+    out[:, window - 1:] = _corr_from_sums(*_window_sums(values, window), min_periods or window)
+    return out
+
+
+def matrices(values: np.ndarray, min_periods: int = 3) -> np.ndarray:
+    """(G, M, M) correlation over the whole period (pairwise-complete)."""
+    return _corr_from_sums(*(s[:, 0] for s in _window_sums(values, values.shape[1])), min_periods)
+
+
+def lagged(x: np.ndarray, y: np.ndarray, max_lag: int, min_periods: int = 3) -> np.ndarray:
+    """(G, 2L+1) correlation of x[t] with y[t+k] for k = -L..L (k > 0: x leads y)."""
+    t = x.shape[1]
+    out = np.full((x.shape[0], 2 * max_lag + 1), np.nan)
+    for j, k in enumerate(range(-max_lag, max_lag + 1)):
+        if abs(k) >= t:
+            continue
+        a, b = (x[:, :t - k], y[:, k:]) if k >= 0 else (x[:, -k:], y[:, :t + k])
+        pair = np.stack([a, b], axis=-1)                                     # (G, T-|k|, 2)
+        out[:, j] = matrices(pair, min_periods)[:, 0, 1]
+    return out
+
+
+# ---------------------------
+# Cached, labelled results
+# ---------------------------
+def _values(p: dict, by_state: bool) -> tuple:
+    return (p["values"], p["states"]) if by_state else (p["national"], [NATIONAL])
+
+
+def rolling_corr(df: pd.DataFrame, version: str, window: int, by_state: bool = False) -> dict:
+    """Rolling correlation of every metric pair, for the national mean or every state at once."""
+    p = panel(df, version)
+    values, groups = _values(p, by_state)
+    corr = _cached(_results, (version, "rolling", int(window), by_state), lambda: rolling(values, window))
+    return {"groups": groups, "quarters": p["quarters"], "metrics": p["metrics"], "corr": corr}
+
+
+def pair_series(result: dict, a: str, b: str) -> pd.DataFrame:
+    """One metric pair out of rolling_corr as a quarter x group frame."""
+    i, j = result["metrics"].index(a), result["metrics"].index(b)
+    return pd.DataFrame(result["corr"][:, :, i, j].T, index=result["quarters"], columns=result["groups"])
+
+
+def state_matrices(df: pd.DataFrame, version: str) -> dict:
+    """Full-period correlation matrix per state: {state: metric x metric frame}."""
+    p = panel(df, version)
+    corr = _cached(_results, (version, "states"), lambda: matrices(p["values"]))
+    return {s: pd.DataFrame(corr[g], index=p["metrics"], columns=p["metrics"]) for g, s in enumerate(p["states"])}
+
+
+def lead_lag(df: pd.DataFrame, version: str, x: str = "cpi_index", y: str = "youth_unemp_rate",
+             max_lag: int = 4) -> pd.DataFrame:
+    """corr(x[t], y[t+k]) for k = -max_lag..max_lag; one row for the national mean, then one per state."""
+    p = panel(df, version)
+    i, j = p["metrics"].index(x), p["metrics"].index(y)
+
+    def build():
+        v = np.concatenate([p["national"], p["values"]])
+        return lagged(v[..., i], v[..., j], max_lag)
+
+    r = _cached(_results, (version, "lag", x, y, int(max_lag)), build)
+    return pd.DataFrame(r, index=[NATIONAL] + p["states"], columns=list(range(-max_lag, max_lag + 1)))
@@ -1,20 +1,87 @@
 import io
+import time
 import pandas as pd
 import streamlit as st
+import numpy as np
+from utils import aggregates, ingest, jobs, memory, snapshot
+
+POLL_SECONDS = 0.1
 
 @st.cache_data
 def load_merged_excel(file_bytes: bytes) -> pd.DataFrame:
     return pd.read_excel(io.BytesIO(file_bytes))
 
-def ensure_session_data(uploaded_file):
-    df = load_merged_excel(uploaded_file.read())
-    if "quarter" in df.columns:
-        df["quarter"] = df["quarter"].astype(str)
-    for col in ["YMI","youth_unemp_rate","skills_underemp_rate","time_underemp_rate",
-                "p_rate","u_rate","cpi_index","state"]:
-        if col not in df.columns:
-            df[col] = pd.NA
+def _store_session(df: pd.DataFrame, version: str = None):
+    missing = {col: (pd.NA if col == "state" else np.nan)
+               for col in ["YMI","youth_unemp_rate","skills_underemp_rate","time_underemp_rate",
+                           "p_rate","u_rate","cpi_index","state"] if col not in df.columns}
+    raw = df.assign(**missing)
+    # Compact dtypes, one read-only copy per dataset shared by every session
+    df = memory.shared(("merged", version or aggregates.frame_version(raw)), lambda: raw)
     st.session_state["df"] = df
-    qs = sorted(df["quarter"].dropna().unique(), key=lambda x: (x[:4], x[-1:]))
-    st.session_state["quarters"] = qs
+    st.session_state["quarters"] = list(df["quarter"].cat.categories) if "quarter" in df.columns else []
     st.session_state["states"] = sorted(df["state"].dropna().unique())
+    st.session_state["data_version"] = version
+    st.session_state["cube"] = aggregates.get_cube(df, version)
+
+def ensure_session_data(uploaded_file):
+    data = uploaded_file.read()
+    df = load_merged_excel(data)
+    # Versioned by the workbook bytes, like the CSV path, so pages never hash the frame on a rerun
+    _store_session(df, "excel:" + ingest.content_hash(data))
+
+def ensure_session_snapshot(path: str = snapshot.DEFAULT_DIR) -> dict:
+    """Load a Parquet snapshot written by app.py into the session; returns its manifest."""
+    df, side, manifest = snapshot.read_snapshot(path)
+    _store_session(df, manifest.get("data_version"))
+    for name in snapshot.ANNUAL_TABLES:
+        if name in side:
+            key = (name, manifest.get("data_version") or manifest["created"])
+            st.session_state[name] = memory.shared(key, lambda: side[name])
+    st.session_state["coverage"] = side.get("coverage")
+    return manifest
+
+def _store_published(ds):
+    """Point the session at a dataset published by the background precompute (read-only, shared)."""
+    st.session_state["df"] = ds["df"]
+    st.session_state["quarters"] = ds["quarters"]
+    st.session_state["states"] = ds["states"]
+    st.session_state["data_version"] = ds["version"]
+    st.session_state["cube"] = ds["cube"]
+
+def wait_for_dataset(job):
+    """Show the job's progress until it finishes, then store its result in the session.
+
+    The computation itself runs on the shared precompute pool (utils/jobs.py); this only
+    polls, so the page keeps rendering a progress bar instead of freezing. Errors from the
+    job are re-raised here.
+    """
+    st.session_state["pending_version"] = job.key
+    if not job.done():
+        bar = st.progress(0.0, text="Queued")
+        while not job.done():
+            frac, label = job.progress()
+            bar.progress(frac, text=f"Preparing dataset: {label}…")
+            time.sleep(POLL_SECONDS)
+        bar.empty()
+    try:
+        ds = job.result()
+    finally:
+        st.session_state.pop("pending_version", None)
+    _store_published(ds)
+    return ds
+
+def resume_pending_dataset():
+    """On the pages: finish waiting for a precompute the Home page started before navigation."""
+    version = st.session_state.get("pending_version")
+    if version is None or version == st.session_state.get("data_version"):
+        return
+    job = jobs.service().job(version)
+    if job is None:
+        st.session_state.pop("pending_version", None)
+        return
+    try:
+        wait_for_dataset(job)
+    except Exception as e:
+        st.error(f"Dataset preparation failed: {e}")
+        st.stop()
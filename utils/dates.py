@@ -0,0 +1,128 @@
+"""Date column -> quarterly Period, with the format detected once per file.
+
+The format is picked from a small sample of distinct values. ISO-style dates
+("YYYY-MM-DD", "YYYY-MM", "/" separators too) skip datetime parsing entirely:
+year and month are read straight off the bytes and turned into quarter ordinals
+(utils/quarter_index.py).
+Other detected formats parse with that explicit format. Only values that fail both
+fall back to pandas' generic parser, and whatever still fails is reported.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import quarter_index
+
+# Day-first before month-first: DOSM publishes Malaysian (day-first) dates
+FORMATS = ["%Y-%m-%d", "%Y-%m", "%Y/%m/%d", "%Y/%m", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%m/%d/%Y",
+           "%Y%m%d", "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M", "%b %Y", "%Y"]
+# Formats whose year/month sit at fixed byte offsets: format -> (width, separator offsets)
+FIXED = {"%Y-%m-%d": (10, (4, 7)), "%Y-%m": (7, (4,)), "%Y/%m/%d": (10, (4, 7)), "%Y/%m": (7, (4,))}
+SAMPLE = 256
+MIN_SHARE = 0.9
+NAT = quarter_index.NA
+
+
+def _text(values) -> pd.Series:
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    return s.astype("string").str.strip()
+
+
+def detect_format(values, sample: int = SAMPLE):
+    """First format in FORMATS that parses (at least MIN_SHARE of) a sample of distinct values."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    s = _text(s.dropna().head(4 * sample))
+    head = s[s != ""].drop_duplicates().head(sample)
+    if head.empty:
+        return None
+    best, best_ok = None, 0
+    for fmt in FORMATS:
+        ok = int(pd.to_datetime(head, format=fmt, errors="coerce").notna().sum())
+        if ok == len(head):
+            return fmt
+        if ok > best_ok:
+            best, best_ok = fmt, ok
+    return best if best_ok >= MIN_SHARE * len(head) else None
+
+
+def _fixed_ordinals(s: pd.Series, fmt: str) -> np.ndarray:
+    """Quarter ordinals from fixed-width ISO-style text; NAT where the text does not fit."""
+    width, seps = FIXED[fmt]
+    # Missing values become b"None"/b"nan" and fail the digit check like any other bad text
+    raw = np.asarray(s.to_numpy(dtype=object), dtype=f"S{width + 1}")
+    b = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(-1, width + 1)
+    d = b[:, :width] - np.uint8(48)                         # wraps around for bytes below "0"
+    digits = [i for i in range(width) if i not in seps]
+    ok = (b[:, width] == 0) & (d[:, digits] <= 9).all(axis=1) & (b[:, list(seps)] == ord(fmt[2])).all(axis=1)
+    d = d.astype(np.int32)
+    year = d[:, 0] * 1000 + d[:, 1] * 100 + d[:, 2] * 10 + d[:, 3]
+    month = d[:, 5] * 10 + d[:, 6]
+    ok &= (month >= 1) & (month <= 12)
+    if width == 10:
+        day = d[:, 8] * 10 + d[:, 9]
+        ok &= (day >= 1) & (day <= 31)
+    return np.where(ok, quarter_index.from_year_month(year, month), NAT)
+
+
+def _ordinals(dt: pd.Series) -> np.ndarray:
+    missing = dt.isna().to_numpy()
+    year = dt.dt.year.to_numpy(dtype=np.float64, na_value=0)
+    month = dt.dt.month.to_numpy(dtype=np.float64, na_value=1)
+    return np.where(missing, NAT, quarter_index.from_year_month(year, month))
+
+
+def _parse_unique(u: pd.Series, fmt: str) -> tuple:
+    """Ordinals for distinct values: detected/explicit format first, generic parser for the rest."""
+    fmt = fmt or detect_format(u)
+    if fmt in FIXED:
+        try:
+            o, path = _fixed_ordinals(u, fmt), "fixed-width"
+        except UnicodeEncodeError:
+            o, path = _ordinals(pd.to_datetime(u, format=fmt, errors="coerce")), "explicit"
+    elif fmt is not None:
+        o, path = _ordinals(pd.to_datetime(u, format=fmt, errors="coerce")), "explicit"
+    else:
+        o, path = np.full(len(u), NAT, dtype=np.int64), "generic"
+    rest = o == NAT
+    if rest.any():
+        # Blank and missing values are not failures
+        idx = np.flatnonzero(rest)
+        rest[idx] = (u.iloc[idx].notna() & (u.iloc[idx].astype(str).str.strip() != "")).to_numpy(
+            dtype=bool, na_value=False)
+    if rest.any():
+        # Slow, per-element path only for what the detected format could not read
+        o[rest] = _ordinals(pd.to_datetime(u[rest].astype(object), errors="coerce", format="mixed"))
+        if path != "generic":
+            path += "+generic"
+    return o, fmt, path, rest & (o == NAT)
+
+
+def to_quarters(values, fmt: str = None) -> tuple:
+    """(quarter Period series aligned to `values`, report dict). Pass `fmt` to skip detection.
+
+    Values are factorized first, so each distinct date string is parsed once
+    (monthly DOSM files repeat every date across states and divisions).
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        o = _ordinals(s)
+        failed, fmt, path, examples = np.zeros(len(s), dtype=bool), "datetime", "datetime", []
+    else:
+        codes, uniq = pd.factorize(s)
+        ou, fmt, path, failed_u = _parse_unique(pd.Series(uniq, dtype=object), fmt)
+        o = np.append(ou, NAT)[codes]
+        failed = np.append(failed_u, False)[codes]
+        examples = pd.Series(uniq[failed_u[:len(uniq)]], dtype=object).head(5).astype(str).tolist()
+    quarters = pd.Series(quarter_index.from_ordinals(o), index=s.index)
+    report = {"format": fmt, "path": path, "rows": int(len(s)), "failed": int(failed.sum()),
+              "failed_examples": examples}
+    return quarters, report
+
+
+def merge_reports(a: dict, b: dict) -> dict:
+    """Combine the reports of two chunks of the same file."""
+    if a is None:
+        return b
+    paths = a["path"] if b["path"] in a["path"].split("+") else f"{a['path']}+{b['path']}"
+    return {"format": a["format"], "path": "+".join(dict.fromkeys(paths.split("+"))),
+            "rows": a["rows"] + b["rows"], "failed": a["failed"] + b["failed"],
+            "failed_examples": (a["failed_examples"] + b["failed_examples"])[:5]}
@@ -0,0 +1,325 @@
+"""District drilldown for file 8 (household income by administrative district).
+
+- prepare():  district polygons (ADM2) from a GeoJSON, each tagged with its state, plus a
+              bounding-box spatial index. Point lookups test only the features whose box
+              holds the point, then ray-cast every candidate edge in one NumPy pass.
+- rollup():   household-weighted district -> state means per year (np.bincount over
+              group codes, no loop over districts).
+- layers():   district x year arrays per income metric in feature order, built once per
+              (table, geometry), so changing the year or state filter only slices arrays.
+              Districts the geometry cannot place in a state take the state of their
+              file 8 rows.
+
+There is no district GeoJSON in assets/ by default; put one at DEFAULT_GEOJSON
+(e.g. geoBoundaries MYS ADM2) or upload it on the District Drilldown page.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils import aggregates, choropleth, dates, geo
+from utils.ingest import LRUCache, content_hash
+from utils.schema import find_col
+
+DEFAULT_GEOJSON = "assets/malaysia_districts.geojson"
+METRICS = {"income_mean": "Mean household income (RM)", "income_median": "Median household income (RM)"}
+# Parent-state property names seen in district GeoJSONs
+STATE_KEYS = ["NAME_1", "ADM1_EN", "state", "negeri"]
+
+_prepared = LRUCache(max_entries=8)
+_results = LRUCache(max_entries=32)
+
+# Any known spelling (lowercase) -> the data-side state label
+_CANONICAL = {v.lower(): k for k, variants in geo.STATE_ALIASES.items() for v in variants}
+
+
+def _cached(cache, key, build):
+    hit = cache.get(key)
+    if hit is None:
+        hit = build()
+        cache.put(key, hit)
+    return hit
+
+
+def canonical_state(label) -> str:
+    text = re.sub(r"\s+", " ", str(label)).strip()
+    return _CANONICAL.get(text.lower(), text)
+
+
+def _norm(names) -> np.ndarray:
+    """Lowercase alphanumeric form of district names, for matching data to features."""
+    s = pd.Series(names, dtype=object).astype(str).str.lower()
+    return s.str.replace(r"[^a-z0-9]+", " ", regex=True).str.strip().to_numpy(dtype=object)
+
+
+# ---------------------------
+# Spatial index
+# ---------------------------
+def _rings(geometry: dict) -> list:
+    polys = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry.get("coordinates", [])
+    return [np.asarray(ring, dtype=np.float64)[:, :2] for rings in polys for ring in rings if len(ring) >= 4]
+
+
+def _centroid(ring: np.ndarray) -> tuple:
+    x, y = ring[:, 0], ring[:, 1]
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    area = cross.sum() / 2
+    if abs(area) < 1e-12:
+        return float(x.mean()), float(y.mean())
+    return (float(((x[:-1] + x[1:]) * cross).sum() / (6 * area)),
+            float(((y[:-1] + y[1:]) * cross).sum() / (6 * area)))
+
+
+def spatial_index(features: list) -> dict:
+    """Per-feature bounding boxes and centroids, plus every ring edge grouped by feature."""
+    bounds = np.full((len(features), 4), np.nan)
+    centroids = np.full((len(features), 2), np.nan)
+    edges, counts = [], np.zeros(len(features), dtype=np.int64)
+    for i, f in enumerate(features):
+        rings = _rings(f["geometry"])
+        if not rings:
+            continue
+        pts = np.concatenate(rings)
+        bounds[i] = pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max()
+        centroids[i] = _centroid(max(rings, key=len))
+        e = np.concatenate([np.hstack([r[:-1], r[1:]]) for r in rings])   # x1, y1, x2, y2
+        edges.append(e)
+        counts[i] = len(e)
+    return {"bounds": bounds, "centroids": centroids, "counts": counts,
+            "offsets": np.concatenate([[0], np.cumsum(counts)[:-1]]),
+            "edges": np.concatenate(edges) if edges else np.zeros((0, 4))}
+
+
+def locate(index: dict, lon, lat) -> np.ndarray:
+    """Feature position containing each (lon, lat) point, or -1 (even-odd rule, holes included)."""
+    x, y = np.atleast_1d(np.asarray(lon, dtype=np.float64)), np.atleast_1d(np.asarray(lat, dtype=np.float64))
+    b = index["bounds"]
+    with np.errstate(invalid="ignore"):
+        cand = ((x[:, None] >= b[:, 0]) & (x[:, None] <= b[:, 2]) &
+                (y[:, None] >= b[:, 1]) & (y[:, None] <= b[:, 3]))
+    p, f = np.nonzero(cand)                                 # candidate (point, feature) pairs
+    out = np.full(len(x), -1, dtype=np.int64)
+    if not len(p):
+        return out
+    # Expand each pair to the edges of its feature and count ray crossings per pair
+    n = index["counts"][f]
+    pair = np.repeat(np.arange(len(p)), n)
+    start = np.repeat(index["offsets"][f] - (np.cumsum(n) - n), n)
+    e = index["edges"][start + np.arange(n.sum())]
+    px, py = x[p][pair], y[p][pair]
+    x1, y1, x2, y2 = e.T
+    straddle = (y1 > py) != (y2 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xcross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+    crossings = np.bincount(pair, weights=straddle & (px < xcross), minlength=len(p))
+    inside = crossings % 2 == 1
+    out[p[inside][::-1]] = f[inside][::-1]                  # first containing feature wins
+    return out
+
+
+# ---------------------------
+# Geometry
+# ---------------------------
+def read_file(path: str = DEFAULT_GEOJSON):
+    """District GeoJSON bytes from assets/, or None when it is not there."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def prepare(data: bytes, level: str = "medium", states: dict = None) -> dict:
+    """Simplified district features with a state per feature and a spatial index.
+
+    The state comes from a parent-state property when the file has one, otherwise from
+    the state polygon (`states`, a geo.prepare result) containing the district centroid.
+    Features get positional ids so districts with the same name in two states stay
+    distinct. Cached per (file, level, state geometry); treat the result as read-only.
+    """
+    key = (content_hash(data), level, states["key"] if states else None)
+
+    def build():
+        base = geo.prepare(data, level, adm="ADM2")
+        feats = base["geojson"]["features"]
+        index = spatial_index(feats)
+        props = feats[0]["properties"] if feats else {}
+        state_key = next((k for k in STATE_KEYS if k in props), None)
+        has_states = states is not None and bool(states["geojson"]["features"])
+        if state_key is not None:
+            owner = [f["properties"].get(state_key, "") for f in feats]
+        elif has_states:
+            s_feats = states["geojson"]["features"]
+            pos = locate(spatial_index(s_feats), index["centroids"][:, 0], index["centroids"][:, 1])
+            labels = [f["properties"][states["name_key"]] for f in s_feats]
+            owner = [labels[i] if i >= 0 else "" for i in pos]
+        else:
+            owner = [""] * len(feats)
+        name_key = base["name_key"]
+        names = np.array([f["properties"].get(name_key, "") if name_key else "" for f in feats], dtype=object)
+        ids = [str(i) for i in range(len(feats))]
+        return {
+            "key": key,
+            "geojson": {"type": "FeatureCollection",
+                        "features": [dict(f, id=i) for f, i in zip(feats, ids)]},
+            "featureidkey": "id",
+            "name_key": name_key,
+            "ids": np.array(ids, dtype=object),
+            "names": names,
+            "norm": _norm(names),
+            "states": np.array([canonical_state(s) if s else "" for s in owner], dtype=object),
+            "index": index,
+            "state_source": state_key or ("state polygons" if has_states else None),
+        }
+
+    return _cached(_prepared, key, build)
+
+
+# ---------------------------
+# Table, rollup and layers
+# ---------------------------
+def district_table(df: pd.DataFrame) -> pd.DataFrame:
+    """File 8 as state, district, year, weight, income metrics (one row per district-year)."""
+    state_col, district_col = find_col(df, "state"), find_col(df, "district")
+    date_col = "date" if "date" in df.columns else find_col(df, "year")
+    if state_col is None or district_col is None or date_col is None:
+        raise ValueError("File 8 needs state, district and date/year columns.")
+    weight_col = find_col(df, "household")
+    metrics = [m for m in METRICS if m in df.columns]
+    if not metrics:
+        raise ValueError(f"File 8 has none of the income columns {list(METRICS)}.")
+    quarters, _ = dates.to_quarters(df[date_col])
+    year = pd.Series(np.asarray(quarters.dt.year, dtype=np.float64), index=df.index)
+    out = pd.DataFrame({
+        "state": df[state_col].astype(str).map(canonical_state),
+        "district": df[district_col].astype(str).str.strip(),
+        "year": year,
+        "weight": (pd.to_numeric(df[weight_col], errors="coerce") if weight_col is not None
+                   else pd.Series(1.0, index=df.index)),
+    })
+    for m in metrics:
+        out[m] = pd.to_numeric(df[m], errors="coerce").astype(np.float64)
+    out = out.dropna(subset=["year"]).astype({"year": int})
+    out.attrs["weighted_by"] = weight_col
+    return out.reset_index(drop=True)
+
+
+def rollup(table: pd.DataFrame, version: str) -> pd.DataFrame:
+    """Household-weighted mean of each district metric per (state, year).
+
+    Districts without a household count weigh 1 when the file has no household column
+    and 0 otherwise. Medians roll up as a weighted mean of district medians, which is an
+    approximation of the state median.
+    """
+    def build():
+        g = table.groupby(["state", "year"], sort=True)
+        codes = g.ngroup().to_numpy()
+        out = g.size().reset_index(name="districts")
+        w = table["weight"].fillna(0.0).to_numpy(dtype=np.float64)
+        out["households"] = np.bincount(codes, weights=w, minlength=len(out))
+        for m in METRICS:
+            if m not in table.columns:
+                continue
+            x = table[m].to_numpy(dtype=np.float64)
+            ok = ~np.isnan(x) & (w > 0)
+            num = np.bincount(codes[ok], weights=(w * x)[ok], minlength=len(out))
+            den = np.bincount(codes[ok], weights=w[ok], minlength=len(out))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[m] = num / den
+        if table.attrs.get("weighted_by") is None:
+            out = out.drop(columns="households")
+        return out
+
+    return _cached(_results, (version, "rollup"), build)
+
+
+def compare_states(rolled: pd.DataFrame, state_table: pd.DataFrame) -> pd.DataFrame:
+    """District rollup next to file 7 (income by state) for the years both cover."""
+    if state_table is None or find_col(state_table, "state") is None:
+        return pd.DataFrame()
+    date_col = "date" if "date" in state_table.columns else find_col(state_table, "year")
+    if date_col is None:
+        return pd.DataFrame()
+    quarters, _ = dates.to_quarters(state_table[date_col])
+    st7 = pd.DataFrame({"state": state_table[find_col(state_table, "state")].astype(str).map(canonical_state),
+                        "year": np.asarray(quarters.dt.year, dtype=np.float64)})
+    metrics = [m for m in METRICS if m in state_table.columns and m in rolled.columns]
+    for m in metrics:
+        st7[f"{m} (state file)"] = pd.to_numeric(state_table[m], errors="coerce").to_numpy()
+    st7 = st7.dropna(subset=["year"]).astype({"year": int})
+    both = rolled.merge(st7, on=["state", "year"], how="inner")
+    for m in metrics:
+        both[f"{m} gap"] = both[m] - both[f"{m} (state file)"]
+    return both
+
+
+def match(table: pd.DataFrame, geom: dict) -> np.ndarray:
+    """Feature position for every table row (-1 when unmatched); by (state, name), else by a unique name."""
+    pairs = table[["state", "district"]].drop_duplicates()
+    norm = _norm(pairs["district"])
+    feature_states = np.array([s.lower() for s in geom["states"]], dtype=object)
+    by_pair = {(s, n): i for i, (s, n) in enumerate(zip(feature_states, geom["norm"]))}
+    names, counts = np.unique(geom["norm"], return_counts=True)
+    unique = set(names[counts == 1])
+    by_name = {n: i for i, n in enumerate(geom["norm"]) if n in unique}
+    pos = [by_pair.get((str(s).lower(), n), by_name.get(n, -1)) for s, n in zip(pairs["state"], norm)]
+    lookup = pd.Series(pos, index=pd.MultiIndex.from_frame(pairs))
+    return lookup.reindex(pd.MultiIndex.from_frame(table[["state", "district"]])).to_numpy(dtype=np.int64)
+
+
+def layers(table: pd.DataFrame, geom: dict, version: str) -> dict:
+    """Per-year choropleth layers: {"locations", "years", "values": {metric: district x year}, ...}."""
+    def build():
+        pos = match(table, geom)
+        years = sorted(table["year"].unique())
+        yi = np.searchsorted(years, table["year"].to_numpy())
+        ok = pos >= 0
+        shape = (len(geom["ids"]), len(years))
+        values, bounds = {}, {}
+        for m in METRICS:
+            if m not in table.columns:
+                continue
+            x = table[m].to_numpy(dtype=np.float64)
+            good = ok & ~np.isnan(x)
+            sums, counts = np.zeros(shape), np.zeros(shape)
+            np.add.at(sums, (pos[good], yi[good]), x[good])
+            np.add.at(counts, (pos[good], yi[good]), 1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                values[m] = sums / counts
+            finite = np.isfinite(values[m])
+            bounds[m] = ((float(values[m][finite].min()), float(values[m][finite].max())) if finite.any()
+                         else (0.0, 1.0))
+        # State per feature: from the geometry, else from the file 8 rows matched to it
+        states = geom["states"].copy()
+        missing = states[pos[ok]] == ""
+        states[pos[ok][missing]] = table["state"].to_numpy(dtype=object)[ok][missing]
+        unmatched = table.loc[~ok, ["state", "district"]].drop_duplicates()
+        return {"locations": geom["ids"], "states": states, "years": [str(y) for y in years],
+                "values": values, "bounds": bounds,
+                "matched": int(len(np.unique(pos[ok]))), "unmatched": unmatched.reset_index(drop=True)}
+
+    return _cached(_results, (version, "layers", geom["key"]), build)
+
+
+def figure(table: pd.DataFrame, geom: dict, version: str, metric: str, state: str = None):
+    """District choropleth with one frame per year, optionally limited to one state's districts."""
+    def build():
+        layer = layers(table, geom, version)
+        g, rows = geom, slice(None)
+        if state is not None:
+            # Only the selected state's features go to the browser; colours keep the national range
+            rows = np.flatnonzero(layer["states"] == canonical_state(state))
+            feats = geom["geojson"]["features"]
+            g = dict(geom, geojson={"type": "FeatureCollection", "features": [feats[i] for i in rows]})
+        zmin, zmax = layer["bounds"][metric]
+        grid = {"locations": layer["locations"][rows], "years": layer["years"],
+                "values": layer["values"][metric][rows], "zmin": zmin, "zmax": zmax}
+        return choropleth.frames_figure(grid, g, METRICS[metric], frames="years", prefix="Year: ",
+                                        colorscale="Blues")
+
+    return _cached(_results, (version, "figure", geom["key"], metric, state), build)
+
+
+def table_version(df: pd.DataFrame) -> str:
+    return "district:" + aggregates.frame_version(df)
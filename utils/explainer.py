@@ -0,0 +1,252 @@
+"""Explainer backends for the "LLM Explainer" panels.
+
+A backend turns a batch of quarter/state contexts into short explanations:
+
+- TemplateBackend: in-process stand-in that fills the fixed bullet templates
+- HTTPBackend:     a local model server speaking the OpenAI-style /v1/completions API
+                   (llama.cpp server, vLLM, Ollama, ...), one request per batch
+
+Explainer wraps a backend with a persistent response cache keyed by a hash of the
+prompt context, background (non-blocking) batch requests and token streaming.
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib import request as urlrequest
+
+from utils.ingest import LRUCache
+from utils.llm_helper import FIELDS, compose_bullets
+
+DEFAULT_URL = os.environ.get("DATAZENITH_LLM_URL", "http://localhost:8080/v1")
+CACHE_DIR = os.environ.get("DATAZENITH_LLM_CACHE", os.path.join(".cache", "explainer"))
+
+PROMPTS = {
+    "ms": "Anda penganalisis pasaran buruh Malaysia. Terangkan dalam 3-5 poin ringkas (bermula dengan •) "
+          "maksud angka berikut untuk belia dan cadangkan satu fokus polisi.\n",
+    "en": "You are a Malaysian labour-market analyst. In 3-5 short bullets (starting with •), explain what "
+          "these figures mean for young workers and suggest one policy focus.\n",
+}
+
+
+def _clean(context: dict) -> dict:
+    out = {"quarter": str(context.get("quarter", "-"))}
+    if context.get("state") is not None:
+        out["state"] = str(context["state"])
+    for f in FIELDS:
+        try:
+            v = float(context.get(f))
+        except (TypeError, ValueError):
+            continue
+        if v == v:
+            out[f] = round(v, 2)
+    return out
+
+
+def build_prompt(context: dict, lang: str = "ms") -> str:
+    ctx = _clean(context)
+    facts = "\n".join(f"- {k}: {v}" for k, v in ctx.items())
+    return PROMPTS["ms" if lang == "ms" else "en"] + facts + "\n"
+
+
+class TemplateBackend:
+    """In-process backend: the fixed bullet templates, no model needed."""
+
+    name = "template"
+    # Cheap and deterministic: cached in memory only, never written to disk
+    persist = False
+
+    def generate(self, items: list) -> list:
+        return [compose_bullets(it["context"], it["lang"]) for it in items]
+
+    def stream(self, item: dict):
+        text = self.generate([item])[0]
+        for line in text.splitlines(keepends=True):
+            yield line
+
+
+class HTTPBackend:
+    """Local model server with an OpenAI-compatible /completions endpoint."""
+
+    persist = True
+
+    def __init__(self, base_url: str = DEFAULT_URL, model: str = "local", max_tokens: int = 256,
+                 temperature: float = 0.2, timeout: float = 120):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.name = f"http:{self.base_url}:{model}"
+
+    def _post(self, payload: dict):
+        req = urlrequest.Request(
+            f"{self.base_url}/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        return urlrequest.urlopen(req, timeout=self.timeout)
+
+    def _payload(self, prompt, stream=False) -> dict:
+        return {"model": self.model, "prompt": prompt, "max_tokens": self.max_tokens,
+                "temperature": self.temperature, "stream": stream}
+
+    @staticmethod
+    def _texts(body, n: int = None) -> list:
+        """The choices' texts in index order; ValueError when the response is not shaped as expected."""
+        choices = body.get("choices") if isinstance(body, dict) else None
+        if not isinstance(choices, list) or not choices or (n is not None and len(choices) != n):
+            raise ValueError(f"Model server returned {len(choices) if isinstance(choices, list) else 'no'} "
+                             f"choice(s){f', expected {n}' if n is not None else ''}.")
+        if not all(isinstance(c, dict) and isinstance(c.get("text", ""), (str, type(None))) for c in choices):
+            raise ValueError("Model server returned a choice whose text is not a string.")
+        return [c.get("text") or "" for c in sorted(choices, key=lambda c: c.get("index", 0))]
+
+    def generate(self, items: list) -> list:
+        # One request for the whole batch: the completions API accepts a list of prompts
+        with self._post(self._payload([it["prompt"] for it in items])) as resp:
+            body = json.load(resp)
+        return [text.strip() for text in self._texts(body, len(items))]
+
+    def stream(self, item: dict):
+        with self._post(self._payload(item["prompt"], stream=True)) as resp:
+            for raw in resp:
+                line = raw.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                body = json.loads(data)
+                if isinstance(body, dict) and body.get("choices") == []:
+                    continue  # e.g. a trailing usage-only chunk
+                chunk = self._texts(body)[0]
+                if chunk:
+                    yield chunk
+
+
+class ResponseCache:
+    """Two-level cache: in-memory LRU in front of one JSON file per key on disk (none if directory is None)."""
+
+    def __init__(self, directory: str = CACHE_DIR, max_entries: int = 1024):
+        self.directory = directory
+        self._mem = LRUCache(max_entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        hit = self._mem.get(key)
+        if hit is None and self.directory is not None and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    hit = json.load(f)["text"]
+            except (OSError, ValueError, KeyError):
+                return None
+            self._mem.put(key, hit)
+        return hit
+
+    def put(self, key, text):
+        self._mem.put(key, text)
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"text": text}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+# Background batches of every Explainer run here, however many backend configurations are in use
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="explainer")
+
+
+class Explainer:
+    """Cached, batching, non-blocking front end over a backend."""
+
+    def __init__(self, backend=None, cache: ResponseCache = None, pool: ThreadPoolExecutor = None):
+        self.backend = backend or TemplateBackend()
+        self.cache = cache or ResponseCache(CACHE_DIR if getattr(self.backend, "persist", True) else None)
+        self._pool = pool or _pool
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _item(self, context: dict, lang: str) -> dict:
+        prompt = build_prompt(context, lang)
+        ident = json.dumps([self.backend.name, lang, _clean(context)], sort_keys=True)
+        return {"context": context, "lang": lang, "prompt": prompt,
+                "key": hashlib.sha256(ident.encode("utf-8")).hexdigest()}
+
+    def cached(self, context: dict, lang: str = "ms"):
+        return self.cache.get(self._item(context, lang)["key"])
+
+    def explain_many(self, contexts: list, lang: str = "ms") -> list:
+        """Explanations for many contexts; only cache misses go to the backend, as one batch."""
+        items = [self._item(c, lang) for c in contexts]
+        out = [self.cache.get(it["key"]) for it in items]
+        miss = [i for i, text in enumerate(out) if text is None]
+        if miss:
+            texts = self.backend.generate([items[i] for i in miss])
+            for i, text in zip(miss, texts):
+                self.cache.put(items[i]["key"], text)
+                out[i] = text
+        return out
+
+    def explain_async(self, contexts: list, lang: str = "ms"):
+        """Start explain_many in the background; identical in-flight batches share one Future."""
+        key = hashlib.sha256(
+            "".join(self._item(c, lang)["key"] for c in contexts).encode("utf-8")).hexdigest()
+        new = False
+        with self._lock:
+            fut = self._pending.get(key)
+            if fut is None or (fut.done() and fut.exception() is not None):
+                fut = self._pool.submit(self.explain_many, contexts, lang)
+                self._pending[key] = fut
+                new = True
+                # Failed batches for other keys are only kept until the next submission
+                for k in [k for k, f in self._pending.items() if f.done() and k != key]:
+                    del self._pending[k]
+        if new:
+            # Outside the lock: an already finished future runs the callback right here
+            fut.add_done_callback(lambda f, k=key: self._settle(k, f))
+        return fut
+
+    def _settle(self, key, fut):
+        # A finished batch is in the response cache; failures stay until the next call retries them
+        if fut.exception() is None:
+            with self._lock:
+                if self._pending.get(key) is fut:
+                    del self._pending[key]
+
+    def stream(self, context: dict, lang: str = "ms"):
+        """Yield the explanation piece by piece; a cached answer is yielded at once."""
+        item = self._item(context, lang)
+        hit = self.cache.get(item["key"])
+        if hit is not None:
+            yield hit
+            return
+        parts = []
+        for chunk in self.backend.stream(item):
+            parts.append(chunk)
+            yield chunk
+        self.cache.put(item["key"], "".join(parts).strip())
+
+
+# Bounded: every (url, model) typed into the sidebar is a new configuration. An evicted
+# Explainer only drops its in-memory cache; its batches keep running on the shared pool
+_explainers = LRUCache(max_entries=8)
+_explainers_lock = threading.Lock()
+
+
+def get_explainer(backend: str = "template", url: str = DEFAULT_URL, model: str = "local") -> Explainer:
+    """One shared Explainer per backend configuration for the whole process."""
+    key = (backend, url, model) if backend == "http" else (backend,)
+    with _explainers_lock:
+        hit = _explainers.get(key)
+        if hit is None:
+            impl = HTTPBackend(url, model) if backend == "http" else TemplateBackend()
+            hit = Explainer(impl)
+            _explainers.put(key, hit)
+        return hit
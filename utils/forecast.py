@@ -0,0 +1,207 @@
+"""Next-quarter projections for every state x metric series at once.
+
+Each series (the national mean and every state, for YMI, youth unemployment, overall
+unemployment and CPI) gets its own AR(p) model with an intercept. All series are fitted
+together: the lag design is one (series, time, p+1) array, the normal equations are
+accumulated as per-series sufficient statistics (X'X, X'y, y'y, n) with one einsum, and
+solved as a stack with np.linalg.solve, so there is no Python loop over series.
+
+The sufficient statistics are kept per data layout (groups, metrics, order). When a new
+release only appends quarters, just the new rows are added to them before re-solving;
+any other change refits from scratch. Projections run on a background thread:
+
+    fut = forecast.project_async(df, version)   # Future of a long frame, one row per series
+    proj = fut.result()
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import correlation, quarter_index, trace
+from utils.ingest import LRUCache
+
+METRICS = ["YMI", "youth_unemp_rate", "u_rate", "cpi_index"]
+NATIONAL = correlation.NATIONAL
+ORDER = 2
+# Two-sided normal quantiles for the projection intervals
+LEVELS = {"80%": 1.2816, "95%": 1.9600}
+# Ridge added to X'X (relative to its scale) so flat or short series still solve
+RIDGE = 1e-8
+
+_fits = LRUCache(max_entries=8)       # (groups, metrics, order) -> sufficient statistics + parameters
+_results = LRUCache(max_entries=16)   # (version, order, horizon) -> projection frame
+_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+_pending = {}
+_lock = threading.Lock()
+
+
+# ---------------------------
+# Kernels (pure NumPy; y is (series, time) with NaN for missing quarters)
+# ---------------------------
+def _design(y: np.ndarray, order: int, start: int) -> tuple:
+    """Lag rows [1, y[t-1], ..., y[t-p]] and targets y[t] for t in [start, T), missing rows zeroed."""
+    t = y.shape[1]
+    start = max(start, order)
+    lags = [y[:, start - k:t - k] for k in range(1, order + 1)]
+    x = np.stack([np.ones_like(y[:, start:])] + lags, axis=-1)             # (N, T-start, p+1)
+    target = y[:, start:]
+    valid = ~np.isnan(target) & ~np.isnan(x).any(axis=-1)
+    return np.where(valid[..., None], x, 0.0), np.where(valid, target, 0.0), valid
+
+
+def sufficient_stats(y: np.ndarray, order: int = ORDER, start: int = 0) -> dict:
+    """X'X, X'y, y'y and n per series, from the targets at t >= start."""
+    x, target, valid = _design(y, order, start)
+    return {
+        "xtx": np.einsum("ntk,ntl->nkl", x, x),
+        "xty": np.einsum("ntk,nt->nk", x, target),
+        "yty": np.einsum("nt,nt->n", target, target),
+        "n": valid.sum(axis=1),
+    }
+
+
+def solve(stats: dict) -> dict:
+    """AR coefficients (intercept first) and residual standard deviation for every series."""
+    xtx, xty = stats["xtx"], stats["xty"]
+    k = xtx.shape[-1]
+    scale = np.maximum(np.trace(xtx, axis1=1, axis2=2) / k, 1.0)
+    beta = np.linalg.solve(xtx + RIDGE * scale[:, None, None] * np.eye(k), xty[..., None])[..., 0]
+    sse = stats["yty"] - 2 * np.einsum("nk,nk->n", beta, xty) + np.einsum("nk,nkl,nl->n", beta, xtx, beta)
+    dof = stats["n"] - k
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma = np.sqrt(np.maximum(sse, 0.0) / dof)
+    # Too few complete rows to estimate k coefficients and a variance
+    ok = dof >= 2
+    beta[~ok], sigma[~ok] = np.nan, np.nan
+    return {"beta": beta, "sigma": sigma}
+
+
+def last_observed(y: np.ndarray) -> np.ndarray:
+    """Index of each series' last non-missing quarter (-1 when it has none)."""
+    observed = ~np.isnan(y)
+    return np.where(observed.any(axis=1), y.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1), -1)
+
+
+def predict(y: np.ndarray, beta: np.ndarray, sigma: np.ndarray, horizon: int = 1) -> tuple:
+    """Mean and standard error for the `horizon` quarters after the last column of y.
+
+    A series whose latest quarters are missing is projected from its last observed
+    quarter, so its first projection is more than one step ahead (and wider).
+    """
+    n, t = y.shape
+    order = beta.shape[1] - 1
+    last = last_observed(y)
+    gap = t - 1 - last                                                     # missing trailing quarters
+    steps = int(gap[last >= 0].max(initial=0)) + horizon
+    rows = np.arange(n)
+    idx = last[:, None] - np.arange(order)[None, :]                        # y[last], y[last-1], ...
+    buf = np.where(idx >= 0, y[rows[:, None], np.clip(idx, 0, None)], np.nan)
+    mean, psi, var = np.empty((n, steps)), np.zeros((n, steps)), np.empty((n, steps))
+    a = beta[:, 1:]
+    for j in range(steps):
+        mean[:, j] = beta[:, 0] + np.einsum("nk,nk->n", a, buf)
+        buf = np.concatenate([mean[:, j:j + 1], buf[:, :-1]], axis=1)
+        # psi weights of the AR(p) moving-average form give the j-step error variance
+        psi[:, j] = 1.0 if j == 0 else sum(a[:, i] * psi[:, j - 1 - i] for i in range(min(j, order)))
+        var[:, j] = (var[:, j - 1] if j else 0.0) + psi[:, j] ** 2
+    pick = np.clip(gap, 0, None)[:, None] + np.arange(horizon)[None, :]
+    pick = np.minimum(pick, steps - 1)
+    out_mean = mean[rows[:, None], pick]
+    out_se = sigma[:, None] * np.sqrt(var[rows[:, None], pick])
+    out_mean[last < 0], out_se[last < 0] = np.nan, np.nan
+    return out_mean, out_se
+
+
+# ---------------------------
+# Fit state per data layout (incremental when quarters are appended)
+# ---------------------------
+def fit(y: np.ndarray, quarters: list, key, order: int = ORDER) -> dict:
+    """Parameters for y, reusing the cached statistics for `key` when y only adds quarters."""
+    prev = _fits.get(key)
+    t0 = len(prev["quarters"]) if prev is not None else 0
+    extends = (prev is not None and t0 <= len(quarters) and prev["quarters"] == quarters[:t0]
+               and np.array_equal(prev["y"], y[:, :t0], equal_nan=True))
+    with trace.stage("forecast_fit", rows_in=y.size) as s:
+        if extends and t0 == len(quarters):
+            s.cache = "hit"
+            state = prev
+        else:
+            s.cache = "incremental" if extends else "miss"
+            if extends:
+                new = sufficient_stats(y, order, start=t0)
+                stats = {k: prev["stats"][k] + new[k] for k in new}
+            else:
+                stats = sufficient_stats(y, order)
+            state = {"quarters": list(quarters), "y": y, "stats": stats, **solve(stats)}
+            _fits.put(key, state)
+        s.rows_out = len(y)
+    return state
+
+
+# ---------------------------
+# Labelled projections
+# ---------------------------
+def _series(df: pd.DataFrame, version: str) -> dict:
+    p = correlation.panel(df, version, METRICS)
+    values = np.concatenate([p["national"], p["values"]])                 # (G, T, M)
+    groups = [NATIONAL] + p["states"]
+    return {"groups": groups, "metrics": p["metrics"], "quarters": p["quarters"],
+            "y": values.transpose(0, 2, 1).reshape(-1, values.shape[1])}
+
+
+def project(df: pd.DataFrame, version: str, order: int = ORDER, horizon: int = 1) -> pd.DataFrame:
+    """One row per (group, metric, projected quarter): last observed value, projection and intervals."""
+    key = (version, order, horizon)
+    hit = _results.get(key)
+    if hit is not None:
+        return hit
+    s = _series(df, version)
+    m = len(s["metrics"])
+    state = fit(s["y"], s["quarters"], (tuple(s["groups"]), tuple(s["metrics"]), order), order)
+    mean, se = predict(s["y"], state["beta"], state["sigma"], horizon)
+    li = last_observed(s["y"])
+    last = np.where(li >= 0, s["y"][np.arange(len(li)), li], np.nan)
+    o = quarter_index.ordinal(pd.Index(s["quarters"][-1:], dtype=object))[0]
+    ahead = [quarter_index.label(int(o) + h + 1) for h in range(horizon)]
+    out = pd.DataFrame({
+        "state": np.repeat(s["groups"], m * horizon),
+        "metric": np.tile(np.repeat(s["metrics"], horizon), len(s["groups"])),
+        "quarter": np.tile(ahead, len(s["groups"]) * m),
+        "last": np.repeat(last, horizon),
+        "forecast": mean.ravel(),
+    })
+    for level, z in LEVELS.items():
+        out[f"lo{level[:-1]}"] = mean.ravel() - z * se.ravel()
+        out[f"hi{level[:-1]}"] = mean.ravel() + z * se.ravel()
+    out.attrs.update(order=order, fitted_through=s["quarters"][-1] if s["quarters"] else None)
+    _results.put(key, out)
+    return out
+
+
+def project_async(df: pd.DataFrame, version: str, order: int = ORDER, horizon: int = 1):
+    """Start project() on the forecast thread; sessions asking for the same version share one Future."""
+    key = (version, order, horizon)
+    with _lock:
+        fut = _pending.get(key)
+        if fut is None or (fut.done() and fut.exception() is not None):
+            fut = _pool.submit(project, df, version, order, horizon)
+            _pending[key] = fut
+            # Finished futures for other versions are only kept while their results are cached
+            for k in [k for k, f in _pending.items() if f.done() and k not in _results]:
+                del _pending[k]
+    return fut
+
+
+def wide(proj: pd.DataFrame, level: str = "95%", national: bool = False) -> pd.DataFrame:
+    """State x (metric, metric lo, metric hi) table for the first projected quarter."""
+    d = proj[(proj["quarter"] == proj["quarter"].iloc[0]) & ((proj["state"] == NATIONAL) == national)]
+    lo, hi = f"lo{level[:-1]}", f"hi{level[:-1]}"
+    t = d.pivot(index="state", columns="metric", values=["forecast", lo, hi])
+    cols = {}
+    for metric in [m for m in METRICS if m in d["metric"].values]:
+        cols[metric] = t[("forecast", metric)]
+        cols[f"{metric} {level} low"] = t[(lo, metric)]
+        cols[f"{metric} {level} high"] = t[(hi, metric)]
+    return pd.DataFrame(cols).reset_index()
@@ -0,0 +1,174 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.ingest import LRUCache, content_hash
+
+DEFAULT_GEOJSON = "assets/malaysia_states.geojson"
+
+# Simplification tolerance in degrees per zoom level (~110 km per degree)
+TOLERANCES = {"detailed": 0.001, "medium": 0.005, "coarse": 0.02}
+NAME_KEYS = ["shapeName", "name", "NAME_1"]
+DISTRICT_NAME_KEYS = ["shapeName", "name", "NAME_2", "ADM2_EN", "district", "daerah"]
+
+# Data label -> GeoJSON label variants. The first match present in the GeoJSON wins.
+STATE_ALIASES = {
+    "Pulau Pinang": ["Pulau Pinang", "Penang"],
+    "Melaka": ["Melaka", "Malacca"],
+    "W.P. Kuala Lumpur": ["Wilayah Persekutuan Kuala Lumpur", "Kuala Lumpur", "W.P. Kuala Lumpur"],
+    "W.P. Labuan": ["Wilayah Persekutuan Labuan", "Labuan", "W.P. Labuan"],
+    "W.P. Putrajaya": ["Wilayah Persekutuan Putrajaya", "Putrajaya", "W.P. Putrajaya"],
+    "Negeri Sembilan": ["Negeri Sembilan", "Negri Sembilan"],
+}
+
+_parsed = LRUCache(max_entries=4)
+_prepared = LRUCache(max_entries=16)
+
+
+def _simplify_ring(pts: np.ndarray, tol: float) -> np.ndarray:
+    """Douglas-Peucker on one ring; distances for each span are computed in one NumPy pass."""
+    n = len(pts)
+    if tol <= 0 or n <= 4:
+        return pts
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+        a, b, seg = pts[i], pts[j], pts[i + 1:j]
+        dx, dy = b - a
+        length = np.hypot(dx, dy)
+        if length == 0:  # closed ring: first point == last point
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (seg[:, 1] - a[1]) - dy * (seg[:, 0] - a[0])) / length
+        k = int(np.argmax(dist))
+        if dist[k] > tol:
+            keep[i + 1 + k] = True
+            stack.append((i, i + 1 + k))
+            stack.append((i + 1 + k, j))
+    return pts[keep]
+
+
+def _simplify_polygon(rings, tol, decimals):
+    out = []
+    for ring in rings:
+        pts = _simplify_ring(np.asarray(ring, dtype=np.float64), tol)
+        if len(pts) < 4:  # collapsed below a valid ring at this tolerance
+            if not out:
+                return None
+            continue
+        out.append(np.round(pts, decimals).tolist())
+    return out
+
+
+def simplify_geometry(geom: dict, tol: float, decimals: int = 5) -> dict:
+    if geom["type"] == "Polygon":
+        polys = [geom["coordinates"]]
+    elif geom["type"] == "MultiPolygon":
+        polys = geom["coordinates"]
+    else:
+        return geom
+    simplified = [p for p in (_simplify_polygon(rings, tol, decimals) for rings in polys) if p]
+    if not simplified:
+        # Keep at least the largest polygon's outline rather than losing the state
+        largest = max(polys, key=lambda rings: len(rings[0]))
+        simplified = [_simplify_polygon(largest, 0, decimals)]
+    return {"type": "MultiPolygon", "coordinates": simplified}
+
+
+def _parse(data: bytes) -> dict:
+    key = content_hash(data)
+    gj = _parsed.get(key)
+    if gj is None:
+        gj = json.loads(data)
+        _parsed.put(key, gj)
+    return gj
+
+
+def detect_name_key(gj: dict, keys=NAME_KEYS):
+    features = gj.get("features") or []
+    props = features[0].get("properties", {}) if features else {}
+    for k in keys:
+        if k in props:
+            return k
+    return None
+
+
+def admin_features(gj: dict, adm: str = "ADM1") -> list:
+    """Features of one administrative level (ADM1 states, ADM2 districts) when the file labels levels."""
+    feats = gj.get("features") or []
+    if any("shapeType" in f.get("properties", {}) for f in feats):
+        return [f for f in feats if f["properties"].get("shapeType") == adm]
+    return feats
+
+
+def state_features(gj: dict) -> list:
+    """Drop whole-country (ADM0) and other non-state features when the file labels levels."""
+    return admin_features(gj, "ADM1")
+
+
+def build_name_index(gj_names) -> dict:
+    """Map every known data-side spelling (case-insensitive) to the GeoJSON's own label."""
+    present = set(gj_names)
+    index = {n.lower(): n for n in gj_names}
+    for data_name, variants in STATE_ALIASES.items():
+        match = next((v for v in variants if v in present), None)
+        if match is not None:
+            index[data_name.lower()] = match
+            for v in variants:
+                index.setdefault(v.lower(), match)
+    return index
+
+
+def prepare(data: bytes, level: str = "medium", adm: str = "ADM1") -> dict:
+    """Parse, filter and simplify a GeoJSON once per (file hash, level, admin level).
+
+    Returns a dict with the simplified FeatureCollection ("geojson"), the
+    feature id key for Plotly ("featureidkey"), the GeoJSON state (or, with
+    adm="ADM2", district) labels ("names") and the data-label -> GeoJSON-label
+    index ("name_index").
+    Results are shared across reruns and sessions; treat them as read-only.
+    """
+    key = (content_hash(data), level) if adm == "ADM1" else (content_hash(data), level, adm)
+    hit = _prepared.get(key)
+    if hit is not None:
+        return hit
+    gj = _parse(data)
+    name_key = detect_name_key(gj, NAME_KEYS if adm == "ADM1" else DISTRICT_NAME_KEYS)
+    tol = TOLERANCES[level]
+    feats = [
+        {"type": "Feature", "properties": f["properties"], "geometry": simplify_geometry(f["geometry"], tol)}
+        for f in admin_features(gj, adm)
+    ]
+    names = sorted({f["properties"][name_key] for f in feats}) if name_key else []
+    prepared = {
+        "key": key,
+        "geojson": {"type": "FeatureCollection", "features": feats},
+        "name_key": name_key,
+        "featureidkey": f"properties.{name_key}" if name_key else None,
+        "names": names,
+        "name_index": build_name_index(names),
+        "n_dropped": len(gj.get("features") or []) - len(feats),
+    }
+    _prepared.put(key, prepared)
+    return prepared
+
+
+def read_file(path: str = DEFAULT_GEOJSON) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def normalize_states(states: pd.Series, name_index: dict) -> pd.Series:
+    """Vectorized label normalization: maps each distinct label once, then broadcasts."""
+    uniques = pd.Series(states.dropna().unique())
+    mapping = dict(zip(uniques, uniques.map(lambda s: name_index.get(str(s).strip().lower(), s))))
+    return states.map(mapping)
+
+
+def unmatched(states_norm: pd.Series, names) -> list:
+    return sorted(set(states_norm.dropna().unique()) - set(names))
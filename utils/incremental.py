@@ -0,0 +1,183 @@
+import hashlib
+
+import pandas as pd
+
+from utils import ingest, quarter_index, snapshot, ymi
+
+# Release kinds that can be appended, and the merged column each one feeds
+SERIES = {
+    "youth": "youth_unemp_rate",
+    "skills": "skills_underemp_rate",
+    "time": "time_underemp_rate",
+    "cpi": "cpi_index",
+}
+KINDS = list(SERIES) + ["labour_force"]
+NATIONAL = ""  # state label used for national series in the partials table
+
+
+# ---------------------------
+# Partial aggregates (running sum + count per series / state / quarter)
+# ---------------------------
+def _sum_count(rows: pd.DataFrame, col: str, series: str) -> pd.DataFrame:
+    p = rows.groupby("quarter")[col].agg(sum="sum", n="count").reset_index()
+    return p.assign(series=series, state=NATIONAL)[["series", "state", "quarter", "sum", "n"]]
+
+
+def series_partials(kind: str, data: bytes) -> pd.DataFrame:
+    """Sum/count per quarter (and state, for CPI) for one file, using the same cleaning as ingest."""
+    if kind == "youth":
+        return _sum_count(ingest.youth_rows(data), "youth_unemp_rate", SERIES[kind])
+    if kind == "skills":
+        return _sum_count(ingest.underemployment_rows(data, kind), SERIES[kind], SERIES[kind])
+    if kind == "time":
+        return _sum_count(ingest.underemployment_rows(data, kind), SERIES[kind], SERIES[kind])
+    if kind == "cpi":
+        p = ingest.cpi_partials(data).rename(columns={"cpi_sum": "sum", "cpi_n": "n"})
+        return p.assign(series=SERIES[kind])[["series", "state", "quarter", "sum", "n"]]
+    raise ValueError(f"Unknown release kind {kind!r}; expected one of {KINDS}.")
+
+
+def build_partials(f1: bytes, f2: bytes, f3: bytes, f6: bytes) -> pd.DataFrame:
+    """Partials for a full upload; saved alongside the snapshot so later releases can be folded in."""
+    parts = [series_partials(k, f) for k, f in (("youth", f1), ("skills", f2), ("time", f3), ("cpi", f6))]
+    return pd.concat(parts, ignore_index=True)
+
+
+def build_side(f1: bytes, f2: bytes, f3: bytes, f4: bytes, f6: bytes) -> dict:
+    """Snapshot side tables for later appends: the partials and the untrimmed labour-force rows."""
+    return {"partials": build_partials(f1, f2, f3, f6), "labour_force": ingest.labour_force(f4)}
+
+
+def combine_partials(partials: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    keys = ["series", "state", "quarter"]
+    both = pd.concat([partials.astype({"series": str, "state": str}), delta.astype({"series": str, "state": str})],
+                     ignore_index=True)
+    return both.groupby(keys, as_index=False, observed=True)[["sum", "n"]].sum()
+
+
+# ---------------------------
+# Rebuild only the affected quarters
+# ---------------------------
+def _labour(labour: pd.DataFrame) -> pd.DataFrame:
+    out = labour[["state", "quarter", "p_rate", "u_rate"]].astype({"state": str})
+    if not isinstance(out["quarter"].dtype, pd.PeriodDtype):
+        out["quarter"] = quarter_index.to_period(out["quarter"])
+    return out
+
+
+def upsert_labour(labour: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Labour-force rows with every (state, quarter) in `delta` replaced by the release's rows."""
+    keys = ["state", "quarter"]
+    hit = pd.MultiIndex.from_frame(labour[keys]).isin(pd.MultiIndex.from_frame(delta[keys]))
+    return pd.concat([labour[~hit], delta], ignore_index=True)
+
+
+def _quarter_rows(labour: pd.DataFrame, partials: pd.DataFrame, quarters) -> pd.DataFrame:
+    """Untrimmed merged rows for `quarters`, from the labour-force rows and the partials."""
+    lf = labour[labour["quarter"].isin(quarters)]
+    p = partials[partials["quarter"].isin(quarters)]
+    p = p.assign(value=p["sum"] / p["n"].where(p["n"] > 0))
+    cpi_q = p.loc[p["series"] == SERIES["cpi"], ["state", "quarter", "value"]].rename(columns={"value": "cpi_index"})
+    nat = p[p["series"] != SERIES["cpi"]].pivot_table(index="quarter", columns="series", values="value",
+                                                      aggfunc="first", dropna=False)
+    nat = nat.reindex(columns=ingest.CORE_COLS).reset_index()
+    nat.columns.name = None
+    nat["YMI"] = ymi.ymi(nat, ymi.DEFAULT_WEIGHTS, normalize=False)
+
+    state_q = lf.merge(cpi_q, on=["state", "quarter"], how="outer")
+    return state_q.merge(nat, on="quarter", how="left")
+
+
+def update_coverage(coverage: pd.DataFrame, removed: pd.DataFrame, added: pd.DataFrame,
+                    labels: dict = ingest.COVERAGE_LABELS) -> pd.DataFrame:
+    """Adjust the coverage table by the rows that were replaced instead of rescanning the frame."""
+    cov = coverage.set_index("Metric")
+    rows = []
+    for c, label in labels.items():
+        if c not in added.columns:
+            continue
+        q_new = added.loc[added[c].notna(), "quarter"].astype(str)
+        if label in cov.index:
+            n = int(cov.at[label, "Non-null rows"])
+            bounds = [b for b in (cov.at[label, "First quarter"], cov.at[label, "Last quarter"]) if b != "—"]
+        else:
+            n, bounds = 0, []
+        n += int(q_new.size) - int(removed[c].notna().sum())
+        if q_new.size:
+            bounds += [q_new.min(), q_new.max()]
+        first, last = (min(bounds), max(bounds)) if bounds and n > 0 else ("—", "—")
+        rows.append({"Metric": label, "First quarter": first, "Last quarter": last, "Non-null rows": n})
+    return pd.DataFrame(rows)
+
+
+def apply_release(merged: pd.DataFrame, partials: pd.DataFrame, coverage: pd.DataFrame, kind: str, data: bytes,
+                  annual: dict = None, labour: pd.DataFrame = None, trim: bool = False):
+    """Fold one release (new rows only) into an existing merged frame.
+
+    Only quarters present in the release are recomputed: their running sums and
+    counts are updated, the state rows for those quarters are rebuilt from the
+    partials and the untrimmed labour-force rows (`labour`, upserted for a file 4
+    release), and every other row is left untouched. Without `labour` (older
+    snapshots) the labour-force rows come from `merged`, which misses any quarter
+    trimmed out of it. `annual` holds the snapshot's productivity_annual /
+    income_state_annual tables; when given, the rebuilt rows get their annual columns
+    re-aligned from them. With `trim` the result is cut back to the common core
+    quarters, as a rebuild would be; coverage always describes the untrimmed data.
+    Returns (merged, partials, labour, coverage, affected quarters).
+    """
+    merged = merged.copy()
+    if not isinstance(merged["quarter"].dtype, pd.PeriodDtype):
+        merged["quarter"] = quarter_index.to_period(merged["quarter"])
+    if labour is None:
+        labour = merged.dropna(subset=["p_rate", "u_rate"], how="all")
+    labour = old_labour = _labour(labour)
+    old_partials = partials
+
+    if kind == "labour_force":
+        delta = _labour(ingest.labour_force_rows(data))
+        labour = upsert_labour(labour, delta)
+        quarters = set(delta["quarter"].dropna())
+    else:
+        delta = series_partials(kind, data)
+        partials = combine_partials(partials, delta)
+        quarters = set(delta["quarter"].dropna())
+    if not quarters:
+        return merged, partials, labour, coverage, []
+
+    annual = annual or {}
+    with_annual = any(c in merged.columns for c in ingest.ANNUAL_COLS) and annual
+
+    def rows_for(labour, partials):
+        rows = _quarter_rows(labour, partials, quarters)
+        if with_annual:
+            rows = ingest.join_annual(rows, annual.get("productivity_annual"), annual.get("income_state_annual"))
+        return rows.reindex(columns=merged.columns)
+
+    removed, rows = rows_for(old_labour, old_partials), rows_for(labour, partials)
+    kept = merged[~merged["quarter"].isin(quarters)].astype({"state": str})
+    out = pd.concat([kept, rows], ignore_index=True)
+    if trim:
+        # Only the release's quarters can change which quarters every core series covers
+        common_q = ingest.common_quarters(out)
+        if common_q is not None:
+            out = out[out["quarter"].isin(common_q)]
+    out = out.sort_values(["quarter", "state"]).reset_index(drop=True)
+    return out, partials, labour, update_coverage(coverage, removed, rows), sorted(str(q) for q in quarters)
+
+
+def append_release(kind: str, data: bytes, path: str = snapshot.DEFAULT_DIR) -> dict:
+    """Apply a release to the snapshot at `path` in place; returns a short summary."""
+    merged, side, manifest = snapshot.read_snapshot(path)
+    if "partials" not in side:
+        raise ValueError("This snapshot has no partial aggregates; save it again from the full CSV upload first.")
+    coverage = side.pop("coverage", None)
+    if coverage is None:
+        coverage = ingest.coverage_table(merged)
+    trim = bool(manifest.get("trim", False))
+    merged, partials, labour, coverage, quarters = apply_release(
+        merged, side.pop("partials"), coverage, kind, data, side, side.pop("labour_force", None), trim)
+    side.update({"partials": partials, "labour_force": labour, "coverage": coverage})
+
+    version = hashlib.sha256(f"{manifest.get('data_version')}+{ingest.content_hash(data)}".encode()).hexdigest()
+    snapshot.write_snapshot(merged, side, path=path, data_version=version, trim=trim)
+    return {"kind": kind, "quarters": quarters, "rows": len(merged), "data_version": version}
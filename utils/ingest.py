@@ -0,0 +1,439 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils import dates, quarter_index, schema, trace, ymi
+from utils.schema import find_col
+
+OVERALL_AGES = ["overall", "all", "all ages", "semua"]
+OVERALL_DIVISIONS = {"overall", "all items", "all-items", "all item", "semua barang", "semua barangan"}
+CPI_CHUNKSIZE = 100_000
+CORE_COLS = ["youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate"]
+COVERAGE_LABELS = {
+    "p_rate": "Participation rate (state)",
+    "u_rate": "Unemployment rate (state)",
+    "cpi_index": "CPI index (state)",
+    "youth_unemp_rate": "Youth unemployment (national)",
+    "skills_underemp_rate": "Skills underemployment (national)",
+    "time_underemp_rate": "Time underemployment (national)",
+    "YMI": "Youth Mismatch Index (national)",
+    "income_mean": "Household income, mean (state, annual→quarterly)",
+    "income_median": "Household income, median (state, annual→quarterly)",
+    "productivity": "Labour productivity (national, annual→quarterly)",
+}
+# Columns the annual files (5, 7) add to the merged frame
+ANNUAL_COLS = ["income_mean", "income_median", "productivity"]
+OVERALL_SECTORS = {"overall", "all", "total", "all sectors", "semua", "keseluruhan"}
+
+
+# ---------------------------
+# Content-hashed cache
+# ---------------------------
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """Bounded, thread-safe mapping; the least recently used entry is evicted first."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Per-file cleaned frames and the merged frame are shared by every session in the
+# process. Callers must treat returned frames as read-only.
+_frames = LRUCache(max_entries=64)
+_merged = LRUCache(max_entries=8)
+# Date parsing report per file content hash (format, parse path, failed rows)
+_date_reports = LRUCache(max_entries=64)
+
+
+def _cached(cache, key, build):
+    with trace.stage(key[0]) as s:
+        hit = cache.get(key)
+        if hit is not None:
+            s.cache, s.rows_out = "hit", len(hit)
+            return hit
+        s.cache = "miss"
+        value = build()
+        cache.put(key, value)
+        s.rows_out = len(value)
+        return value
+
+
+def dataset_version(*blobs) -> str:
+    """One hash for a set of uploads (order-sensitive); None entries stand for missing files."""
+    h = hashlib.sha256()
+    for b in blobs:
+        h.update(content_hash(b).encode() if b is not None else b"-")
+    return h.hexdigest()
+
+
+def clear_caches():
+    _frames.clear()
+    _merged.clear()
+    _date_reports.clear()
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def _read(data: bytes) -> pd.DataFrame:
+    with trace.stage("read_csv") as s:
+        df = pd.read_csv(io.BytesIO(data))
+        s.rows_out = len(df)
+    return df
+
+
+def _with_quarter(df, key: str = None):
+    """Add the quarter of the date column (see utils/dates.py); `key` files the parse report."""
+    with trace.stage("parse_dates", rows_in=len(df)) as s:
+        dcol = "date" if "date" in df.columns else df.columns[0]
+        df["quarter"], report = dates.to_quarters(df[dcol])
+        s.rows_out = len(df) - report["failed"]
+    if key is not None:
+        _date_reports.put(key, dict(report, column=dcol))
+    return df
+
+
+def _overall_age(df):
+    if "age" in df.columns:
+        df = df[df["age"].astype(str).str.lower().isin(OVERALL_AGES)]
+    return df
+
+
+# ---------------------------
+# Per-file cleaners (bytes -> tidy quarterly frame)
+# ---------------------------
+def youth_rows(data: bytes) -> pd.DataFrame:
+    # (1) Youth Unemployment, monthly rows tagged with their quarter
+    yu = _with_quarter(schema.read(data, "youth"), content_hash(data))
+    return yu[["quarter", "youth_unemp_rate"]]
+
+
+def underemployment_rows(data: bytes, kind: str) -> pd.DataFrame:
+    # (2)/(3) Skills- and time-related underemployment rows (overall age group); kind is "skills" or "time"
+    df = _overall_age(_with_quarter(schema.read(data, kind), content_hash(data)))
+    return df[["quarter", schema.UNDEREMPLOYMENT[kind][1]]]
+
+
+def _youth_unemployment(data: bytes) -> pd.DataFrame:
+    # (1) monthly -> quarterly
+    return youth_rows(data).groupby("quarter", as_index=False)["youth_unemp_rate"].mean()
+
+
+def _underemployment(data: bytes, kind: str) -> pd.DataFrame:
+    out = schema.UNDEREMPLOYMENT[kind][1]
+    return underemployment_rows(data, kind).groupby("quarter", as_index=False)[out].mean()
+
+
+def labour_force_rows(data: bytes) -> pd.DataFrame:
+    # (4) Labour force by state (quarterly)
+    lf = _with_quarter(schema.read(data, "labour_force"), content_hash(data))
+    return lf[["state", "quarter", "p_rate", "u_rate"]]
+
+
+def _cpi(data: bytes) -> pd.DataFrame:
+    # (6) CPI monthly -> quarterly average (overall division only)
+    cpi = _with_quarter(schema.read(data, "cpi"), content_hash(data))
+    with trace.stage("cpi_division_filter", rows_in=len(cpi)) as s:
+        if "division" in cpi.columns:
+            mask = cpi["division"].astype(str).str.lower().isin(OVERALL_DIVISIONS)
+            if mask.any():
+                cpi = cpi[mask]
+        s.rows_out = len(cpi)
+    return cpi.groupby(["state", "quarter"], as_index=False)["value"].mean().rename(columns={"value": "cpi_index"})
+
+
+def _reduce_partials(parts):
+    p = pd.concat(parts, ignore_index=True)
+    return p.groupby(["state", "quarter"], as_index=False)[["cpi_sum", "cpi_n"]].sum()
+
+
+def cpi_partials(source, chunksize: int = CPI_CHUNKSIZE) -> pd.DataFrame:
+    """Stream file 6 in chunks into per (state, quarter) running sums and counts.
+
+    Only the mapped columns are parsed (see utils/schema.py), rows outside the "overall" division
+    are dropped chunk by chunk, and each chunk is folded into the running
+    aggregate straight away, so the full monthly table is never held in memory.
+    `source` is the raw bytes of the upload or a path.
+    """
+    m = schema.mapping("cpi", source)
+    rename = {src: role for role, src in m["columns"].items()}
+    date_col, has_division = m["columns"]["date"], "division" in m["columns"]
+
+    overall, everything = [], []
+    fmt, report = None, None
+    reader = pd.read_csv(schema.open_source(source), usecols=m["usecols"], dtype=m["dtype"], chunksize=chunksize)
+    for chunk in reader:
+        with trace.stage("cpi_chunk", rows_in=len(chunk)) as s:
+            chunk = chunk.rename(columns=rename)
+            # Date format is detected on the first chunk and reused for the rest
+            chunk["quarter"], r = dates.to_quarters(chunk["date"], fmt)
+            fmt, report = fmt or r["format"], dates.merge_reports(report, r)
+            s.rows_out = len(chunk)
+            if has_division:
+                sub = chunk[chunk["division"].str.lower().isin(OVERALL_DIVISIONS)]
+                s.rows_out = len(sub)
+                if len(sub):
+                    g = sub.groupby(["state", "quarter"])["value"]
+                    overall = [_reduce_partials(overall + [g.agg(cpi_sum="sum", cpi_n="count").reset_index()])]
+                    everything = []
+            if not overall:
+                # Only needed until the first "overall" row turns up
+                g = chunk.groupby(["state", "quarter"])["value"]
+                everything = [_reduce_partials(everything + [g.agg(cpi_sum="sum", cpi_n="count").reset_index()])]
+
+    if report is not None and isinstance(source, (bytes, bytearray)):
+        _date_reports.put(content_hash(source), dict(report, column=date_col))
+    # Same rule as the in-memory path: fall back to every row when no "overall" division exists
+    parts = overall or everything
+    if not parts:
+        return pd.DataFrame({"state": pd.Series(dtype=str), "quarter": pd.Series(dtype="period[Q-DEC]"),
+                             "cpi_sum": pd.Series(dtype=float), "cpi_n": pd.Series(dtype="int64")})
+    return parts[0]
+
+
+def _cpi_streaming(data: bytes, chunksize: int = CPI_CHUNKSIZE) -> pd.DataFrame:
+    p = cpi_partials(data, chunksize)
+    out = p[["state", "quarter"]].copy()
+    out["cpi_index"] = p["cpi_sum"] / p["cpi_n"].where(p["cpi_n"] > 0)
+    return out
+
+
+def youth_unemployment(data: bytes) -> pd.DataFrame:
+    return _cached(_frames, ("youth", content_hash(data)), lambda: _youth_unemployment(data))
+
+
+def skills_underemployment(data: bytes) -> pd.DataFrame:
+    return _cached(_frames, ("skills", content_hash(data)),
+                   lambda: _underemployment(data, "skills"))
+
+
+def time_underemployment(data: bytes) -> pd.DataFrame:
+    return _cached(_frames, ("time", content_hash(data)),
+                   lambda: _underemployment(data, "time"))
+
+
+def labour_force(data: bytes) -> pd.DataFrame:
+    return _cached(_frames, ("labour_force", content_hash(data)), lambda: labour_force_rows(data))
+
+
+def cpi_quarterly(data: bytes, stream: bool = True) -> pd.DataFrame:
+    """File 6 quarterly means; `stream` bounds memory by reading in chunks (same result)."""
+    build = (lambda: _cpi_streaming(data)) if stream else (lambda: _cpi(data))
+    return _cached(_frames, ("cpi", content_hash(data)), build)
+
+
+def read_annual(data: bytes, kind: str) -> pd.DataFrame:
+    """Annual side tables (files 5, 7, 8): identifying columns plus numeric measures, values as uploaded."""
+    return _cached(_frames, ("annual", kind, content_hash(data)), lambda: schema.read(data, kind))
+
+
+# ---------------------------
+# Merge stages
+# ---------------------------
+def national_core(f1: bytes, f2: bytes, f3: bytes) -> pd.DataFrame:
+    """Core national quarterly series (files 1-3) plus the fixed-weight YMI."""
+    key = ("national", content_hash(f1), content_hash(f2), content_hash(f3))
+
+    def build():
+        yu, su, tu = youth_unemployment(f1), skills_underemployment(f2), time_underemployment(f3)
+        with trace.stage("merge_national", rows_in=len(yu) + len(su) + len(tu)) as s:
+            nat = yu.merge(su, on="quarter", how="outer").merge(tu, on="quarter", how="outer")
+            nat = nat.sort_values("quarter").reset_index(drop=True)
+            s.rows_out = len(nat)
+        with trace.stage("ymi", rows_in=len(nat)) as s:
+            nat["YMI"] = ymi.ymi(nat, ymi.DEFAULT_WEIGHTS, normalize=False)
+            s.rows_out = len(nat)
+        return nat
+
+    return _cached(_merged, key, build)
+
+
+def build_merged(f1: bytes, f2: bytes, f3: bytes, f4: bytes, f6: bytes,
+                 f5: bytes = None, f7: bytes = None) -> pd.DataFrame:
+    """State-quarter frame: labour force + CPI per state, with the national core spread onto each row.
+
+    With files 5 and/or 7 the annual productivity and state income series are aligned
+    to quarters and joined on as well (see join_annual). Every stage is cached by the
+    content hash of its inputs, so re-uploading or rerunning with unchanged files only
+    recomputes what depends on a changed file.
+    """
+    key = ("merged",) + tuple(content_hash(f) for f in (f1, f2, f3, f4, f6))
+    if f5 is not None or f7 is not None:
+        core = build_merged(f1, f2, f3, f4, f6)
+        key += tuple(content_hash(f) if f is not None else None for f in (f5, f7))
+        return _cached(_merged, key, lambda: join_annual(
+            core,
+            read_annual(f5, "productivity") if f5 is not None else None,
+            read_annual(f7, "income_state") if f7 is not None else None,
+        ))
+
+    def build():
+        lf, cpi, nat = labour_force(f4), cpi_quarterly(f6), national_core(f1, f2, f3)
+        with trace.stage("merge", rows_in=len(lf) + len(cpi)) as s:
+            state_q = lf.merge(cpi, on=["state", "quarter"], how="outer")
+            merged = state_q.merge(nat, on="quarter", how="left")
+            s.rows_out = len(merged)
+        return merged
+
+    return _cached(_merged, key, build)
+
+
+# ---------------------------
+# Annual -> quarterly alignment (files 5, 7)
+# ---------------------------
+def align_annual(table: pd.DataFrame, values: list, quarters, by: str = None,
+                 method: str = "interpolate") -> pd.DataFrame:
+    """Annual rows -> one row per (group, quarter) for the target `quarters`, all groups in one pass.
+
+    "interpolate" anchors each year's value mid-year and interpolates linearly between
+    years; "ffill" holds it for the four quarters of its year. Either way the last value
+    carries forward past the final year and the first year's early quarters take that
+    year's value; quarters before the first year stay NaN. Duplicate rows for a group
+    and year are averaged.
+    """
+    if method not in ("interpolate", "ffill"):
+        raise ValueError(f"Unknown alignment method {method!r}; expected 'interpolate' or 'ffill'.")
+    quarters = pd.PeriodIndex(pd.Series(quarters).dropna().unique(), freq="Q").sort_values()
+    t = quarter_index.ordinal(quarters).astype(np.float64)
+    year, _ = dates.to_quarters(table["date"])
+    # The year's first quarter, as a quarter_index ordinal (plus 1.5: mid-year anchor)
+    x = np.asarray(year.dt.year, dtype=np.float64) * 4 + (1.5 if method == "interpolate" else 0.0)
+    if by is not None:
+        codes, labels = pd.factorize(table[by].astype(str))
+    else:
+        codes, labels = np.zeros(len(table), dtype=np.int64), np.array([None])
+    tg = np.repeat(np.arange(len(labels)), len(t))
+    tt = np.tile(t, len(labels))
+    # Groups are 1e6 quarter-ordinals apart on one sorted axis, so searchsorted finds every
+    # target's neighbouring points within its own group at once
+    span = 1e6
+    out = pd.DataFrame({"quarter": quarter_index.from_ordinals(tt.astype(np.int64))})
+    if by is not None:
+        out.insert(0, by, labels[tg])
+    for v in values:
+        y = pd.to_numeric(table[v], errors="coerce").to_numpy(dtype=np.float64)
+        ok = (codes >= 0) & ~np.isnan(x) & ~np.isnan(y)
+        keys, inv = np.unique(codes[ok] * span + x[ok], return_inverse=True)
+        pts = np.bincount(inv, weights=y[ok]) / np.bincount(inv)
+        pg = np.floor(keys / span)
+        px = keys - pg * span
+        i = np.searchsorted(keys, tg * span + tt, side="right") - 1
+        j = i + 1
+        has_left = (i >= 0) & (pg[np.clip(i, 0, None)] == tg)
+        has_right = (j < len(keys)) & (pg[np.clip(j, None, len(keys) - 1)] == tg)
+        il, ir = np.clip(i, 0, len(keys) - 1), np.clip(j, 0, len(keys) - 1)
+        res = np.where(has_left, pts[il], np.nan)
+        if method == "interpolate":
+            with np.errstate(invalid="ignore", divide="ignore"):
+                w = (tt - px[il]) / (px[ir] - px[il])
+            both = has_left & has_right
+            res[both] = pts[il][both] + w[both] * (pts[ir][both] - pts[il][both])
+            # Early quarters of the first year sit before its mid-year anchor
+            early = ~has_left & has_right & (px[ir] - tt <= 2)
+            res[early] = pts[ir][early]
+        out[v] = res
+    return out
+
+
+def join_annual(merged: pd.DataFrame, productivity: pd.DataFrame = None, income_state: pd.DataFrame = None,
+                method: str = "interpolate") -> pd.DataFrame:
+    """Add quarterly state income (file 7) and national productivity (file 5) columns to `merged`."""
+    with trace.stage("align_annual", rows_in=len(merged)) as s:
+        out = merged.drop(columns=[c for c in ANNUAL_COLS if c in merged.columns])
+        quarters = out["quarter"]
+        if income_state is not None and "state" in income_state.columns:
+            values = [c for c in ("income_mean", "income_median") if c in income_state.columns]
+            if values:
+                inc = align_annual(income_state, values, quarters, by="state", method=method)
+                out = out.merge(inc, on=["state", "quarter"], how="left")
+        if productivity is not None:
+            measure = find_col(productivity, "output_hour") or next(
+                (c for c in productivity.columns if c not in ("date", "sector")), None)
+            if measure is not None:
+                prod = align_annual(productivity, [measure], quarters,
+                                    by="sector" if "sector" in productivity.columns else None, method=method)
+                if "sector" in prod.columns:
+                    overall = prod["sector"].str.lower().isin(OVERALL_SECTORS)
+                    # No "overall" sector row: use the mean across sectors
+                    prod = prod[overall] if overall.any() else prod
+                    prod = prod.groupby("quarter", as_index=False)[measure].mean()
+                out = out.merge(prod.rename(columns={measure: "productivity"})[["quarter", "productivity"]],
+                                on="quarter", how="left")
+        s.rows_out = len(out)
+    return out
+
+
+# ---------------------------
+# Data quality & trimming
+# ---------------------------
+def coverage_table(merged: pd.DataFrame, labels: dict = COVERAGE_LABELS) -> pd.DataFrame:
+    rows = []
+    for c, label in labels.items():
+        if c in ANNUAL_COLS and c not in merged.columns:
+            continue
+        q = merged.loc[merged[c].notna(), "quarter"]
+        if q.empty:
+            qmin, qmax = "—", "—"
+        else:
+            qmin, qmax = str(q.min()), str(q.max())
+        rows.append({"Metric": label, "First quarter": qmin, "Last quarter": qmax, "Non-null rows": int(len(q))})
+    return pd.DataFrame(rows)
+
+
+def common_quarters(merged: pd.DataFrame):
+    """Intersection of quarters where every core series is present (None if no core data)."""
+    sets = []
+    for c in CORE_COLS:
+        qs = merged.loc[merged[c].notna(), "quarter"].unique()
+        if len(qs) > 0:
+            sets.append(set(qs))
+    if not sets:
+        return None
+    return set.intersection(*sets)
+
+
+def date_report(files: dict) -> pd.DataFrame:
+    """How each file's dates were read: {label: bytes} -> detected format, parse path, failed rows."""
+    rows = []
+    for label, data in files.items():
+        r = _date_reports.get(content_hash(data)) if data is not None else None
+        if r is None:
+            continue
+        rows.append({"File": label, "Column": r["column"], "Format": r["format"] or "—", "Path": r["path"],
+                     "Rows": r["rows"], "Failed": r["failed"], "Examples": ", ".join(r["failed_examples"])})
+    return pd.DataFrame(rows, columns=["File", "Column", "Format", "Path", "Rows", "Failed", "Examples"])
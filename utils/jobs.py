@@ -0,0 +1,209 @@
+"""Process-level background precompute, shared by every session.
+
+A JobService owns a small thread pool (its queue holds the submitted jobs) and a
+shared store of published results. The Home page submits the uploaded files once per
+dataset version; the job runs the merge, trim, compact frame, aggregate cube
+(national rollup, rankings, gaps) and the pages' chart data, then publishes one
+read-only mapping. Another session uploading the same files gets the published
+result (or joins the running job) instead of computing it again, and pages poll the
+job's progress rather than blocking inside the merge. Chart images, correlations,
+projections and map grids are then warmed by a follow-up job:
+
+    job = jobs.service().submit_dataset(files, trim=True)
+    job.progress()           # (fraction done, current stage label)
+    ds = job.result()        # mappingproxy: df (compact), cube, coverage, common_quarters, ...
+
+Never imports streamlit; the Streamlit side lives in utils/data_loader.py.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
+from utils import aggregates, charts, choropleth, correlation, forecast, geo, ingest, memory, trace, ymi
+from utils.ingest import LRUCache
+
+CORE = ["f1", "f2", "f3", "f4", "f6"]
+ANNUAL = ["f5", "f7"]
+
+
+class Job:
+    """One queued computation: named steps run in order over a shared context dict."""
+
+    def __init__(self, key, steps: list, store: LRUCache, memory: bool = False):
+        self.key = key
+        self.store = store
+        self.labels = [label for label, _ in steps]
+        self.steps = steps
+        self.done_steps = 0
+        self.stage = "Queued"
+        self.trace = trace.Trace(memory=memory)
+        self.submitted = time.time()
+        self.seconds = None
+        self.future = None
+
+    def progress(self) -> tuple:
+        return self.done_steps / max(len(self.labels), 1), self.stage
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: float = None):
+        return self.future.result(timeout)
+
+    def run(self):
+        ctx = {"key": self.key}
+        t0 = time.perf_counter()
+        # The trace is entered here, in the worker thread: ContextVars do not follow the job across threads
+        with self.trace:
+            for i, (label, step) in enumerate(self.steps):
+                self.stage = label
+                step(ctx)
+                self.done_steps = i + 1
+        self.stage = "Done"
+        self.steps = None  # drop the closures (and the upload bytes they hold)
+        self.seconds = time.perf_counter() - t0
+        result = MappingProxyType(ctx)
+        self.store.put(self.key, result)
+        return result
+
+
+class JobService:
+    """Thread pool + job registry + shared store of published datasets.
+
+    Follow-up (warm) jobs publish into their own LRU, so they never evict datasets.
+    """
+
+    def __init__(self, max_workers: int = 2, max_results: int = 8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="precompute")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self.store = LRUCache(max_entries=max_results)
+        self.warm = LRUCache(max_entries=max_results)
+
+    def submit(self, key, steps: list, memory: bool = False, store: LRUCache = None, then=None) -> Job:
+        """Queue `steps` under `key` unless the key is already published or in flight (then share that job).
+
+        `then(future)` is attached once, when the job is created; it is not re-attached
+        for callers that join an existing job.
+        """
+        store = self.store if store is None else store
+        created = False
+        with self._lock:
+            job = self._jobs.get(key)
+            failed = job is not None and job.done() and job.future.exception() is not None
+            if job is None or failed or (job.done() and key not in job.store):
+                job = Job(key, steps, store, memory)
+                job.future = self._pool.submit(job.run)
+                self._jobs[key] = job
+                created = True
+                # Finished jobs are only kept while their result is still in their store
+                for k in [k for k, j in self._jobs.items() if j.done() and k not in j.store]:
+                    del self._jobs[k]
+        if created and then is not None:
+            # Outside the lock: `then` may submit, and a finished future runs it right here
+            job.future.add_done_callback(then)
+        return job
+
+    def job(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def published(self, key):
+        return self.store.get(key)
+
+    def submit_dataset(self, files: dict, trim: bool = True, memory: bool = False) -> Job:
+        """Merge + aggregates for raw upload bytes keyed f1..f8 (f5, f7, f8 optional).
+
+        Once the dataset is published, a second job warms the chart data (see warm_steps).
+        """
+        key = dataset_version(files, trim)
+
+        def warm(fut):
+            if fut.exception() is None:
+                self.submit((key, "warm"), warm_steps(fut.result()), store=self.warm)
+
+        return self.submit(key, dataset_steps(files, trim), memory, then=warm)
+
+
+# ---------------------------
+# Dataset precompute
+# ---------------------------
+def dataset_version(files: dict, trim: bool = True) -> str:
+    """Keys every downstream cache (cube, snapshots, shared frames); cheap, hashes the bytes only."""
+    annual = [files[k] for k in ANNUAL if files.get(k) is not None]
+    return f"{ingest.dataset_version(*[files[k] for k in CORE], *annual)}:trim={int(trim)}"
+
+
+def dataset_steps(files: dict, trim: bool = True) -> list:
+    version = dataset_version(files, trim)
+
+    def merge(ctx):
+        ctx["version"] = version
+        ctx["full"] = ingest.build_merged(*[files[k] for k in CORE], files.get("f5"), files.get("f7"))
+        ctx["coverage"] = ingest.coverage_table(ctx["full"])
+
+    def trim_quarters(ctx):
+        merged = ctx.pop("full")
+        common_q = ingest.common_quarters(merged) if trim else None
+        with trace.stage("trim", rows_in=len(merged)) as s:
+            if common_q is not None:
+                merged = merged[merged["quarter"].isin(common_q)]
+            s.rows_out = len(merged)
+        ctx["common_quarters"], ctx["merged"] = common_q, merged
+
+    def compact(ctx):
+        # Compact (categorical state/quarter, float32 metrics), shared with any other lookup of this version.
+        # The float64 frame is dropped: the published dataset only holds the compact one
+        merged = ctx.pop("merged")
+        df = memory.shared(("merged", version), lambda: merged)
+        ctx["df"] = df
+        ctx["quarters"] = list(df["quarter"].cat.categories)
+        ctx["states"] = sorted(df["state"].dropna().unique())
+
+    def cube(ctx):
+        ctx["cube"] = aggregates.get_cube(ctx["df"], version)
+
+    return [("Cleaning and merging", merge), ("Trimming to common quarters", trim_quarters),
+            ("Compacting", compact), ("Aggregates and rankings", cube)]
+
+
+def warm_steps(ds) -> list:
+    """Follow-up to a published dataset: fill the per-version caches the pages read.
+
+    Default-weight chart images, the correlation panel, projections and map grids. Runs
+    as its own job so the Home page does not wait for matplotlib.
+    """
+    version, df, nat = ds["version"], ds["df"], ds["cube"]["national"]
+
+    def chart_images(ctx):
+        for chart in ("trends", "contributions"):
+            charts.chart_png(chart, nat, ymi.DEFAULT_WEIGHTS, version)
+
+    def models(ctx):
+        correlation.state_matrices(df, version)
+        ctx["forecast"] = forecast.project(df, version)
+
+    def map_grids(ctx):
+        try:
+            geom = geo.prepare(geo.read_file())
+        except Exception:
+            return
+        if geom["geojson"]["features"]:
+            for metric in [m for m in choropleth.METRICS if m in df.columns]:
+                choropleth.metric_grid(df, metric, geom, version)
+
+    return [("Chart images", chart_images), ("Correlations and projections", models), ("Map data", map_grids)]
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def service() -> JobService:
+    """The JobService shared by every session in this server process."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = JobService()
+        return _service
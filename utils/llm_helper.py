@@ -1,26 +1,119 @@
-def compose_bullets(context: dict, lang: str = "ms") -> str:
-    q = context.get("quarter","-")
-    ymi = context.get("YMI")
-    yu = context.get("youth_unemp_rate")
-    su = context.get("skills_underemp_rate")
-    tu = context.get("time_underemp_rate")
-    u  = context.get("u_rate")
-    cpi= context.get("cpi_index")
-
-    if lang == "ms":
-        lines = [f"• Pada {q}, YMI: {float(ymi):.1f} (0–100, lebih tinggi = lebih teruk)."]
-        if yu is not None: lines.append(f"• Pengangguran belia: {float(yu):.1f}%.")
-        if su is not None: lines.append(f"• Kekurangan guna tenaga (kemahiran): {float(su):.1f}%.")
-        if tu is not None: lines.append(f"• Kekurangan guna tenaga (masa): {float(tu):.1f}%.")
-        if u is not None:  lines.append(f"• Kadar pengangguran keseluruhan: {float(u):.1f}%.")
-        if cpi is not None:lines.append(f"• Indeks CPI (tekanan kos sara hidup): {float(cpi):.1f}.")
-        lines.append("• Fokus polisi: kurangkan pengangguran belia; sejajarkan latihan TVET/industri; pantau CPI negeri.")
-    else:
-        lines = [f"• In {q}, YMI: {float(ymi):.1f} (0–100; higher = worse)."]
-        if yu is not None: lines.append(f"• Youth unemployment: {float(yu):.1f}%.")
-        if su is not None: lines.append(f"• Skills underemployment: {float(su):.1f}%.")
-        if tu is not None: lines.append(f"• Time underemployment: {float(tu):.1f}%.")
-        if u is not None:  lines.append(f"• Overall unemployment: {float(u):.1f}%.")
-        if cpi is not None:lines.append(f"• CPI index (cost pressure): {float(cpi):.1f}.")
-        lines.append("• Policy focus: reduce youth unemployment; align TVET/industry; monitor state CPI.")
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from utils.ingest import LRUCache
+
+FIELDS = ["YMI", "youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate", "u_rate", "cpi_index"]
+
+# One compiled template set per language: "head" always prints (with "–" for a missing
+# YMI), each metric line only when its value is present, then the fixed policy line.
+TEMPLATES = {
+    "ms": {
+        "head": ("• Pada ", ", YMI: ", " (0–100, lebih tinggi = lebih teruk)."),
+        "youth_unemp_rate": ("• Pengangguran belia: ", "%."),
+        "skills_underemp_rate": ("• Kekurangan guna tenaga (kemahiran): ", "%."),
+        "time_underemp_rate": ("• Kekurangan guna tenaga (masa): ", "%."),
+        "u_rate": ("• Kadar pengangguran keseluruhan: ", "%."),
+        "cpi_index": ("• Indeks CPI (tekanan kos sara hidup): ", "."),
+        "tail": "• Fokus polisi: kurangkan pengangguran belia; sejajarkan latihan TVET/industri; pantau CPI negeri.",
+    },
+    "en": {
+        "head": ("• In ", ", YMI: ", " (0–100; higher = worse)."),
+        "youth_unemp_rate": ("• Youth unemployment: ", "%."),
+        "skills_underemp_rate": ("• Skills underemployment: ", "%."),
+        "time_underemp_rate": ("• Time underemployment: ", "%."),
+        "u_rate": ("• Overall unemployment: ", "%."),
+        "cpi_index": ("• CPI index (cost pressure): ", "."),
+        "tail": "• Policy focus: reduce youth unemployment; align TVET/industry; monitor state CPI.",
+    },
+}
+
+_bullets = LRUCache(max_entries=4096)
+
+
+def _lines(s: pd.Series, lead: str, trail: str, missing: str = "") -> np.ndarray:
+    """One formatted line per row ("%.1f" of the value); NA and non-numeric give `missing`."""
+    v = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    ok = ~np.isnan(v)
+    # Format each distinct value once (national series repeat across every state row)
+    uniq, inv = np.unique(np.where(ok, v, 0.0), return_inverse=True)
+    text = np.array([lead + "%.1f" % x + trail for x in uniq.tolist()], dtype=object)[inv.ravel()]
+    text[~ok] = missing
+    return text
+
+
+def _render(ctx: pd.DataFrame, lang: str) -> list:
+    t = TEMPLATES["ms" if lang == "ms" else "en"]
+    n = len(ctx)
+    pre, mid, post = t["head"]
+    q = ctx["quarter"].astype(str).tolist() if "quarter" in ctx else ["-"] * n
+    ymi = ctx["YMI"] if "YMI" in ctx else pd.Series([np.nan] * n)
+    columns = [[pre + x + mid for x in q], _lines(ymi, "", post + "\n", "–" + post + "\n")]
+    for field in FIELDS[1:]:
+        if field in ctx:
+            lead, trail = t[field]
+            columns.append(_lines(ctx[field], lead, trail + "\n"))
+    columns.append([t["tail"]] * n)
+    # Concatenate each row's pieces once instead of growing strings column by column
+    return ["".join(parts) for parts in zip(*columns)]
+
+
+def _row_hashes(ctx: pd.DataFrame) -> np.ndarray:
+    # 64-bit hash of each row's (quarter, FIELDS) values, computed in one vectorized pass
+    cols = ctx.reindex(columns=["quarter"] + FIELDS)
+    cols["quarter"] = cols["quarter"].astype(str)
+    for c in FIELDS:
+        cols[c] = pd.to_numeric(cols[c], errors="coerce").astype(np.float64)
+    return pd.util.hash_pandas_object(cols, index=False).to_numpy()
+
+
+def compose_bullets_frame(ctx: pd.DataFrame, lang: str = "ms") -> pd.Series:
+    """Bullet text for every row of a context frame (quarter + FIELDS columns) in one pass.
+
+    Identical rows are rendered once, rows seen before for the same language come from
+    a shared cache keyed by (row values, language), and the rest are formatted together.
+    """
+    hashes, first, inverse = np.unique(_row_hashes(ctx), return_index=True, return_inverse=True)
+    texts = np.empty(len(hashes), dtype=object)
+    miss = []
+    for j, h in enumerate(hashes.tolist()):
+        hit = _bullets.get((lang, h))
+        if hit is None:
+            miss.append(j)
+        else:
+            texts[j] = hit
+    if miss:
+        rendered = _render(ctx.iloc[first[miss]], lang)
+        for j, text in zip(miss, rendered):
+            texts[j] = text
+            _bullets.put((lang, hashes[j]), text)
+    return pd.Series(texts[inverse.ravel()], index=ctx.index, name="bullets", dtype=object)
+
+
+def _num(x):
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if v != v else v
+
+
+@lru_cache(maxsize=4096)
+def _render_one(lang: str, quarter: str, values: tuple) -> str:
+    t = TEMPLATES["ms" if lang == "ms" else "en"]
+    pre, mid, post = t["head"]
+    ymi = values[0]
+    lines = [pre + quarter + mid + ("–" if ymi is None else "%.1f" % ymi) + post]
+    for field, v in zip(FIELDS[1:], values[1:]):
+        if v is not None:
+            lead, trail = t[field]
+            lines.append(lead + "%.1f" % v + trail)
+    lines.append(t["tail"])
     return "\n".join(lines)
+
+
+def compose_bullets(context: dict, lang: str = "ms") -> str:
+    """Bullets for one context; same templates as compose_bullets_frame, NA-safe, cached."""
+    return _render_one(lang, str(context.get("quarter", "-")), tuple(_num(context.get(f)) for f in FIELDS))
@@ -0,0 +1,86 @@
+"""Compact, shared frames for session state.
+
+Every browser session used to hold its own float64/object copy of the merged frame
+and the annual side tables. Here a frame is compacted once (categorical labels,
+quarter as an ordered categorical whose codes are the integer quarter index, float32
+metrics) and the result is kept in a process-wide cache keyed by the content hash /
+dataset version, so sessions that uploaded identical files share one copy.
+
+Shared frames must be treated as read-only: derive new frames with assign/copy
+rather than assigning columns in place.
+"""
+import numpy as np
+import pandas as pd
+
+from utils import ingest, quarter_index, trace
+from utils.ingest import LRUCache
+
+LABEL_COLS = ["state", "district", "sector", "division"]
+# Other text columns become categorical when at most this share of their values is distinct
+CATEGORY_RATIO = 0.5
+
+_shared = LRUCache(max_entries=16)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """Same data in compact dtypes: categorical labels, categorical quarter, float32 metrics."""
+    cols = {}
+    for c in df.columns:
+        s = df[c]
+        if c == "quarter":
+            cols[c] = quarter_index.categorical(s)
+        elif pd.api.types.is_float_dtype(s.dtype):
+            cols[c] = s.astype(np.float32)
+        elif isinstance(s.dtype, pd.CategoricalDtype):
+            cols[c] = s
+        elif pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype):
+            if c in LABEL_COLS or (len(s) and s.nunique(dropna=True) <= CATEGORY_RATIO * len(s)):
+                cols[c] = s.astype("category")
+            else:
+                cols[c] = s
+        else:
+            cols[c] = s
+    return pd.DataFrame(cols, index=df.index)
+
+
+def shared(key, build) -> pd.DataFrame:
+    """One compacted frame per key for the whole process; `build` returns the raw frame on a miss."""
+    with trace.stage("compact") as s:
+        hit = _shared.get(key)
+        s.cache = "miss" if hit is None else "hit"
+        if hit is None:
+            raw = build()
+            hit = compact(raw)
+            # Only the size of the uncompacted frame is kept, for memory_report
+            hit.attrs["source_nbytes"] = nbytes(raw)
+            _shared.put(key, hit)
+        s.rows_out = len(hit)
+    return hit
+
+
+def annual(data: bytes, kind: str) -> pd.DataFrame:
+    """Compact, shared copy of an annual side table (files 5, 7, 8); `kind` as in utils/schema.py."""
+    return shared(("annual", kind, ingest.content_hash(data)), lambda: ingest.read_annual(data, kind))
+
+
+def nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(tables: dict) -> pd.DataFrame:
+    """Rows, columns and memory of each session table, against its size before compaction when known."""
+    rows = []
+    for name, df in tables.items():
+        if df is None:
+            continue
+        row = {"Table": name, "Rows": len(df), "Columns": df.shape[1], "Memory (KB)": round(nbytes(df) / 1024, 1)}
+        before = df.attrs.get("source_nbytes")
+        if before is not None:
+            row["As uploaded (KB)"] = round(before / 1024, 1)
+            row["Saved"] = f"{1 - nbytes(df) / before:.0%}" if before else "—"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def shared_count() -> int:
+    return len(_shared)
@@ -0,0 +1,127 @@
+"""Headless build: the eight OpenDOSM CSVs -> merged snapshot + policy brief PDFs.
+
+    python -m utils.pipeline --youth f1.csv --skills f2.csv --time f3.csv \\
+        --labour-force f4.csv --cpi f6.csv [--productivity f5.csv ...] \\
+        --out snapshots/latest --briefs briefs/ [--states] [--workers 4]
+
+Uses the same cleaning and caching as app.py but never imports streamlit,
+plotly or matplotlib, so it starts quickly from cron or CI.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+from utils import aggregates, incremental, ingest, snapshot
+from utils.llm_helper import compose_bullets_frame
+
+# (argument, label, required) in upload order; files 5, 7, 8 are optional annual context
+FILES = [
+    ("youth", "1) Monthly Youth Unemployment", True),
+    ("skills", "2) Quarterly Skills-Related Underemployment by Age", True),
+    ("time", "3) Quarterly Time-Related Underemployment by Age", True),
+    ("labour_force", "4) Quarterly Labour Force by State", True),
+    ("productivity", "5) Annual Productivity by Economic Sector", False),
+    ("cpi", "6) Monthly CPI by State & Division", True),
+    ("income_state", "7) Household Income by State", False),
+    ("income_district", "8) Household Income by Administrative District", False),
+]
+ANNUAL = {"productivity": "productivity_annual", "income_state": "income_state_annual",
+          "income_district": "income_district_annual"}
+
+
+def build(files: dict, trim: bool = True) -> dict:
+    """Clean and merge raw file bytes keyed by FILES names. Mirrors the Home page."""
+    missing = [name for name, _, required in FILES if required and files.get(name) is None]
+    if missing:
+        raise ValueError(f"Missing required input file(s): {missing}")
+    core = [files[k] for k in ("youth", "skills", "time", "labour_force", "cpi")]
+    annual = [files[k] for k in ("productivity", "income_state") if files.get(k) is not None]
+    merged = ingest.build_merged(*core, files.get("productivity"), files.get("income_state"))
+    # Coverage describes the untrimmed merge, as on the Home page
+    coverage = ingest.coverage_table(merged)
+    if trim:
+        common_q = ingest.common_quarters(merged)
+        if common_q is not None:
+            merged = merged[merged["quarter"].isin(common_q)]
+    side = {table: ingest.read_annual(files[k], k) for k, table in ANNUAL.items() if files.get(k) is not None}
+    side.update(incremental.build_side(*core))
+    side["coverage"] = coverage
+    version = f"{ingest.dataset_version(*core, *annual)}:trim={int(trim)}"
+    return {"merged": merged, "side": side, "version": version, "trim": trim}
+
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(s)).strip("_")
+
+
+def brief_jobs(merged, version: str, out_dir: str, lang: str = "ms", states: bool = False, quarters=None) -> list:
+    """(path, title, bullets) for a national brief per quarter, plus one per state and quarter if asked."""
+    df = merged.assign(quarter=merged["quarter"].astype(str))
+    if quarters:
+        df = df[df["quarter"].isin(set(quarters))]
+    nat = aggregates.get_cube(df, version if not quarters else None)["national"]
+    jobs = [
+        (os.path.join(out_dir, f"policy_brief_{q}.pdf"), f"Policy Brief — {q}", text)
+        for q, text in zip(nat["quarter"], compose_bullets_frame(nat, lang))
+    ]
+    if states:
+        rows = df.dropna(subset=["state"])
+        for state, q, text in zip(rows["state"], rows["quarter"], compose_bullets_frame(rows, lang)):
+            path = os.path.join(out_dir, _slug(state), f"policy_brief_{q}.pdf")
+            jobs.append((path, f"Policy Brief — {state} — {q}", text))
+    return jobs
+
+
+def write_briefs(jobs: list, workers: int = None) -> list:
+    """Render the briefs with report.render_briefs (same process pool as the app) and write them; returns paths."""
+    # Imported here so the CLI only pays for reportlab if briefs are requested
+    from utils.report import render_briefs
+    pdfs = render_briefs([(title, bullets) for _, title, bullets in jobs], max_workers=workers)
+    for (path, _, _), pdf in zip(jobs, pdfs):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(pdf)
+    return [path for path, _, _ in jobs]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m utils.pipeline", description=__doc__.splitlines()[0])
+    for name, label, required in FILES:
+        ap.add_argument(f"--{name.replace('_', '-')}", dest=name, required=required, metavar="CSV", help=label)
+    ap.add_argument("--out", default=snapshot.DEFAULT_DIR, help="snapshot directory (default: %(default)s)")
+    ap.add_argument("--no-trim", action="store_true", help="keep quarters outside the common core range")
+    ap.add_argument("--briefs", metavar="DIR", help="also write policy brief PDFs to DIR")
+    ap.add_argument("--states", action="store_true", help="with --briefs: one brief per state and quarter too")
+    ap.add_argument("--quarters", nargs="*", metavar="Q", help="with --briefs: only these quarters (e.g. 2024Q1)")
+    ap.add_argument("--lang", choices=["ms", "en"], default="ms")
+    ap.add_argument("--workers", type=int, default=None, help="brief rendering processes (default: CPU count)")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    files = {}
+    for name, _, _ in FILES:
+        path = getattr(args, name)
+        if path:
+            with open(path, "rb") as f:
+                files[name] = f.read()
+    try:
+        result = build(files, trim=not args.no_trim)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    snapshot.write_snapshot(result["merged"], result["side"], path=args.out, data_version=result["version"],
+                            trim=result["trim"])
+    print(f"snapshot: {args.out} ({len(result['merged']):,} rows) in {time.perf_counter() - t0:.2f}s")
+
+    if args.briefs:
+        t1 = time.perf_counter()
+        jobs = brief_jobs(result["merged"], result["version"], args.briefs, args.lang, args.states, args.quarters)
+        paths = write_briefs(jobs, args.workers)
+        print(f"briefs: {len(paths)} PDF(s) in {args.briefs} in {time.perf_counter() - t1:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""One quarter index for ingest, app.py and every page.
+
+A quarter is an integer ordinal, year * 4 + (quarter - 1), so sorting and filtering
+are integer comparisons. Every module computes quarter ordinals through here; pandas
+Period[Q] values are the same ordinals shifted by PERIOD_OFFSET (1970Q1 is 0). Labels are canonical "YYYYQn" strings; a quarter column is
+handed to the pages as an ordered categorical of those labels (chronological order).
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+NA = -1
+PERIOD_OFFSET = 1970 * 4
+
+# "2024Q1", "2024 Q1", "2024-Q1", "Q1 2024", "Q1-2024" (case-insensitive)
+_PATTERN = r"^\s*(?:(?P<y1>\d{4})\s*[-/ ]?\s*[Qq](?P<q1>[1-4])|[Qq](?P<q2>[1-4])\D*(?P<y2>\d{4}))\s*$"
+
+
+@lru_cache(maxsize=64)
+def _parse_labels(labels: tuple) -> np.ndarray:
+    # Runs over distinct labels only; one vectorized regex pass, dates as a fallback
+    s = pd.Series(labels, dtype=object).astype(str)
+    m = s.str.extract(_PATTERN)
+    year = pd.to_numeric(m["y1"].fillna(m["y2"]))
+    q = pd.to_numeric(m["q1"].fillna(m["q2"]))
+    out = year * 4 + q - 1
+    rest = out.isna()
+    if rest.any():
+        dt = pd.to_datetime(s[rest], errors="coerce", format="mixed")
+        out[rest] = dt.dt.year * 4 + dt.dt.quarter - 1
+    return out.fillna(NA).to_numpy(dtype=np.int32)
+
+
+def ordinal(values) -> np.ndarray:
+    """int32 quarter ordinal for Periods, datetimes, categoricals or labels; missing -> NA (-1)."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    dtype = s.dtype
+    if isinstance(dtype, pd.PeriodDtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+        o = (s.dt.year * 4 + s.dt.quarter - 1).to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.where(s.isna().to_numpy() | np.isnan(o), NA, np.nan_to_num(o)).astype(np.int32)
+    if isinstance(dtype, pd.CategoricalDtype):
+        codes, uniq = s.cat.codes.to_numpy(), s.cat.categories
+    else:
+        codes, uniq = pd.factorize(s)
+    parsed = np.append(_parse_labels(tuple(uniq.tolist())), np.int32(NA))
+    return parsed[codes]
+
+
+def from_year_month(year, month) -> np.ndarray:
+    """Ordinal of the quarter holding each (year, month) pair of integer arrays."""
+    return np.asarray(year, dtype=np.int64) * 4 + (np.asarray(month, dtype=np.int64) - 1) // 3
+
+
+def label(o: int) -> str:
+    return f"{o // 4}Q{o % 4 + 1}" if o != NA else ""
+
+
+def categorical(values) -> pd.Series:
+    """Ordered categorical of canonical labels; categories are the observed quarters in order."""
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    o = ordinal(s)
+    uniq, codes = np.unique(o, return_inverse=True)
+    codes = codes.ravel()
+    if uniq.size and uniq[0] == NA:
+        uniq, codes = uniq[1:], codes - 1
+    cat = pd.Categorical.from_codes(codes, categories=[label(x) for x in uniq.tolist()], ordered=True)
+    return pd.Series(cat, index=s.index, name=s.name)
+
+
+def sorted_labels(values) -> list:
+    """Distinct canonical labels in chronological order."""
+    o = np.unique(ordinal(values))
+    return [label(x) for x in o.tolist() if x != NA]
+
+
+def sort_labels(labels) -> list:
+    """The given labels (unchanged) in chronological order."""
+    labels = list(labels)
+    order = np.argsort(ordinal(pd.Index(labels, dtype=object)), kind="stable")
+    return [labels[i] for i in order]
+
+
+def from_ordinals(o) -> pd.PeriodIndex:
+    """Quarterly PeriodIndex for an array of ordinals; NA becomes NaT."""
+    o = np.asarray(o, dtype=np.int64)
+    return pd.PeriodIndex.from_ordinals(np.where(o == NA, np.iinfo(np.int64).min, o - PERIOD_OFFSET), freq="Q")
+
+
+def to_period(values) -> pd.PeriodIndex:
+    """Quarterly PeriodIndex without re-parsing strings (ordinals map directly to Period ordinals)."""
+    return from_ordinals(ordinal(values))
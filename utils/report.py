@@ -1,12 +1,70 @@
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+import io
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 
-def export_policy_pdf(path, title, bullets_text):
-    styles = getSampleStyleSheet()
-    doc = SimpleDocTemplate(path, pagesize=A4)
-    story = [Paragraph(title, styles['Title']), Spacer(1, 12)]
+@lru_cache(maxsize=1)
+def _styles():
+    # Building the sample stylesheet is the slow part of a small brief; do it once per process
+    return getSampleStyleSheet()
+
+def _section(title, bullets_text):
+    styles = _styles()
+    story = [Paragraph(escape(title), styles['Title']), Spacer(1, 12)]
     for line in bullets_text.split("\n"):
-        story.append(Paragraph(line, styles['Normal']))
-    doc.build(story)
+        story.append(Paragraph(escape(line), styles['Normal']))
+    return story
+
+@lru_cache(maxsize=256)
+def render_policy_pdf(title, bullets_text) -> bytes:
+    """Render one brief to PDF bytes in memory (cached per title + text)."""
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4).build(_section(title, bullets_text))
+    return buf.getvalue()
+
+def export_policy_pdf(path, title, bullets_text):
+    with open(path, "wb") as f:
+        f.write(render_policy_pdf(title, bullets_text))
     return path
+
+def _render_item(item):
+    return render_policy_pdf(*item)
+
+def render_briefs(items, max_workers=None, processes=True):
+    """Render many (title, bullets_text) briefs; returns PDF bytes in input order.
+
+    ReportLab is pure Python and holds the GIL, so only a process pool runs faster than a
+    loop: `processes=True` (default) uses one, `processes=False` renders serially (for
+    callers such as a Streamlit server, where forking is undesirable).
+    """
+    items = [tuple(i) for i in items]
+    if len(items) <= 1 or max_workers == 1 or not processes:
+        return [_render_item(i) for i in items]
+    workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_render_item, items, chunksize=max(1, len(items) // (4 * workers))))
+
+def bundle_pdf(items) -> bytes:
+    """All (title, bullets_text) briefs as sections of one PDF, one section per page."""
+    story = []
+    for i, (title, bullets_text) in enumerate(items):
+        if i:
+            story.append(PageBreak())
+        story.extend(_section(title, bullets_text))
+    buf = io.BytesIO()
+    SimpleDocTemplate(buf, pagesize=A4).build(story)
+    return buf.getvalue()
+
+def bundle_zip(named_pdfs) -> bytes:
+    """Zip {file_name: pdf_bytes} in memory."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in named_pdfs.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
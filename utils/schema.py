@@ -0,0 +1,208 @@
+"""Column mapping for the eight upload types, resolved before the full read.
+
+Only the header and a small sample are parsed to decide which source column plays
+which role (date, state, rate, ...). The mapping is cached per (file type, header
+signature), so a new release with the same layout skips detection, and the full read
+then parses just those columns with explicit dtypes:
+
+    m = schema.mapping("labour_force", data)   # {"columns": {role: source}, "usecols", "dtype"}
+    df = schema.read(data, "labour_force")      # only date/state/p_rate/u_rate, renamed to the roles
+"""
+import csv
+import io
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+from utils import trace
+
+SAMPLE_ROWS = 200
+# Roles read as text; every other role is a float measure
+LABELS = {"date", "state", "district", "sector", "age", "division"}
+ANNUAL_KEYS = ["date", "state", "district", "sector"]
+# Cells read_csv treats as missing (the common ones)
+NA_VALUES = {"", "NA", "N/A", "n/a", "NaN", "nan", "-nan", "NULL", "null", "None", "#N/A", "<NA>"}
+# Files 2 and 3: kind -> (usual rate column, output role)
+UNDEREMPLOYMENT = {"skills": ("sru", "skills_underemp_rate"), "time": ("tru", "time_underemp_rate")}
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def find_col(df, key):
+    """Find a column by exact, lowercase-equal, or loose match (remove underscores).
+
+    `df` may be a DataFrame or just its column names.
+    """
+    columns = list(getattr(df, "columns", df))
+    if key in columns:
+        return key
+    for c in columns:
+        if c.lower() == key:
+            return c
+    k = key.replace("_", "")
+    for c in columns:
+        if k in c.lower().replace("_", ""):
+            return c
+    return None
+
+
+def open_source(source):
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+
+def _date(columns):
+    return "date" if "date" in columns else columns[0]
+
+
+# ---------------------------
+# Resolvers: (columns, numeric columns in the sample) -> {role: source column or None}
+# ---------------------------
+def _youth(columns, numeric):
+    candidates = [c for c in columns if re.search(r"(15.*30|youth|unemp)", c, flags=re.I)]
+    if "u_rate_15_30" in columns:
+        ycol = "u_rate_15_30"
+    elif candidates:
+        ycol = candidates[0]
+    else:
+        ycol = columns[1] if len(columns) > 1 else None  # fallback
+    return {"date": _date(columns), "youth_unemp_rate": ycol}
+
+
+def _underemployment(known, out):
+    def resolve(columns, numeric):
+        if known in columns:
+            rate = known
+        else:
+            rate_candidates = [c for c in columns if re.search(r"(rate|under)", c, re.I)]
+            rate = rate_candidates[0] if rate_candidates else columns[-1]
+        return {"date": _date(columns), "age": "age" if "age" in columns else None, out: rate}
+    return resolve
+
+
+def _labour_force(columns, numeric):
+    pcol = find_col(columns, "p_rate") or find_col(columns, "participation")
+    ucol = find_col(columns, "u_rate") or find_col(columns, "unemployment")
+    state_col = find_col(columns, "state") or "state"
+    if pcol is None or ucol is None or state_col not in columns:
+        raise ValueError("Could not detect labour force columns (need state, p_rate, u_rate). Check file 4.")
+    return {"date": _date(columns), "state": state_col, "p_rate": pcol, "u_rate": ucol}
+
+
+def _cpi(columns, numeric):
+    if "index" in columns:
+        ival = "index"
+    else:
+        cpi_candidates = [c for c in columns if re.search(r"(index|cpi)", c, re.I)]
+        ival = cpi_candidates[0] if cpi_candidates else columns[-1]
+    state_col = find_col(columns, "state") or "state"
+    if state_col not in columns:
+        raise ValueError("Could not detect a state column in the CPI file. Check file 6.")
+    return {"date": _date(columns), "state": state_col,
+            "division": "division" if "division" in columns else None, "value": ival}
+
+
+def _annual(columns, numeric):
+    # Identifying columns by name, plus every column that is numeric in the sample
+    keys = {"date": "date" if "date" in columns else find_col(columns, "year")}
+    for key in ANNUAL_KEYS[1:]:
+        keys[key] = find_col(columns, key)
+    used = set(keys.values())
+    return {**keys, **{c: c for c in columns if c in numeric and c not in used}}
+
+
+RESOLVERS = {
+    "youth": _youth,
+    "skills": _underemployment(*UNDEREMPLOYMENT["skills"]),
+    "time": _underemployment(*UNDEREMPLOYMENT["time"]),
+    "labour_force": _labour_force,
+    "productivity": _annual,
+    "cpi": _cpi,
+    "income_state": _annual,
+    "income_district": _annual,
+}
+
+
+# ---------------------------
+# Mapping (cached per header signature) and read
+# ---------------------------
+@lru_cache(maxsize=64)
+def _resolve(kind: str, columns: tuple, numeric: frozenset) -> dict:
+    roles = {role: src for role, src in RESOLVERS[kind](list(columns), numeric).items() if src is not None}
+    # A source column can only be read once; the first role that claims it keeps it
+    columns_by_role = {}
+    for role, src in roles.items():
+        if src not in columns_by_role.values():
+            columns_by_role[role] = src
+    dtype = {src: "category" if role in LABELS else "float64" for role, src in columns_by_role.items()}
+    return {"kind": kind, "columns": columns_by_role, "usecols": list(columns_by_role.values()), "dtype": dtype}
+
+
+def _head(source, nrows: int) -> bytes:
+    """Header plus the first `nrows` lines, without touching the rest of the file."""
+    if isinstance(source, (bytes, bytearray)):
+        end = -1
+        for _ in range(nrows + 1):
+            end = source.find(b"\n", end + 1)
+            if end < 0:
+                return bytes(source)
+        return bytes(source[:end + 1])
+    with open(source, "rb") as f:
+        return b"".join(line for line, _ in zip(f, range(nrows + 1)))
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff(source, nrows: int = SAMPLE_ROWS) -> tuple:
+    """(header columns, numeric columns) from the first `nrows` rows."""
+    head = _head(source, nrows)
+    rows = list(csv.reader(io.StringIO(head.decode("utf-8-sig", errors="replace"))))
+    header = tuple(rows[0]) if rows else ()
+    if len(set(header)) < len(header) or "" in header:
+        # Duplicate or blank names: let pandas name them (x.1, Unnamed: n) as the full read will
+        sample = pd.read_csv(io.BytesIO(head))
+        return tuple(sample.columns), frozenset(c for c in sample.columns
+                                                if pd.api.types.is_numeric_dtype(sample[c].dtype))
+    numeric = set()
+    for i, c in enumerate(header):
+        cells = [r[i].strip() for r in rows[1:] if i < len(r)]
+        cells = [x for x in cells if x not in NA_VALUES]
+        if cells and all(_is_number(x) for x in cells):
+            numeric.add(c)
+    return header, frozenset(numeric)
+
+
+def mapping(kind: str, source) -> dict:
+    """Role -> source column, usecols and dtypes for one upload. Treat the result as read-only."""
+    if kind not in RESOLVERS:
+        raise ValueError(f"Unknown file type {kind!r}; expected one of {list(RESOLVERS)}")
+    with trace.stage("schema") as s:
+        before = _resolve.cache_info().hits
+        m = _resolve(kind, *sniff(source))
+        s.cache = "hit" if _resolve.cache_info().hits > before else "miss"
+        s.rows_out = len(m["usecols"])
+    return m
+
+
+def read(source, kind: str) -> pd.DataFrame:
+    """The mapped columns of an upload, renamed to their roles."""
+    m = mapping(kind, source)
+    rename = {src: role for role, src in m["columns"].items()}
+    with trace.stage("read_csv") as s:
+        try:
+            df = pd.read_csv(open_source(source), usecols=m["usecols"], dtype=m["dtype"])
+        except ValueError:
+            # A measure that is not numeric past the sample: read it as text, coerce only the measures
+            df = pd.read_csv(open_source(source), usecols=m["usecols"], dtype=str)
+            for src, dt in m["dtype"].items():
+                df[src] = pd.to_numeric(df[src], errors="coerce") if dt == "float64" else df[src].astype(dt)
+        s.rows_out = len(df)
+    df.columns = [rename[c] for c in df.columns]
+    return df
@@ -0,0 +1,108 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from utils import quarter_index
+
+# Bump when the on-disk layout or column typing changes; older snapshots are rejected.
+SNAPSHOT_VERSION = 1
+DEFAULT_DIR = os.path.join("snapshots", "latest")
+MANIFEST = "manifest.json"
+
+CATEGORICAL_COLS = ["state", "district", "sector", "division"]
+# Running sums must keep full precision; every other table stores float metrics as float32
+EXACT_TABLES = {"partials"}
+ANNUAL_TABLES = ["productivity_annual", "income_state_annual", "income_district_annual"]
+
+
+def typed(df: pd.DataFrame, float32: bool = True) -> pd.DataFrame:
+    """Columnar typing for storage: Period quarter, categorical labels, float32 metrics."""
+    df = df.copy()
+    if "quarter" in df.columns and not isinstance(df["quarter"].dtype, pd.PeriodDtype):
+        df["quarter"] = quarter_index.to_period(df["quarter"])
+    for c in CATEGORICAL_COLS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    if float32:
+        for c in df.select_dtypes(include=[np.floating]).columns:
+            df[c] = df[c].astype(np.float32)
+    return df
+
+
+def write_snapshot(merged: pd.DataFrame, side_tables: dict = None, path: str = DEFAULT_DIR,
+                   data_version: str = None, trim: bool = False) -> str:
+    """Write the merged frame (+ optional side tables) as Parquet files with a manifest.
+
+    Each write puts its tables under new file names and swaps the manifest in last, so a
+    crash at any point leaves the previous manifest pointing at its own, complete tables.
+    `trim` records whether `merged` was cut to the common core quarters, so appended
+    releases are trimmed the same way (see utils/incremental.py).
+    """
+    os.makedirs(path, exist_ok=True)
+    previous = _listed_tables(path)
+    tables = {"merged": merged}
+    tables.update({k: v for k, v in (side_tables or {}).items() if v is not None})
+    token = uuid.uuid4().hex[:12]
+    files = {}
+    for name, df in tables.items():
+        fname = f"{name}-{token}.parquet"
+        # Write to a temp file first so a concurrent reader never sees a half-written table
+        tmp = os.path.join(path, fname + ".tmp")
+        typed(df, float32=name not in EXACT_TABLES).to_parquet(tmp, engine="pyarrow", index=False)
+        os.replace(tmp, os.path.join(path, fname))
+        files[name] = fname
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data_version": data_version,
+        "rows": int(len(merged)),
+        "trim": bool(trim),
+        "tables": files,
+    }
+    # Written last and swapped in the same way, so the manifest only ever lists complete tables
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    # The previous snapshot's tables are no longer referenced (open memory maps stay valid)
+    for fname in previous - set(files.values()):
+        try:
+            os.remove(os.path.join(path, fname))
+        except OSError:
+            pass
+    return path
+
+
+def _listed_tables(path: str) -> set:
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            return set(json.load(f).get("tables", {}).values())
+    except (OSError, ValueError, AttributeError):
+        return set()
+
+
+def read_manifest(path: str = DEFAULT_DIR) -> dict:
+    with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {manifest.get('version')} (expected {SNAPSHOT_VERSION}).")
+    return manifest
+
+
+def exists(path: str = DEFAULT_DIR) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+
+def read_snapshot(path: str = DEFAULT_DIR):
+    """Memory-map a snapshot back. Returns (merged, side_tables, manifest)."""
+    manifest = read_manifest(path)
+    tables = {
+        name: pd.read_parquet(os.path.join(path, fname), engine="pyarrow", memory_map=True)
+        for name, fname in manifest["tables"].items()
+    }
+    merged = tables.pop("merged")
+    return merged, tables, manifest
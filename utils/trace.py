@@ -0,0 +1,173 @@
+"""Lightweight stage trace for the ingestion hot path.
+
+    tr = trace.Trace(memory=True)
+    with tr:
+        merged = ingest.build_merged(...)
+    tr.frame()      # one row per stage: seconds, rows in/out, peak KB, cache hit/miss
+    tr.to_json()
+
+Stages are recorded with `with trace.stage("name", rows_in=n) as s: ...; s.rows_out = m`.
+When no Trace is active (the default, e.g. in the CLI) `stage` costs one ContextVar lookup.
+Peak memory uses tracemalloc and is only measured when the Trace asks for it, since
+tracing allocations slows pandas down noticeably. tracemalloc is process-global: the
+first active memory Trace starts it and the last one stops it, and peaks recorded
+while two memory Traces overlap (e.g. jobs on different worker threads) are flagged
+as unreliable, since each trace resets the shared peak.
+"""
+import json
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+import pandas as pd
+
+_active = ContextVar("datazenith_trace", default=None)
+# Memory Traces currently entered (any thread), and whether one of them started tracemalloc
+_memory_lock = threading.Lock()
+_memory_traces = set()
+_memory_owned = False
+
+
+class _Span:
+    __slots__ = ("name", "rows_in", "rows_out", "cache", "depth", "t0", "seconds", "mem0", "max_seen", "peak_kb")
+
+    def __init__(self, name, rows_in, depth):
+        self.name, self.rows_in, self.depth = name, rows_in, depth
+        self.rows_out = self.cache = self.seconds = self.peak_kb = None
+
+    def as_dict(self) -> dict:
+        return {"stage": self.name, "depth": self.depth, "seconds": self.seconds, "rows_in": self.rows_in,
+                "rows_out": self.rows_out, "peak_kb": self.peak_kb, "cache": self.cache}
+
+
+class _NoSpan:
+    """Stand-in when tracing is off; attribute writes are dropped."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+    def __init__(self, memory: bool = False):
+        self.memory = memory
+        self.spans = []
+        self._stack = []
+        self._tokens = []
+        self.overlapped = False
+
+    # Activation (re-enterable, so one trace can cover several separate blocks)
+    def __enter__(self):
+        self._tokens.append(_active.set(self))
+        if self.memory and len(self._tokens) == 1:
+            _memory_acquire(self)
+        return self
+
+    def __exit__(self, *exc):
+        _active.reset(self._tokens.pop())
+        if self.memory and not self._tokens:
+            _memory_release(self)
+        return False
+
+    def _open(self, span):
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                parent = self._stack[-1]
+                parent.max_seen = max(parent.max_seen, peak)
+            tracemalloc.reset_peak()
+            span.mem0, span.max_seen = current, current
+        self.spans.append(span)
+        self._stack.append(span)
+        span.t0 = time.perf_counter()
+
+    def _close(self, span):
+        span.seconds = time.perf_counter() - span.t0
+        self._stack.pop()
+        if self.memory and tracemalloc.is_tracing():
+            peak = max(span.max_seen, tracemalloc.get_traced_memory()[1])
+            span.peak_kb = round((peak - span.mem0) / 1024, 1)
+            if self._stack:
+                self._stack[-1].max_seen = max(self._stack[-1].max_seen, peak)
+
+    # Reporting
+    def records(self) -> list:
+        return [s.as_dict() for s in self.spans]
+
+    def frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.records(), columns=["stage", "depth", "seconds", "rows_in", "rows_out",
+                                                   "peak_kb", "cache"])
+        df["stage"] = ["· " * d + s for s, d in zip(df["stage"], df["depth"])]
+        return df.drop(columns="depth")
+
+    def summary(self) -> dict:
+        top = [s for s in self.spans if s.depth == 0 and s.seconds is not None]
+        hits = sum(s.cache == "hit" for s in self.spans)
+        misses = sum(s.cache == "miss" for s in self.spans)
+        return {"total_seconds": round(sum(s.seconds for s in top), 6), "stages": len(self.spans),
+                "cache_hits": hits, "cache_misses": misses,
+                "memory_reliable": self.memory and not self.overlapped}
+
+    def to_json(self, **meta) -> str:
+        doc = {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"), **meta,
+               "memory_traced": self.memory, **self.summary(), "spans": self.records()}
+        return json.dumps(doc, indent=2, default=str)
+
+
+def _memory_acquire(tr):
+    global _memory_owned
+    with _memory_lock:
+        if not _memory_traces and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _memory_owned = True
+        _memory_traces.add(tr)
+        if len(_memory_traces) > 1:
+            for t in _memory_traces:
+                t.overlapped = True
+
+
+def _memory_release(tr):
+    global _memory_owned
+    with _memory_lock:
+        _memory_traces.discard(tr)
+        if not _memory_traces and _memory_owned:
+            tracemalloc.stop()
+            _memory_owned = False
+
+
+class _Stage:
+    __slots__ = ("trace", "span")
+
+    def __init__(self, trace, name, rows_in):
+        self.trace = trace
+        self.span = _Span(name, rows_in, len(trace._stack))
+
+    def __enter__(self):
+        self.trace._open(self.span)
+        return self.span
+
+    def __exit__(self, *exc):
+        self.trace._close(self.span)
+        return False
+
+
+def stage(name: str, rows_in: int = None):
+    """Record a stage in the active Trace (no-op when none is active)."""
+    tr = _active.get()
+    if tr is None:
+        return _NO_SPAN
+    return _Stage(tr, name, rows_in)
+
+
+def active() -> bool:
+    return _active.get() is not None
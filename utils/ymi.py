@@ -0,0 +1,105 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Youth Mismatch Index: weighted blend of the three core national series
+COMPONENTS = ["youth_unemp_rate", "skills_underemp_rate", "time_underemp_rate"]
+DEFAULT_WEIGHTS = (0.6, 0.3, 0.1)
+
+
+def component_matrix(df: pd.DataFrame) -> np.ndarray:
+    """rows x 3 float array of the YMI components (NaN where missing)."""
+    return df[COMPONENTS].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def as_weight_matrix(weights) -> np.ndarray:
+    """Accept one weight triple or a (k, 3) stack of them; always returns (k, 3)."""
+    W = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if W.shape[1] != len(COMPONENTS):
+        raise ValueError(f"YMI weights need {len(COMPONENTS)} columns, got shape {W.shape}.")
+    return W
+
+
+def compute(X: np.ndarray, weights, normalize: bool = True) -> np.ndarray:
+    """YMI for every row of X under every weight vector, as one matrix product.
+
+    Returns a (rows, k) array. With `normalize`, each weight vector is divided by its
+    sum (guarded against zero) so the index stays on the components' scale.
+    """
+    W = as_weight_matrix(weights)
+    if normalize:
+        W = W / np.maximum(W.sum(axis=1, keepdims=True), 1e-9)
+    return X @ W.T
+
+
+def ymi(df: pd.DataFrame, weights=DEFAULT_WEIGHTS, normalize: bool = True) -> pd.Series:
+    """Single-scenario YMI aligned to df's index."""
+    return pd.Series(compute(component_matrix(df), weights, normalize)[:, 0], index=df.index, name="YMI")
+
+
+def contributions(df: pd.DataFrame, weights=DEFAULT_WEIGHTS) -> pd.DataFrame:
+    """Un-normalized weighted components (w_i * x_i), e.g. for stacked charts."""
+    w = as_weight_matrix(weights)[0]
+    return pd.DataFrame(component_matrix(df) * w, index=df.index, columns=COMPONENTS)
+
+
+def weight_grid(step: float = 0.05) -> np.ndarray:
+    """All weight triples on the simplex (non-negative, summing to 1) at the given step."""
+    n = int(round(1 / step))
+    a, b = np.meshgrid(np.arange(n + 1), np.arange(n + 1), indexing="ij")
+    keep = a + b <= n
+    a, b = a[keep], b[keep]
+    return np.column_stack([a, b, n - a - b]) / n
+
+
+def _ranks(Y: np.ndarray) -> np.ndarray:
+    # Rank rows within each scenario column (0 = highest YMI); NaN rows rank last
+    filled = np.where(np.isnan(Y), -np.inf, Y)
+    order = np.argsort(-filled, axis=0, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(Y.shape[0])[:, None], axis=0)
+    return ranks
+
+
+def sweep(df: pd.DataFrame, weights=None, baseline=DEFAULT_WEIGHTS, label: str = "quarter") -> dict:
+    """Evaluate many weight scenarios at once and summarise how sensitive YMI is to them.
+
+    Returns a dict with
+    - "weights":   (k, 3) scenarios evaluated (default: `weight_grid()`)
+    - "values":    (rows, k) YMI under each scenario
+    - "summary":   per-row baseline / min / max / std of YMI and best / worst rank
+    - "stability": per-scenario Spearman rank correlation with the baseline ranking
+                   and whether the baseline's top row is still ranked first
+    """
+    W = weight_grid() if weights is None else as_weight_matrix(weights)
+    W = np.vstack([as_weight_matrix(baseline), W])
+    Y = compute(component_matrix(df), W)
+    R = _ranks(Y)
+    base, Y, R_base, R = Y[:, 0], Y[:, 1:], R[:, 0], R[:, 1:]
+
+    labels = df[label].to_numpy() if label in df.columns else df.index.to_numpy()
+    with warnings.catch_warnings():
+        # Rows with a missing component are NaN in every scenario
+        warnings.simplefilter("ignore", RuntimeWarning)
+        spread = {
+            "YMI_min": np.nanmin(Y, axis=1) if Y.size else np.nan,
+            "YMI_max": np.nanmax(Y, axis=1) if Y.size else np.nan,
+            "YMI_std": np.nanstd(Y, axis=1) if Y.size else np.nan,
+        }
+    summary = pd.DataFrame({
+        label: labels,
+        "YMI_baseline": base,
+        **spread,
+        "rank_baseline": R_base + 1,
+        "rank_best": R.min(axis=1) + 1,
+        "rank_worst": R.max(axis=1) + 1,
+    })
+
+    n = len(R_base)
+    d2 = ((R - R_base[:, None]) ** 2).sum(axis=0)
+    spearman = 1 - 6 * d2 / (n * (n * n - 1)) if n > 1 else np.ones(R.shape[1])
+    stability = pd.DataFrame(W[1:], columns=[f"w_{c}" for c in COMPONENTS])
+    stability["spearman_vs_baseline"] = spearman
+    stability["same_top"] = R[np.argmin(R_base)] == 0 if n else False
+    return {"weights": W[1:], "values": Y, "summary": summary, "stability": stability}